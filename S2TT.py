@@ -2,54 +2,83 @@ import numpy as np
 import torch
 import whisper
 import time
-import gc
+import dataclasses
 import threading
 from typing import Optional
 from langchain.chains import TransformChain
-from translator import T2TT
+from translator import T2TT, TranslationEngine
+from streaming_asr import StreamingTranscriber
+from translation_pipeline import TranslationPipeline
+from vad import VoiceActivityDetector
+from metrics import NULL_TRACE, metrics
+from model_registry import models
+from asr_models import asr_device, select_whisper_model
+from adaptive_decoding import DecodingPolicy, transcribe_adaptive
 
 
 class S2TT:
-    def __init__(self, memory, in_lang: str = 'spanish', out_lang: str = 'english'):
+    def __init__(self, memory, in_lang: str = 'spanish', out_lang: str = 'english',
+                 mode: str = 'interval', stream_step: float = 0.5, translator='gemini', translation_cache=None,
+                 asr_model: str = 'auto', device=None, num_threads: Optional[int] = None, max_rtf: float = 0.5,
+                 beam_size: Optional[int] = None, decoding_policy: Optional[DecodingPolicy] = None,
+                 adaptive_decoding: bool = True, streaming_translation: bool = True,
+                 translate_threads: Optional[int] = None, translation_hedge_after: Optional[float] = None,
+                 asr_reference: Optional[str] = None):
         
         self.stop = False
 
         self.in_lang = in_lang
         self.out_lang = out_lang
+
+        # 'interval' decodes closed utterances once per second, 'streaming' keeps a sliding window
+        self.mode = mode
+        self.stream_step = stream_step
+
+        # Endpointing ahead of Whisper, only speech regions get decoded
+        self.vad = VoiceActivityDetector()
+
+        # Translation runs as its own stage, created on start()
+        self.pipeline = None
         
         """Initialize transcriber with buffer duration in seconds"""
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.device = asr_device(device)
         print(f"Using device: {self.device}")
-        # Initialize Whisper model
-        print("Loading Whisper model...")
-        self.model = whisper.load_model(
-            "large-v3-turbo", 
-            device=self.device,
-            download_root="./models"
-        )
+        # Shared Whisper model, resident across resets. 'auto' picks the size by measured RTF on CPU
+        self.model_key = select_whisper_model(asr_model, self.device, max_rtf=max_rtf, num_threads=num_threads,
+                                              reference_path=asr_reference)
+        self.model = models.acquire(self.model_key)
 
         self.memory = memory
         
-        # Memory management
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            torch.cuda.set_per_process_memory_fraction(0.8)
-        
-        # Whisper options
+        # Adaptive decoding runs greedy and only re-decodes low-confidence segments with the policy's beam
+        self.decoding_policy = None
+        if adaptive_decoding:
+            self.decoding_policy = decoding_policy or DecodingPolicy(beam_size=beam_size or 5)
+
+        # Whisper options, greedy decoding on CPU unless a beam is asked for
+        if beam_size is None:
+            beam_size = 5 if self.device.type == 'cuda' else None
         self.options = whisper.DecodingOptions(
-            fp16=torch.cuda.is_available(),
+            fp16=self.device.type == 'cuda',
             language=self.in_lang,
             task='transcribe',
             without_timestamps=True,
-            beam_size=5
+            beam_size=beam_size
         )
         
         # Initialize LangChain components
         self.setup_langchain()
-        
-        self.model.eval()
 
-        self.t2tt = T2TT()
+        # Engine name ('gemini', 'local', 'fake') or a TranslationEngine instance
+        self.translator = translator
+        # Subtitles update as translation fragments arrive
+        self.streaming_translation = streaming_translation
+        # CPU threads for the local engine
+        self.translate_threads = translate_threads
+        # Seconds before a slow online translation request is duplicated
+        self.translation_hedge_after = translation_hedge_after
+        self.t2tt = T2TT(cache=translation_cache, engine=translator, engine_options=self._engine_options(translator),
+                         hedge_after=translation_hedge_after)
 
         print("Model and LangChain ready!")
 
@@ -78,24 +107,17 @@ class S2TT:
 
 
     def _preprocess_audio(self, input_audio: np.ndarray) -> Optional[np.ndarray]:
-        """Preprocess audio and check for silence"""
+        """Peak-normalize a speech region for Whisper"""
         if len(input_audio) == 0:
             return None
             
-        # Convert to float32 if needed
-        audio_array = np.array(input_audio, dtype=np.float32)
-        
-        # Enhanced silence detection
-        window_size = 160  # 100ms windows
-        windows = np.array_split(audio_array, max(1, len(audio_array) // window_size))
-        window_energies = [np.sqrt(np.mean(np.square(w))) for w in windows]
-        
-        if np.mean(window_energies) < 0.015:
-            return None
+        # Convert to float32 if needed (no copy when it already is)
+        audio_array = np.asarray(input_audio, dtype=np.float32)
             
         # Normalize audio
-        if np.max(np.abs(audio_array)) > 0:
-            audio_array = audio_array / np.max(np.abs(audio_array))
+        peak = np.max(np.abs(audio_array))
+        if peak > 0:
+            audio_array = audio_array / peak
             
         return audio_array
 
@@ -104,67 +126,192 @@ class S2TT:
     def transcribe_translate(self):
         while not self.stop:
             # Rate limiting
-            current_time = time.time()
             time.sleep(1)
                 
-            audio_array = np.array(self.memory.get_input_audio(), dtype=np.float32)
+            audio_array = self.memory.get_input_audio()
+            trace = metrics.start_trace()
+            # Oldest drained sample has waited this long in the input queue
+            metrics.observe('input_queue', len(audio_array) / self.memory.sample_rate)
             
-            # Preprocess audio
-            processed_audio = self._preprocess_audio(audio_array)
-            if processed_audio is None:
-                self.memory.write_buffer(" ")
-                time.sleep(0.01)
+            # Only closed utterances are decoded, silence never reaches Whisper
+            segments = self.vad.process(audio_array)
+            if not segments:
+                if not self.vad.in_speech:
+                    self.pipeline.submit(" ", passthrough=True)
                 continue
 
-            # Transcribe with Whisper
-            with torch.amp.autocast('cuda',enabled=True):
-                result = self.model.transcribe(
-                    processed_audio,
-                    **self.options.__dict__
-                )
-            
-            transcription = result['text'].strip()
-            
-            # Process through LangChain
-            if transcription:
-                cleaned_result = self.clean_chain.run(text=transcription)
-                transcription = cleaned_result
+            texts = []
+            for segment in segments:
+                processed_audio = self._preprocess_audio(segment.audio)
+
+                # Transcribe with Whisper
+                result = self._decode(processed_audio, **self.options.__dict__)
+                texts.append(result['text'].strip())
             
-            # Periodic CUDA cleanup
-            if torch.cuda.is_available() and current_time % 30 < 1:
-                torch.cuda.empty_cache()
-                gc.collect()
+            transcription = ' '.join(t for t in texts if t)
+            # Stream time (seconds since start) at which the decoded speech ended
+            trace.annotate('audio_end', segments[-1].end)
+            trace.mark('asr')
             
-            self.memory.add_to_history(transcription, True)
+            self._publish(transcription, trace)
+
+            # Utterance boundary: idle models are offloaded and freed memory handed back
+            models.reclaim()
+
+
+    def _transcribe_words(self, audio: np.ndarray, prompt: str):
+        """Decode a window and return its words as (start, end, text) tuples"""
+        audio = self._preprocess_audio(audio)
+
+        options = dict(self.options.__dict__, without_timestamps=False)
+        result = self._decode(
+            audio,
+            word_timestamps=True,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False,
+            **options
+        )
+
+        return [(w['start'], w['end'], w['word'])
+                for segment in result['segments'] for w in segment.get('words', [])]
+
+
+    def _decode(self, audio: np.ndarray, **options) -> dict:
+        """One Whisper transcribe(), adaptive unless a fixed beam was configured"""
+        with torch.amp.autocast('cuda', enabled=self.device.type == 'cuda'):
+            if self.decoding_policy is None:
+                return self.model.transcribe(audio, **options)
+            result, _ = transcribe_adaptive(self.model, audio, self.decoding_policy, **options)
+            return result
+
+
+    @torch.no_grad()
+    def transcribe_stream(self):
+        """Streaming mode: commit a prefix once consecutive passes agree, publish finals per sentence"""
+        streamer = StreamingTranscriber(self._transcribe_words)
+        final_text = ''
+        trace = NULL_TRACE
+
+        while not self.stop:
+            time.sleep(self.stream_step)
 
-            if self.in_lang == self.out_lang:
-                translation = transcription
-            elif transcription == '':
-                translation = ''
+            audio_array = self.memory.get_input_audio()
+            segments = self.vad.process(audio_array)
+            is_speech = self.vad.in_speech or bool(segments)
+
+            if is_speech:
+                if trace is NULL_TRACE:
+                    trace = metrics.start_trace()
+                streamer.insert_audio(audio_array)
+                # Only the decode counts as 'asr'; the trace spans the whole utterance
+                started = time.monotonic()
+                committed, partial = streamer.process()
+                metrics.observe('asr', time.monotonic() - started)
+                trace.annotate('audio_end', self.vad.stream_time)
+                final_text = (final_text + ' ' + committed).strip()
+
+                # A committed sentence end closes the final hypothesis
+                if final_text and final_text[-1] in '.?!':
+                    trace.mark('utterance')
+                    self._publish(final_text, trace)
+                    final_text = ''
+                    trace = NULL_TRACE
+                # Partial hypothesis: committed text not yet published plus the uncommitted tail
+                self.memory.set_partial_transcript((final_text + ' ' + partial).strip())
+            elif final_text or streamer.window_seconds > 0:
+                # Silence ends the utterance: flush the uncommitted tail as final
+                final_text = (final_text + ' ' + streamer.finish()).strip()
+                trace.mark('utterance')
+                self.memory.set_partial_transcript('')
+                self._publish(final_text, trace)
+                final_text = ''
+                trace = NULL_TRACE
+                models.reclaim()
             else:
-                translation = self.t2tt.translate(transcription, self.in_lang, self.out_lang)
-            
-            self.memory.add_to_history(translation, False)
-            self.memory.write_buffer(translation)
+                self.pipeline.submit(" ", passthrough=True)
+
+
+    def _publish(self, transcription: str, trace=NULL_TRACE):
+        """Clean a final transcript and queue it for translation"""
+        # Process through LangChain
+        if transcription:
+            cleaned_result = self.clean_chain.run(text=transcription)
+            transcription = cleaned_result
+
+        self.pipeline.submit(transcription, trace=trace)
+
+
+    def _translate(self, transcription: str) -> str:
+        if self.in_lang == self.out_lang:
+            return transcription
+        return self.t2tt.translate(transcription, self.in_lang, self.out_lang)
+
+
+    def _translate_batch(self, transcriptions):
+        if self.in_lang == self.out_lang:
+            return list(transcriptions)
+        return self.t2tt.translate_batch(transcriptions, self.in_lang, self.out_lang)
+
+
+    def _engine_options(self, translator) -> dict:
+        if translator == 'local' and self.translate_threads:
+            return {'num_threads': self.translate_threads}
+        return {}
+
+
+    def _translate_stream(self, transcription: str):
+        if self.in_lang == self.out_lang:
+            yield transcription
+            return
+        yield from self.t2tt.translate_stream(transcription, self.in_lang, self.out_lang)
+
+
+    def _preview(self, seq: int, translation: str):
+        """Progressive subtitle while the translation streams in; TTS only gets the final"""
+        self.memory.set_subtitle_preview(seq, translation)
+
+
+    def _deliver(self, seq: int, transcription: str, translation: str, trace=NULL_TRACE):
+        """Called in transcript order by the translation pipeline"""
+        trace.mark('reorder')
+        if transcription != " ":
+            self.memory.add_to_history(transcription, translation, seq=seq)
+        self.memory.write_buffer(translation, seq=seq, trace=trace)
+        trace.finish('subtitle_end_to_end')
 
 
     def start(self):
         self.stop = False
-        print("Starting transcription thread...")
-        threading.Thread(target=self.transcribe_translate, args=(), daemon=True).start()
+        self.vad.reset()
+        # Engines with real batched generation get queued transcripts together
+        if type(self.t2tt.engine).translate_batch is not TranslationEngine.translate_batch:
+            self.pipeline = TranslationPipeline(self._translate, self._deliver, translate_batch=self._translate_batch)
+        elif self.streaming_translation:
+            self.pipeline = TranslationPipeline(self._translate, self._deliver,
+                                                translate_stream=self._translate_stream, progress=self._preview)
+        else:
+            self.pipeline = TranslationPipeline(self._translate, self._deliver)
+        self.pipeline.start()
+        print(f"Starting transcription thread ({self.mode} mode)...")
+        target = self.transcribe_stream if self.mode == 'streaming' else self.transcribe_translate
+        threading.Thread(target=target, args=(), daemon=True).start()
 
     
-    def reset(self, memory, in_lang, out_lang):
+    def reset(self, memory, in_lang, out_lang, mode: Optional[str] = None, translator: Optional[str] = None):
         self.memory = memory
         self.in_lang = in_lang
         self.out_lang = out_lang
+        # The model stays loaded, only the decoding language changes
+        self.options = dataclasses.replace(self.options, language=in_lang)
+        if mode is not None:
+            self.mode = mode
+        if translator is not None and translator != self.translator:
+            self.translator = translator
+            self.t2tt = T2TT(cache=self.t2tt.cache, engine=translator, engine_options=self._engine_options(translator),
+                             hedge_after=self.translation_hedge_after)
 
 
     def stop_s2tt(self):
         self.stop = True
-
-
-    def __del__(self):
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            gc.collect()
\ No newline at end of file
+        if self.pipeline is not None:
+            self.pipeline.stop_pipeline()
@@ -3,21 +3,56 @@ import time
 import gc
 import threading
 from transformers import VitsModel, AutoTokenizer
+from waveform_cache import WaveformCache
+from tts_chunking import Crossfader, split_clauses
+from metrics import NULL_TRACE, metrics
+from model_registry import models
+
+
+def register_voice(lang: str) -> str:
+    """Register an MMS-TTS voice with the model registry and return its key"""
+    model_name = 'facebook/mms-tts-' + lang
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    # Halved precision only when fp32 doesn't fit; bf16 keeps fp32's range for the flow layers
+    if device.type == 'cuda':
+        precisions = ('fp32', 'bf16' if torch.cuda.is_bf16_supported() else 'fp16')
+    else:
+        precisions = ('fp32', 'bf16')
+
+    def load():
+        # The registry picks the precision and moves the model to `device`
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = VitsModel.from_pretrained(model_name)
+        model.eval()
+        return tokenizer, model
+
+    @torch.no_grad()
+    def warmup(voice):
+        tokenizer, model = voice
+        model(**tokenizer("hello", return_tensors="pt").to(model.device))
+
+    return models.register(model_name, load, warmup, device=device, precisions=precisions)
+
 
 class T2S:
-    def __init__(self, memory, lang='eng'):
+    def __init__(self, memory, lang='eng', cache=None, incremental=True, fade_ms=10):
 
-        model_name = 'facebook/mms-tts-' + lang
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        
-        print(f"Loading TTS model {model_name}...")
-        
-        # Initialize tokenizer and model
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = VitsModel.from_pretrained(model_name).to(self.device)
+        self.model_key = register_voice(lang)
+        self.model_name = self.model_key
+
+        # Shared voice, stays resident after this instance stops (on the CPU once idle for a while)
+        self.tokenizer, self.model = models.acquire(self.model_key)
+        self.device = self.model.device
+        self.released = False
         self.memory = memory
-        
-        self.model.eval()
+
+        # Shared across T2S instances so cached phrases survive language switches
+        self.cache = cache if cache is not None else WaveformCache()
+
+        # Incremental mode synthesizes sentence/clause chunks and pushes each one when ready
+        self.incremental = incremental
+        self.fade_samples = int(self.model.config.sampling_rate * fade_ms / 1000)
 
         self.stop = False
 
@@ -27,14 +62,21 @@ class T2S:
         while not self.stop:
             """Synthesize speech from text using the TTS model with Langchain integration."""
             try:
-                text = self.memory.read_buffer_t2s()
+                message = self.memory.read_message_t2s()
+                text = message.content if message is not None else None
+                trace = message.trace if message is not None and message.trace is not None else NULL_TRACE
 
                 if text and not (text == '' or text == ' '):
-                    # Generate speech
-                    inputs = self.tokenizer(text, return_tensors="pt").to(self.device)
-                    output = self.model(**inputs)
-
-                    self.memory.add_output_audio(output.waveform.cpu().numpy()[0])
+                    trace.mark('tts_wait')
+                    if self.incremental:
+                        crossfader = Crossfader(self.fade_samples)
+                        for i, chunk in enumerate(split_clauses(text)):
+                            self._queue_audio(crossfader.push(self._synthesize(chunk)), trace if i == 0 else NULL_TRACE)
+                        self.memory.add_output_audio(crossfader.flush())
+                    else:
+                        self._queue_audio(self._synthesize(text), trace)
+                    # End of an utterance, a good moment to free memory
+                    models.reclaim()
                 else:
                     time.sleep(0.01)
                 
@@ -42,6 +84,27 @@ class T2S:
                 print(f"Error in speech synthesis: {str(e)}")
                 pass
 
+
+    def _queue_audio(self, waveform, trace=NULL_TRACE):
+        if trace is not NULL_TRACE:
+            # Audio already queued ahead of this utterance delays its first sample
+            trace.mark('tts')
+            metrics.observe('playout_queue', self.memory.get_audio_stats()['output_queued'] / self.memory.sample_rate)
+            trace.finish('audio_end_to_end')
+        self.memory.add_output_audio(waveform)
+
+
+    def _synthesize(self, text):
+        waveform = self.cache.get(self.model_name, text)
+        if waveform is None:
+            # Generate speech
+            inputs = self.tokenizer(text, return_tensors="pt").to(self.device)
+            output = self.model(**inputs)
+
+            waveform = output.waveform.float().cpu().numpy()[0]
+            self.cache.put(self.model_name, text, waveform)
+        return waveform
+
         
     def start(self):
         self.stop = False
@@ -50,4 +113,7 @@ class T2S:
     
 
     def stop_t2s(self):
-        self.stop = True
\ No newline at end of file
+        self.stop = True
+        if not self.released:
+            self.released = True
+            models.release(self.model_key)
\ No newline at end of file
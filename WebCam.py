@@ -1,14 +1,16 @@
 import cv2
 import threading
 import time
-import numpy as np
-from PIL import ImageFont, ImageDraw, Image
+from subtitle_renderer import SubtitleRenderer
 
 
 class WebCam:
-    def __init__(self, memory, src=0):
+    def __init__(self, memory, src=0, font_path="C:\\Windows\\Fonts\\arial.ttf", font_size=25):
         self.stream = cv2.VideoCapture(src)
 
+        # imshow expects BGR, so the sprite is built in BGR order and blended directly
+        self.subtitles = SubtitleRenderer(font_path=font_path, font_size=font_size, channel_order='bgr')
+
         self.memory = memory
 
         self.stop = False
@@ -26,18 +28,10 @@ class WebCam:
             if not ret:
                 break
 
-            text = self.memory.read_buffer_subtitle()
+            text = self.memory.read_buffer_subtitle(block=False)
 
             if text:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame)
-
-                font = ImageFont.truetype("C:\Windows\Fonts\\arial.ttf", 25)
-                draw = ImageDraw.Draw(pil_image)
-                draw.text((225, 100), text, font=font, anchor='ms')
-
-                frame = np.asarray(pil_image)
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                self.subtitles.overlay(frame, text, (225, 100))
         
             cv2.imshow('Zoom', frame)
 
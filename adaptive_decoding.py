@@ -0,0 +1,110 @@
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Tuple
+from metrics import metrics
+
+# Decode options replaced by the policy on each pass
+PASS_OPTIONS = ('beam_size', 'best_of', 'temperature', 'patience')
+
+
+@dataclass(frozen=True)
+class DecodingPolicy:
+    """When a greedy Whisper decode is trusted, and what to fall back to when it isn't.
+
+    A decode is retried when a segment's average log-probability drops below
+    `logprob_threshold` or its compression ratio (repetition) exceeds
+    `compression_ratio_threshold`. The first retry uses beam search; if that is
+    still below the bar, Whisper's temperature fallback samples at
+    `temperatures`. Segments with a no-speech probability above
+    `no_speech_threshold` and a low log-probability count as silence.
+    """
+
+    logprob_threshold: float = -1.0
+    compression_ratio_threshold: float = 2.4
+    no_speech_threshold: float = 0.6
+    beam_size: int = 5
+    best_of: int = 5
+    temperatures: Tuple[float, ...] = (0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+    def needs_fallback(self, avg_logprob: float, compression_ratio: float) -> bool:
+        return avg_logprob < self.logprob_threshold or compression_ratio > self.compression_ratio_threshold
+
+
+    def is_silence(self, avg_logprob: float, no_speech_prob: float) -> bool:
+        return no_speech_prob > self.no_speech_threshold and avg_logprob < self.logprob_threshold
+
+
+    def thresholds(self) -> dict:
+        """Keyword arguments for whisper's transcribe(), so it skips silent windows the same way"""
+        return dict(logprob_threshold=self.logprob_threshold,
+                    compression_ratio_threshold=self.compression_ratio_threshold,
+                    no_speech_threshold=self.no_speech_threshold)
+
+
+SAMPLE_RATE = 16000
+
+
+def _needs_fallback(policy: DecodingPolicy, segment: dict) -> bool:
+    return policy.needs_fallback(segment['avg_logprob'], segment['compression_ratio'])
+
+
+def _shift(segments: list, offset: float) -> list:
+    """Move segment and word timestamps of a re-decoded clip back onto the input's timeline"""
+    shifted = []
+    for segment in segments:
+        segment = dict(segment, start=segment['start'] + offset, end=segment['end'] + offset)
+        if segment.get('words'):
+            segment['words'] = [dict(w, start=w['start'] + offset, end=w['end'] + offset) for w in segment['words']]
+        shifted.append(segment)
+    return shifted
+
+
+def _redecode(model, audio: np.ndarray, segment: dict, policy: DecodingPolicy, options: dict) -> Tuple[list, str]:
+    """Beam search, then temperature sampling, on just the audio of one low-confidence segment"""
+    clip = audio[int(segment['start'] * SAMPLE_RATE):int(np.ceil(segment['end'] * SAMPLE_RATE))]
+    if len(clip) == 0:
+        return [segment], 'greedy'
+    result = model.transcribe(clip, temperature=0.0, beam_size=policy.beam_size, **options)
+    path = 'beam'
+    if policy.temperatures and (not result['segments'] or any(_needs_fallback(policy, s) for s in result['segments'])):
+        result = model.transcribe(clip, temperature=policy.temperatures, best_of=policy.best_of, **options)
+        path = 'temperature'
+    # Nothing better came out: keep the greedy text rather than lose it
+    if not result['segments']:
+        return [segment], path
+    return _shift(result['segments'], segment['start']), path
+
+
+def transcribe_adaptive(model, audio: np.ndarray, policy: DecodingPolicy, **options) -> Tuple[dict, str]:
+    """Greedy first, beam search and then temperature sampling only for low-confidence segments.
+
+    Segments the policy considers silence are dropped. Only the audio of
+    segments that fail the policy is decoded again, the rest keep their greedy
+    text. Returns whisper's transcribe() result and the costliest path taken:
+    'greedy', 'beam', 'temperature' or 'no_speech'. Decode time is recorded
+    per path.
+    """
+    options = {k: v for k, v in options.items() if k not in PASS_OPTIONS}
+    options.update(policy.thresholds())
+    start = time.monotonic()
+
+    result = model.transcribe(audio, temperature=0.0, beam_size=None, **options)
+    segments = [s for s in result['segments'] if not policy.is_silence(s['avg_logprob'], s['no_speech_prob'])]
+    path = 'greedy' if segments else 'no_speech'
+
+    decoded = []
+    for segment in segments:
+        if _needs_fallback(policy, segment):
+            redone, segment_path = _redecode(model, audio, segment, policy, options)
+            decoded.extend(redone)
+            if segment_path == 'temperature' or path == 'greedy':
+                path = segment_path
+        else:
+            decoded.append(segment)
+
+    result = dict(result, segments=decoded, text=''.join(s['text'] for s in decoded))
+    metrics.observe(f'asr_decode_{path}', time.monotonic() - start)
+    metrics.inc(f'asr_path_{path}')
+    return result, path
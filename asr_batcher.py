@@ -0,0 +1,168 @@
+import dataclasses
+import queue
+import threading
+import time
+import numpy as np
+import torch
+import whisper
+from concurrent.futures import Future
+from typing import List, Optional
+from adaptive_decoding import DecodingPolicy
+from metrics import metrics
+
+
+class BatchedTranscriber:
+    """Shares one Whisper model between many sessions by batching their segments.
+
+    Sessions `submit` closed speech segments and get a Future for the text. A
+    single worker collects whatever is pending, waiting at most `max_wait`
+    seconds for a batch to fill, and decodes up to `max_batch` segments per
+    forward pass. Segments are grouped by language since a decode pass uses
+    one language token. With a `decoding_policy` the batch is decoded greedily
+    and only low-confidence segments are re-decoded with beam search, then
+    temperature sampling.
+    """
+
+    def __init__(self, model, max_batch: int = 8, max_wait: float = 0.05,
+                 fp16: Optional[bool] = None, beam_size: Optional[int] = None,
+                 decoding_policy: Optional[DecodingPolicy] = DecodingPolicy()):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.fp16 = model.device.type == 'cuda' if fp16 is None else fp16
+        self.beam_size = beam_size
+        self.policy = decoding_policy
+        self.requests = queue.Queue()
+        self.stop = False
+
+        # Statistics
+        self.stats_lock = threading.Lock()
+        self.batches = 0
+        self.segments = 0
+        self.largest_batch = 0
+        self.decode_seconds = 0.0
+        self.paths = {'greedy': 0, 'beam': 0, 'temperature': 0, 'no_speech': 0}
+
+
+    def start(self):
+        self.stop = False
+        threading.Thread(target=self.update, args=(), daemon=True).start()
+
+
+    def submit(self, audio: np.ndarray, language: str) -> Future:
+        future = Future()
+        self.requests.put((audio, language, future))
+        return future
+
+
+    def update(self):
+        while not self.stop:
+            try:
+                first = self.requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Give concurrent sessions a moment to join the batch
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            languages = {}
+            for request in batch:
+                languages.setdefault(request[1], []).append(request)
+            for language, requests in languages.items():
+                self._decode(language, requests)
+
+
+    @torch.no_grad()
+    def _decode(self, language: str, requests: List[tuple]) -> None:
+        start = time.monotonic()
+        try:
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(self._normalize(audio)), n_mels=self.model.dims.n_mels)
+                for audio, _, _ in requests
+            ]).to(self.model.device)
+            options = whisper.DecodingOptions(
+                language=language,
+                task='transcribe',
+                without_timestamps=True,
+                fp16=self.fp16,
+                beam_size=None if self.policy is not None else self.beam_size
+            )
+            results = whisper.decode(self.model, mels, options)
+            paths = ['greedy'] * len(results)
+            if self.policy is not None:
+                self._fallback(mels, options, results, paths)
+        except Exception as e:
+            for _, _, future in requests:
+                future.set_exception(e)
+            return
+
+        elapsed = time.monotonic() - start
+        metrics.observe('asr_batch', elapsed)
+        with self.stats_lock:
+            self.batches += 1
+            self.segments += len(requests)
+            self.largest_batch = max(self.largest_batch, len(requests))
+            self.decode_seconds += elapsed
+
+        for (_, _, future), result, path in zip(requests, results, paths):
+            # Same silence test whisper.transcribe applies to a window
+            if self.policy is not None:
+                silent = self.policy.is_silence(result.avg_logprob, result.no_speech_prob)
+            else:
+                silent = result.no_speech_prob > 0.6 and result.avg_logprob < -1.0
+            if silent:
+                path = 'no_speech'
+            metrics.inc(f'asr_path_{path}')
+            with self.stats_lock:
+                self.paths[path] += 1
+            future.set_result('' if silent else result.text.strip())
+
+
+    def _fallback(self, mels: torch.Tensor, options, results: list, paths: List[str]) -> None:
+        """Re-decode the low-confidence entries of `results` in place, beam search first"""
+        passes = [('beam', dict(beam_size=self.policy.beam_size))]
+        passes += [('temperature', dict(temperature=t, best_of=self.policy.best_of)) for t in self.policy.temperatures]
+
+        for path, changes in passes:
+            retry = [i for i, r in enumerate(results)
+                     if not self.policy.is_silence(r.avg_logprob, r.no_speech_prob)
+                     and self.policy.needs_fallback(r.avg_logprob, r.compression_ratio)]
+            if not retry:
+                return
+            retried = whisper.decode(self.model, mels[retry], dataclasses.replace(options, **changes))
+            for i, result in zip(retry, retried):
+                results[i] = result
+                paths[i] = path
+
+
+    @staticmethod
+    def _normalize(audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32)
+        peak = np.max(np.abs(audio)) if len(audio) else 0
+        return audio / peak if peak > 0 else audio
+
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return {
+                'batches': self.batches,
+                'segments': self.segments,
+                'mean_batch': self.segments / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'decode_seconds': self.decode_seconds,
+                **{f'path_{path}': count for path, count in self.paths.items()},
+                'pending': self.requests.qsize(),
+            }
+
+
+    def stop_transcriber(self):
+        self.stop = True
@@ -0,0 +1,212 @@
+import copy
+import json
+import os
+import threading
+import time
+import numpy as np
+import torch
+import whisper
+from typing import Optional, Union
+from model_registry import convert_precision, models
+
+WHISPER_MODEL = "large-v3-turbo"
+
+# Smallest (fastest) first
+WHISPER_SIZES = ('tiny', 'base', 'small', 'large-v3-turbo')
+
+SAMPLE_RATE = 16000
+
+# Whisper tokens per second of conversational speech, what a synthetic clip is decoded as
+SPEECH_TOKENS_PER_SECOND = 4.0
+
+
+def asr_device(device: Union[str, torch.device, None] = None) -> torch.device:
+    """The requested device, or CUDA when available"""
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return torch.device(device)
+
+
+def _plain_linears(model):
+    """Replace Linear subclasses with torch.nn.Linear modules holding the same parameters.
+
+    Whisper subclasses nn.Linear only to cast weights to the input dtype, and
+    quantize_dynamic only converts exact nn.Linear modules.
+    """
+    for parent in list(model.modules()):
+        for name, child in parent.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None,
+                                         device='meta')
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(parent, name, linear)
+    return model
+
+
+def quantize_int8(model):
+    """Int8 copy of a Whisper model with dynamically quantized linear layers, for CPU inference"""
+    plain = _plain_linears(copy.deepcopy(model))
+    return torch.ao.quantization.quantize_dynamic(plain, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _convert_whisper(model, precision: str):
+    return quantize_int8(model) if precision == 'int8' else convert_precision(model, precision)
+
+
+def register_whisper(name: str = WHISPER_MODEL, device=None, quantize: bool = True) -> str:
+    """Register a Whisper checkpoint with the model registry and return its key.
+
+    On CPU the weights are int8-quantized unless `quantize` is False, then
+    int8 is only used if fp32 doesn't fit the RAM budget. On GPU the weights
+    stay fp32 (decoding runs in fp16 either way) unless only fp16 fits.
+    """
+    device = asr_device(device)
+    int8 = quantize and device.type == 'cpu'
+    fp16 = device.type == 'cuda'
+    if device.type == 'cpu':
+        precisions = ('int8',) if int8 else ('fp32', 'int8')
+    else:
+        precisions = ('fp32', 'fp16')
+
+    def load():
+        # The registry picks the precision and moves the model to `device`
+        model = whisper.load_model(name, device='cpu', download_root="./models")
+        model.eval()
+        return model
+
+    def warmup(model):
+        # First decode pays for kernel selection and allocator growth
+        with torch.no_grad():
+            model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), language='english', fp16=fp16)
+
+    key = f"whisper:{name}:{device.type}" + (":int8" if int8 else "")
+    return models.register(key, load, warmup, device=device, precisions=precisions, convert=_convert_whisper)
+
+
+def reference_clip(path: Optional[str] = None, seconds: float = 10.0) -> np.ndarray:
+    """Calibration audio: the given speech recording, or a synthetic voiced signal with syllable-rate modulation.
+
+    Whisper transcribes next to nothing from the synthetic signal, so it is
+    decoded with a forced token count (see measure_rtf) to cost like speech.
+    """
+    if path:
+        return whisper.load_audio(path, sr=SAMPLE_RATE)
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    audio = voiced * envelope + 0.02 * rng.standard_normal(len(t))
+    return (0.3 * audio / np.max(np.abs(audio))).astype(np.float32)
+
+
+def measure_rtf(model, audio: np.ndarray, fp16: bool = False, beam_size: Optional[int] = None,
+                tokens: Optional[int] = None) -> float:
+    """Decode time divided by audio duration, for a single pass without temperature fallback.
+
+    Decode cost grows with the tokens Whisper emits. With `tokens`, the first
+    30 s window is decoded with end-of-text suppressed, so exactly that many
+    tokens are generated whatever the audio contains.
+    """
+    start = time.perf_counter()
+    with torch.no_grad():
+        if tokens is None:
+            model.transcribe(audio, language='english', fp16=fp16, beam_size=beam_size,
+                             temperature=0, condition_on_previous_text=False)
+            duration = len(audio) / SAMPLE_RATE
+        else:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+            tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+            options = whisper.DecodingOptions(language='english', without_timestamps=True, fp16=fp16,
+                                              beam_size=beam_size, temperature=0.0, sample_len=tokens,
+                                              suppress_tokens=[-1, tokenizer.eot])
+            whisper.decode(model, mel, options)
+            duration = min(len(audio), whisper.audio.N_SAMPLES) / SAMPLE_RATE
+    return (time.perf_counter() - start) / duration
+
+
+_selected = {}
+_select_lock = threading.Lock()
+
+
+def select_whisper_model(model: str = 'auto', device=None, max_rtf: float = 0.5, num_threads: Optional[int] = None,
+                         reference_path: Optional[str] = None,
+                         calibration_path: Optional[str] = './cache/asr_calibration.json') -> str:
+    """Registry key of the ASR model to run.
+
+    'auto' uses large-v3-turbo on GPU. On CPU it measures the real-time factor
+    of each size on a reference clip, smallest first, and picks the largest one
+    under `max_rtf`. Measurements are stored in `calibration_path` per device
+    and thread count, so later starts skip the calibration.
+    """
+    device = asr_device(device)
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    with _select_lock:
+        selection = (model, device.type, max_rtf, torch.get_num_threads())
+        if selection in _selected:
+            return _selected[selection]
+
+        if model != 'auto':
+            key = register_whisper(model, device)
+        elif device.type == 'cuda':
+            key = register_whisper(WHISPER_MODEL, device)
+        else:
+            key = register_whisper(_calibrate(device, max_rtf, reference_path, calibration_path), device)
+
+        _selected[selection] = key
+        return key
+
+
+def _calibrate(device: torch.device, max_rtf: float, reference_path: Optional[str],
+               calibration_path: Optional[str]) -> str:
+    profile = f"{device.type}:{torch.get_num_threads()}"
+    results = {}
+    if calibration_path and os.path.exists(calibration_path):
+        try:
+            with open(calibration_path) as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring ASR calibration file: {str(e)}")
+    # Synthetic measurements are kept apart from the ones made on a recording
+    if not reference_path:
+        profile += f":{SPEECH_TOKENS_PER_SECOND:g}tps"
+    measured = results.setdefault(profile, {})
+
+    audio = None
+    chosen = WHISPER_SIZES[0]
+    loaded = None
+    for name in WHISPER_SIZES:
+        key = None
+        if name not in measured:
+            if audio is None:
+                audio = reference_clip(reference_path)
+            tokens = None if reference_path else int(SPEECH_TOKENS_PER_SECOND * len(audio) / SAMPLE_RATE)
+            key = register_whisper(name, device)
+            measured[name] = measure_rtf(models.acquire(key), audio, fp16=device.type == 'cuda', tokens=tokens)
+            models.release(key)
+            print(f"ASR calibration: {name} runs at RTF {measured[name]:.2f}")
+
+        # Bigger models are only slower, stop at the first one over budget
+        if measured[name] > max_rtf:
+            if key is not None:
+                models.evict(key)
+            break
+        chosen = name
+        # Only the model finally chosen stays loaded
+        if loaded is not None:
+            models.evict(loaded)
+        loaded = key
+
+    if calibration_path and audio is not None:
+        if os.path.dirname(calibration_path):
+            os.makedirs(os.path.dirname(calibration_path), exist_ok=True)
+        with open(calibration_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    print(f"Selected Whisper {chosen} for {profile} (max RTF {max_rtf})")
+    return chosen
@@ -1,140 +1,198 @@
+import itertools
+import os
 import threading
+import time
 import numpy as np
-from dataclasses import dataclass
 from typing import Any, List, Optional
-import time
+from ring_buffer import AudioRingBuffer
+from message_bus import Message, MessageBus, Subscription
+from history_store import HistoryEntry, HistoryStore
 
-@dataclass
-class BufferState:
-    content: Any
-    webcam_reads: int = 0
-    t2s_has_read: bool = False
-    timestamp: float = 0.0
+# Numbers the sessions of this process, so every AsyncMemory gets its own history log
+_session_ids = itertools.count()
 
 class AsyncMemory:
-    def __init__(self, required_webcam_reads: int = 3):
-        self.required_webcam_reads = required_webcam_reads
-        self.buffer = None
-        self.buffer_lock = threading.Lock()
-        self.buffer_updated = threading.Condition(self.buffer_lock)  # Changed to Condition
+    def __init__(self, retention: int = 256, sample_rate: int = 16000,
+                 input_audio_seconds: float = 30.0, output_audio_seconds: float = 60.0,
+                 history_path: Optional[str] = 'auto', history_window: int = 1000):
+        # Transcripts/translations go out on a non-blocking bus, each consumer keeps its own cursor
+        self.bus = MessageBus(retention=retention)
+        self.subtitle_subscription = self.bus.subscribe('subtitle', mode='latest')
+        self.t2s_subscription = self.bus.subscribe('t2s', mode='queue')
+        self.subtitle = None
+        self.subtitle_seq = -1
+
+        # Progressive translations of transcripts not published yet, by sequence number
+        self.previews = {}
+        self.published_seq = -1
         
-        # History
-        self.org_text_history = []
-        self.trans_text_history = []
-        self.history_lock = threading.Lock()
+        # Partial (uncommitted) transcript from streaming transcription, shown as the subtitle until its final
+        self.partial_transcript = ''
+        self.partial_lock = threading.Lock()
+
+        # History: bounded in memory, full session spilled to ./cache/history
+        if history_path == 'auto':
+            # Resets within the same second must not append to the previous session's log
+            history_path = f"./cache/history/session-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_session_ids)}.log"
+        self.history = HistoryStore(history_path, window=history_window)
         
-        # Audio buffers
-        self.input_audio_buffer = []
-        self.output_audio_buffer = []
+        # Audio buffers (preallocated float32 ring buffers)
+        self.sample_rate = sample_rate
+        self.input_audio_buffer = AudioRingBuffer(int(sample_rate * input_audio_seconds))
+        self.output_audio_buffer = AudioRingBuffer(int(sample_rate * output_audio_seconds))
         self.audio_lock = threading.Lock()
 
 
-    def write_buffer(self, content: Any) -> None:
-        """S2TT writes to buffer - only when previous buffer is fully consumed"""
-        with self.buffer_updated:
-            # Wait until previous buffer has been fully processed
-            while (self.buffer is not None and 
-                   (self.buffer.webcam_reads < self.required_webcam_reads or 
-                    not self.buffer.t2s_has_read)):
-                self.buffer_updated.wait()
+    def write_buffer(self, content: Any, seq: Optional[int] = None, trace: Any = None) -> int:
+        """S2TT publishes a new buffer - never waits for consumers"""
+        seq = self.bus.publish(content, seq=seq, trace=trace)
+        # The final replaces its preview, whether or not a subtitle reader is running
+        with self.partial_lock:
+            self.published_seq = max(self.published_seq, seq)
+            for stale in [s for s in self.previews if s <= seq]:
+                del self.previews[stale]
+        return seq
+
+
+    def subscribe(self, name: str, mode: str = 'queue') -> Subscription:
+        """Additional consumers (e.g. loggers) get their own cursor on the bus"""
+        return self.bus.subscribe(name, mode)
+
+
+    def read_buffer_subtitle(self, block: bool = True) -> Optional[Any]:
+        """Webcam reads the latest buffer - can read it any number of times.
+
+        A translation still streaming in takes precedence, then the partial
+        transcript of the utterance in progress, then the last final.
+        """
+        message = self.subtitle_subscription.poll()
+        if message is None and self.subtitle is None and block:
+            message = self.subtitle_subscription.get()
+        with self.partial_lock:
+            if message is not None:
+                self.subtitle = message.content
+                self.subtitle_seq = message.seq
+            # The next transcript in order, while its translation is still streaming in
+            preview = self.previews.get(self.subtitle_seq + 1)
+            if preview is not None:
+                return preview
+            # Otherwise what is being said right now, until its final is published
+            if self.partial_transcript:
+                return self.partial_transcript
+        return self.subtitle
+
+
+    def set_subtitle_preview(self, seq: int, text: str) -> None:
+        """Show a translation in progress until the final for `seq` is published"""
+        with self.partial_lock:
+            if seq > self.published_seq:
+                self.previews[seq] = text
             
-            # Create new buffer
-            self.buffer = BufferState(content=content, timestamp=time.time())
-            self.buffer_updated.notify_all()  # Wake up all waiting readers
 
+    def read_buffer_t2s(self, timeout: Optional[float] = 0.1) -> Optional[Any]:
+        """T2S reads every buffer once, in order. Returns None if nothing new arrived in time"""
+        message = self.read_message_t2s(timeout)
+        return message.content if message is not None else None
 
-    def read_buffer_subtitle(self) -> Optional[Any]:
-        """Webcam reads from buffer - can read multiple times"""
-        with self.buffer_updated:
-            # Wait for new content
-            while self.buffer is None:
-                self.buffer_updated.wait()
-            
-            if self.buffer.webcam_reads < self.required_webcam_reads:
-                self.buffer.webcam_reads += 1
-                content = self.buffer.content
-                
-                # Check if buffer is fully consumed
-                self._check_buffer_consumed()
-                return content
-            else:
-                # Already read enough times
-                return self.buffer.content
-            
-
-    def read_buffer_t2s(self) -> Optional[Any]:
-        """T2S reads from buffer - only once per buffer"""
-        with self.buffer_updated:
-            # Wait for new content
-            while self.buffer is None:
-                self.buffer_updated.wait()
-            
-            if not self.buffer.t2s_has_read:
-                self.buffer.t2s_has_read = True
-                content = self.buffer.content
-                
-                # Check if buffer is fully consumed
-                self._check_buffer_consumed()
-                return content
-            else:
-                # Already read this buffer
-                return None
-            
 
-    def _check_buffer_consumed(self):
-        """Check if buffer has been fully consumed and notify writers"""
-        if (self.buffer and 
-            self.buffer.webcam_reads >= self.required_webcam_reads and 
-            self.buffer.t2s_has_read):
-            self.buffer_updated.notify_all()  # Allow new writes
+    def read_message_t2s(self, timeout: Optional[float] = 0.1) -> Optional[Message]:
+        """Like read_buffer_t2s, but returns the whole message (seq, trace, ...)"""
+        return self.t2s_subscription.get(timeout)
 
 
     def wait_for_new_buffer(self, last_timestamp: float = 0) -> Optional[Any]:
         """Wait for a buffer newer than the given timestamp"""
-        with self.buffer_updated:
-            while (self.buffer is None or 
-                   self.buffer.timestamp <= last_timestamp):
-                self.buffer_updated.wait()
-            return self.buffer.content, self.buffer.timestamp
+        with self.bus.updated:
+            self.bus.updated.wait_for(
+                lambda: self.bus.messages and self.bus.messages[-1].timestamp > last_timestamp)
+            message = self.bus.messages[-1]
+            return message.content, message.timestamp
         
 
-    # Audio buffer methods (unchanged)
+    # Partial transcript methods (never block)
+    def set_partial_transcript(self, text: str) -> None:
+        with self.partial_lock:
+            self.partial_transcript = text
+
+
+    def get_partial_transcript(self) -> str:
+        with self.partial_lock:
+            return self.partial_transcript
+
+
+    # Audio buffer methods
     def add_input_audio(self, audio):
         with self.audio_lock:
-            self.input_audio_buffer.extend(audio)
+            self.input_audio_buffer.write(audio)
 
 
-    def get_input_audio(self):
+    def get_input_audio(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Drain queued input audio as one contiguous float32 array"""
         with self.audio_lock:
-            audio = self.input_audio_buffer.copy()
-            self.input_audio_buffer.clear()
-            return audio
+            return self.input_audio_buffer.read(max_samples)
         
 
     def add_output_audio(self, audio):
         with self.audio_lock:
-            self.output_audio_buffer.extend(audio)
+            self.output_audio_buffer.write(audio)
 
 
-    def get_output_audio(self):
+    def get_output_audio(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Drain queued output audio as one contiguous float32 array (empty if none)"""
         with self.audio_lock:
-            if self.output_audio_buffer:
-                audio = self.output_audio_buffer.copy()
-                self.output_audio_buffer.clear()
-                return np.array(audio)
-            return np.array([])
+            return self.output_audio_buffer.read(max_samples)
+
+
+    def read_output_audio_into(self, out: np.ndarray) -> int:
+        """Copy queued output audio into a caller-owned array, returns samples written"""
+        with self.audio_lock:
+            return self.output_audio_buffer.read_into(out)
+
+
+    def get_bus_stats(self) -> dict:
+        return {
+            't2s_lag': self.t2s_subscription.lag(),
+            't2s_dropped': self.t2s_subscription.dropped,
+            'published': self.bus.next_seq,
+        }
+
+
+    def get_audio_stats(self) -> dict:
+        with self.audio_lock:
+            return {
+                'input_queued': len(self.input_audio_buffer),
+                'input_overflows': self.input_audio_buffer.overflow_count,
+                'input_dropped_samples': self.input_audio_buffer.dropped_samples,
+                'output_queued': len(self.output_audio_buffer),
+                'output_overflows': self.output_audio_buffer.overflow_count,
+                'output_dropped_samples': self.output_audio_buffer.dropped_samples,
+            }
         
 
     # History methods (thread-safe)
-    def add_to_history(self, text: str, is_original: bool = True):
-        with self.history_lock:
-            if is_original:
-                self.org_text_history.append(text)
-            else:
-                self.trans_text_history.append(text)
-
-
-    def get_history(self, is_original: bool = True) -> List[str]:
-        with self.history_lock:
-            return (self.org_text_history.copy() if is_original 
-                   else self.trans_text_history.copy())
\ No newline at end of file
+    def add_to_history(self, original: str, translation: str, seq: Optional[int] = None):
+        """Record an original/translated pair, blank segments are skipped"""
+        if not original.strip() and not translation.strip():
+            return
+        if seq is None:
+            seq = len(self.history)
+        self.history.append(seq, original, translation)
+
+
+    def get_history(self, is_original: bool = True, last_n: Optional[int] = None) -> List[str]:
+        """Texts from the in-memory window (the most recent `last_n` if given)"""
+        entries = self.history.latest(last_n if last_n is not None else self.history.window.maxlen)
+        return [e.original if is_original else e.translation for e in entries]
+
+
+    def get_history_range(self, start_seq: Optional[int] = None, end_seq: Optional[int] = None,
+                          start_time: Optional[float] = None, end_time: Optional[float] = None) -> List[HistoryEntry]:
+        """Entries in [start_seq, end_seq) or, if times are given, in [start_time, end_time)"""
+        if start_time is not None or end_time is not None:
+            return self.history.range_by_time(start_time, end_time)
+        return self.history.range_by_seq(start_seq, end_seq)
+
+
+    def close(self) -> None:
+        """Close the on-disk history log. The history stays readable, but nothing more can be added"""
+        self.history.close()
@@ -0,0 +1,351 @@
+import argparse
+import json
+import resource
+import threading
+import time
+import wave
+import numpy as np
+from typing import List
+from async_memory import AsyncMemory
+from S2TT import S2TT
+from jitter_buffer import JitterBuffer
+from metrics import metrics
+from resampler import PolyphaseResampler
+from translation_cache import TranslationCache
+from translator import FakeStreamingEngine
+from video_pipeline import PIXEL_FORMATS, FrameCompositor
+
+
+def load_wav(path: str, rate: int = 16000) -> np.ndarray:
+    """Read a PCM WAV file as mono float32 at `rate`"""
+    with wave.open(path, 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        source_rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        audio = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768
+    elif width == 4:
+        audio = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width in {path}: {width} bytes")
+
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if source_rate != rate:
+        # Same resampling as live capture, so recordings at 44.1/48 kHz are a fair stand-in
+        audio = PolyphaseResampler(source_rate, rate).process(audio)
+    return audio.astype(np.float32, copy=False)
+
+
+class WavAudioSource:
+    """InputAudio stand-in that plays WAV files into AsyncMemory at `speed` x real time"""
+
+    def __init__(self, memory, paths: List[str], speed: float = 1.0, chunk: int = 1024, rate: int = 16000):
+        self.memory = memory
+        self.CHUNK = chunk
+        self.RATE = rate
+        self.speed = speed
+        self.audio = np.concatenate([load_wav(path, rate) for path in paths])
+        self.duration = len(self.audio) / rate
+
+        self.data = None
+        self.stop = False
+        self.listeners = []
+        self.start_time = None
+        self.finished = threading.Event()
+
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+
+    def start(self):
+        print(f"Feeding {self.duration:.1f}s of audio at {self.speed}x...")
+        self.start_time = time.monotonic()
+        threading.Thread(target=self.update, args=(), daemon=True).start()
+
+
+    def stop_stream(self):
+        self.stop = True
+
+
+    def update(self):
+        for position in range(0, len(self.audio), self.CHUNK):
+            if self.stop:
+                break
+            samples = self.audio[position:position + self.CHUNK]
+            self.data = samples.tobytes()
+            self.memory.add_input_audio(samples)
+            for listener in self.listeners:
+                listener(samples)
+
+            # Pace the feed like a microphone would
+            due = self.start_time + (position + len(samples)) / (self.RATE * self.speed)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.finished.set()
+
+
+class RecordingVideoSink:
+    """VirtualCamera stand-in: composites subtitles over a still capture at a fixed fps"""
+
+    def __init__(self, memory, width: int = 1280, height: int = 720, fps: int = 30, output_format: str = 'bgr'):
+        self.memory = memory
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.compositor = FrameCompositor(width, height, source_format='bgr', output_format=output_format)
+        self.background = np.full((height, width, 3), 64, dtype=np.uint8)
+        self.frame = self.compositor.output
+
+        self.stop = False
+        self.thread = None
+        self.frames_sent = 0
+        self.late_frames = 0
+        self.send_seconds = 0.0
+        self.subtitle_changes = []
+
+
+    def start(self):
+        self.stop = False
+        self.thread = threading.Thread(target=self.stream, args=(), daemon=True)
+        self.thread.start()
+
+
+    def stream(self):
+        start = time.monotonic()
+        last_text = None
+        while not self.stop:
+            began = time.monotonic()
+            text = self.memory.read_buffer_subtitle(block=False)
+            # The background is capture 1 forever, so only subtitle changes cost a compose
+            self.frame = self.compositor.compose(self.background, 1, text)
+            self.send_seconds += time.monotonic() - began
+            if text != last_text:
+                self.subtitle_changes.append((began - start, text))
+                last_text = text
+
+            self.frames_sent += 1
+            delay = start + self.frames_sent / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_frames += 1
+
+
+    def get_stats(self) -> dict:
+        return {
+            'frames_sent': self.frames_sent,
+            'late_frames': self.late_frames,
+            'compose_ms_per_frame': 1000 * self.send_seconds / self.frames_sent if self.frames_sent else 0.0,
+            'subtitle_changes': len(self.subtitle_changes),
+            'output_format': self.compositor.output_format,
+            **self.compositor.stats(),
+        }
+
+
+    def stop_stream(self):
+        self.stop = True
+        if self.thread is not None:
+            self.thread.join(1.0)
+
+
+class RecordingAudioSink:
+    """OutputAudio stand-in: pulls 20 ms frames from the TTS queue in real time and counts them"""
+
+    def __init__(self, memory, rate: int = 16000, chunk: int = 320):
+        self.memory = memory
+        self.RATE = rate
+        self.CHUNK = chunk
+        self.jitter = JitterBuffer(memory.output_audio_buffer, memory.audio_lock, prefill_samples=2 * chunk)
+        self.frame = np.zeros(chunk, dtype=np.float32)
+        self.samples_played = 0
+        self.stop = False
+
+
+    def start(self):
+        self.stop = False
+        threading.Thread(target=self.play_audio, args=(), daemon=True).start()
+
+
+    def play_audio(self):
+        start = time.monotonic()
+        frames = 0
+        while not self.stop:
+            self.samples_played += self.jitter.pull(self.frame)
+            frames += 1
+            delay = start + frames * self.CHUNK / self.RATE - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+    def get_stats(self) -> dict:
+        stats = self.jitter.stats()
+        stats['seconds_played'] = self.samples_played / self.RATE
+        return stats
+
+
+    def stop_stream(self):
+        self.stop = True
+
+
+class LatencyRecorder:
+    """Follows every published transcript and measures speech end -> subtitle latency"""
+
+    def __init__(self, memory, source: WavAudioSource):
+        self.subscription = memory.subscribe('benchmark')
+        self.source = source
+        self.latencies = []
+        self.transcripts = []
+        self.stop = False
+
+
+    def start(self):
+        self.stop = False
+        threading.Thread(target=self.update, args=(), daemon=True).start()
+
+
+    def update(self):
+        while not self.stop:
+            message = self.subscription.get(timeout=0.1)
+            if message is None or not str(message.content).strip():
+                continue
+            self.transcripts.append(message.content)
+            trace = message.trace
+            if trace is None or 'audio_end' not in trace.annotations or 'reorder' not in trace.marks:
+                continue
+            # Wall-clock time at which the source fed the end of this utterance
+            spoken = self.source.start_time + trace.annotations['audio_end'] / self.source.speed
+            self.latencies.append(trace.marks['reorder'] - spoken)
+
+
+    def stop_recording(self):
+        self.stop = True
+
+
+def percentiles(values, points=(50, 90, 99)) -> dict:
+    if not values:
+        return {f'p{p}_ms': None for p in points}
+    return {f'p{p}_ms': 1000 * float(np.percentile(values, p)) for p in points}
+
+
+def run_benchmark(args) -> dict:
+    metrics.enable()
+    memory = AsyncMemory(history_path=None)
+    s2tt = S2TT(memory=memory, in_lang=args.in_lang, out_lang=args.out_lang, mode=args.mode,
+                translator=FakeStreamingEngine(args.translate_delay, args.token_interval),
+                translation_cache=TranslationCache(db_path=None),
+                asr_model=args.asr_model, device=args.asr_device, num_threads=args.asr_threads, max_rtf=args.max_rtf,
+                streaming_translation=not args.no_streaming_translation)
+    t2s = None
+    if args.tts_lang:
+        from T2S import T2S
+        t2s = T2S(memory=memory, lang=args.tts_lang)
+
+    source = WavAudioSource(memory, args.wav, speed=args.speed)
+    video = RecordingVideoSink(memory, output_format=args.video_format)
+    audio = RecordingAudioSink(memory)
+    recorder = LatencyRecorder(memory, source)
+
+    if t2s is not None:
+        t2s.start()
+    video.start()
+    audio.start()
+    recorder.start()
+    s2tt.start()
+    source.start()
+
+    source.finished.wait()
+    time.sleep(args.tail)
+    wall_seconds = time.monotonic() - source.start_time
+
+    source.stop_stream()
+    s2tt.stop_s2tt()
+    if t2s is not None:
+        t2s.stop_t2s()
+    video.stop_stream()
+    audio.stop_stream()
+    recorder.stop_recording()
+
+    snapshot = metrics.snapshot()
+    asr = metrics.histograms.get('asr')
+    asr_seconds = asr.total if asr is not None else 0.0
+    words = sum(len(str(t).split()) for t in recorder.transcripts)
+
+    return {
+        'config': {
+            'wav': args.wav,
+            'mode': args.mode,
+            'in_lang': args.in_lang,
+            'out_lang': args.out_lang,
+            'tts_lang': args.tts_lang,
+            'speed': args.speed,
+            'video_format': args.video_format,
+            'translate_delay': args.translate_delay,
+            'token_interval': args.token_interval,
+            'streaming_translation': not args.no_streaming_translation,
+            'asr_model': s2tt.model_key,
+        },
+        'audio_seconds': source.duration,
+        'wall_seconds': wall_seconds,
+        'real_time_factor': asr_seconds / source.duration if source.duration else None,
+        'end_to_end_latency': dict(percentiles(recorder.latencies), count=len(recorder.latencies)),
+        'throughput': {
+            'transcripts': len(recorder.transcripts),
+            'words': words,
+            'words_per_audio_second': words / source.duration if source.duration else 0.0,
+            'audio_seconds_per_wall_second': source.duration / wall_seconds if wall_seconds else 0.0,
+        },
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': snapshot['stages'],
+        'counters': snapshot['counters'],
+        'video': video.get_stats(),
+        'audio_out': audio.get_stats(),
+        'audio_in': memory.get_audio_stats(),
+        'translation': s2tt.pipeline.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless offline benchmark of the translation pipeline")
+    parser.add_argument('--wav', nargs='+', required=True, help="WAV files fed in order as the microphone")
+    parser.add_argument('--mode', choices=['interval', 'streaming'], default='interval')
+    parser.add_argument('--in-lang', default='english')
+    parser.add_argument('--out-lang', default='german')
+    parser.add_argument('--asr-model', default='auto', help="auto, tiny, base, small or large-v3-turbo")
+    parser.add_argument('--asr-device', default=None, help="cpu or cuda (default: cuda when available)")
+    parser.add_argument('--asr-threads', type=int, default=None)
+    parser.add_argument('--max-rtf', type=float, default=0.5, help="Real-time factor budget for --asr-model auto")
+    parser.add_argument('--tts-lang', default=None, help="MMS-TTS language code, e.g. deu (default: no TTS)")
+    parser.add_argument('--speed', type=float, default=1.0, help="Feed speed relative to real time")
+    parser.add_argument('--translate-delay', type=float, default=0.0, help="Fake translator first-token latency in seconds")
+    parser.add_argument('--token-interval', type=float, default=0.0, help="Fake translator delay between words")
+    parser.add_argument('--no-streaming-translation', action='store_true', help="Show subtitles only once translated")
+    parser.add_argument('--video-format', default='bgr', choices=PIXEL_FORMATS,
+                        help="Pixel format handed to the virtual camera")
+    parser.add_argument('--tail', type=float, default=5.0, help="Seconds to keep running after the audio ends")
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    latency = results['end_to_end_latency']
+    print(f"RTF {results['real_time_factor']:.3f} | "
+          f"latency p50 {latency['p50_ms']} ms, p90 {latency['p90_ms']} ms | "
+          f"peak RSS {results['peak_rss_mb']:.0f} MB")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+# seq, timestamp, original length, translation length
+RECORD_HEADER = struct.Struct('<qdII')
+
+
+@dataclass
+class HistoryEntry:
+    seq: int
+    timestamp: float
+    original: str
+    translation: str
+
+
+class HistoryStore:
+    """Paired original/translated transcript history.
+
+    The newest `window` entries are kept in memory. Every entry is also
+    appended to a compact binary log on disk, with a sparse (seq, time, offset)
+    index every `index_every` records, so range queries only read the
+    requested slice. Without a `path` the store is memory-only; an existing
+    file at `path` is overwritten, since the index only covers this session.
+    Appending after `close` raises ValueError.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = 1000, index_every: int = 64):
+        self.window = deque(maxlen=window)
+        self.index_every = index_every
+        self.lock = threading.Lock()
+        self.count = 0
+
+        self.path = path
+        self.log = None
+        self.closed = False
+        self.index_seqs = array('q')
+        self.index_times = array('d')
+        self.index_offsets = array('q')
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.log = open(path, 'wb')
+
+
+    def __len__(self) -> int:
+        return self.count
+
+
+    def append(self, seq: int, original: str, translation: str, timestamp: Optional[float] = None) -> None:
+        """Record a segment. Sequence numbers and timestamps must not decrease"""
+        entry = HistoryEntry(seq, timestamp if timestamp is not None else time.time(), original, translation)
+        with self.lock:
+            if self.closed:
+                raise ValueError("append to a closed history store")
+            if self.log is not None:
+                original_bytes = original.encode('utf-8')
+                translation_bytes = translation.encode('utf-8')
+                if self.count % self.index_every == 0:
+                    self.index_seqs.append(entry.seq)
+                    self.index_times.append(entry.timestamp)
+                    self.index_offsets.append(self.log.tell())
+                self.log.write(RECORD_HEADER.pack(entry.seq, entry.timestamp,
+                                                  len(original_bytes), len(translation_bytes)))
+                self.log.write(original_bytes)
+                self.log.write(translation_bytes)
+                self.log.flush()
+
+            self.window.append(entry)
+            self.count += 1
+
+
+    def latest(self, n: int = 1) -> List[HistoryEntry]:
+        with self.lock:
+            return list(self.window)[-n:] if n > 0 else []
+
+
+    def range_by_seq(self, start: Optional[int] = None, end: Optional[int] = None) -> List[HistoryEntry]:
+        """Entries with start <= seq < end"""
+        return self._range('seq', self.index_seqs, start, end)
+
+
+    def range_by_time(self, start: Optional[float] = None, end: Optional[float] = None) -> List[HistoryEntry]:
+        """Entries with start <= timestamp < end"""
+        return self._range('timestamp', self.index_times, start, end)
+
+
+    def _range(self, field: str, index, start, end) -> List[HistoryEntry]:
+        with self.lock:
+            in_memory = (self.path is None or not self.window or
+                         (start is not None and start >= getattr(self.window[0], field)))
+            if in_memory:
+                keys = [getattr(e, field) for e in self.window]
+                lo = 0 if start is None else bisect_left(keys, start)
+                hi = len(keys) if end is None else bisect_left(keys, end)
+                return list(self.window)[lo:hi]
+
+            # Older than the in-memory window: seek to the nearest indexed record
+            position = 0 if start is None else max(0, bisect_right(index, start) - 1)
+            offset = self.index_offsets[position] if len(self.index_offsets) else 0
+            return self._scan_log(field, offset, start, end)
+
+
+    def _scan_log(self, field: str, offset: int, start, end) -> List[HistoryEntry]:
+        entries = []
+        with open(self.path, 'rb') as log:
+            log.seek(offset)
+            while True:
+                header = log.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                seq, timestamp, original_length, translation_length = RECORD_HEADER.unpack(header)
+                key = seq if field == 'seq' else timestamp
+                if end is not None and key >= end:
+                    break
+                if start is not None and key < start:
+                    log.seek(original_length + translation_length, os.SEEK_CUR)
+                    continue
+                original = log.read(original_length).decode('utf-8')
+                translation = log.read(translation_length).decode('utf-8')
+                entries.append(HistoryEntry(seq, timestamp, original, translation))
+        return entries
+
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            if self.log is not None:
+                self.log.close()
+                self.log = None
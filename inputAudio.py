@@ -1,10 +1,30 @@
 import pyaudio
+import queue
 import threading
+import time
 import numpy as np
+from typing import Any, Callable, Optional
+from metrics import metrics
+from resampler import PolyphaseResampler
 
 class InputAudio:
-    def __init__(self, memory):
+    """Microphone capture at the device's native rate, delivered to AsyncMemory at 16 kHz.
+
+    PortAudio calls `_callback` for every block; it only timestamps the block
+    and queues it, so a descheduled Python thread can't overflow the device.
+    The update thread resamples the blocks and hands them on. Device
+    overflows, blocks dropped because the update thread fell behind, and gaps
+    in the capture timestamps are counted rather than raised; after a gap the
+    resampler starts over instead of filtering across it.
+
+    The resampled audio goes to `sink` when given (e.g. an S2TT worker's
+    shared ring), instead of AsyncMemory's input buffer.
+    """
+
+    def __init__(self, memory, device_id: Optional[int] = None, device_rate: Optional[int] = None,
+                 sink: Optional[Callable[[np.ndarray], Any]] = None):
         self.memory = memory
+        self.sink = sink if sink is not None else memory.add_input_audio
         self.CHUNK = 1024
         self.FORMAT = pyaudio.paFloat32
         self.CHANNELS = 1
@@ -13,22 +33,67 @@ class InputAudio:
         self.data = None
         self.stop = False
 
+        # Extra consumers of the captured samples (e.g. passthrough playout)
+        self.listeners = []
+
+        # Blocks handed over by the PortAudio callback: (samples, monotonic capture time of the first one)
+        self.blocks = queue.Queue(maxsize=64)
+
+        # Expected capture time of the next block, on the time.monotonic() clock
+        self.next_capture_time = None
+
+        # Statistics
+        self.device_overflows = 0
+        self.dropped_blocks = 0
+        self.glitches = 0
+        self.errors = 0
+
         self.p = pyaudio.PyAudio()
+        if device_id is None:
+            device_id = self.p.get_default_input_device_info()['index']
+        self.device_id = device_id
+        device = self.p.get_device_info_by_index(device_id)
+        self.device_rate = int(device_rate or device['defaultSampleRate'])
+        self.resampler = PolyphaseResampler(self.device_rate, self.RATE)
+        print(f"Capturing from {device['name']} at {self.device_rate} Hz")
 
-        # Open input stream (microphone)
+        # Open input stream (microphone), driven by the PortAudio callback
         self.input_stream = self.p.open(format=self.FORMAT,
                                         channels=self.CHANNELS,
-                                        rate=self.RATE,
+                                        rate=self.device_rate,
                                         input=True,
                                         frames_per_buffer=self.CHUNK,
-                                        input_device_index=1)
+                                        input_device_index=self.device_id,
+                                        stream_callback=self._callback,
+                                        start=False)
+
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        now = time.monotonic()
+        if status & pyaudio.paInputOverflow:
+            self.device_overflows += 1
+
+        # Move the ADC time of the first sample from the stream clock onto time.monotonic()
+        adc_time = time_info.get('input_buffer_adc_time', 0)
+        if adc_time > 0:
+            capture_time = now - (time_info['current_time'] - adc_time)
+        else:
+            capture_time = now - frame_count / self.device_rate
+
+        try:
+            self.blocks.put_nowait((in_data, capture_time))
+        except queue.Full:
+            self.dropped_blocks += 1
+        return None, (pyaudio.paComplete if self.stop else pyaudio.paContinue)
 
 
     def start(self):
         # Start the update thread
         print("Starting audio input stream...")
+        self.stop = False
         self.stream_thread = threading.Thread(target=self.update, args=(), daemon=True)
         self.stream_thread.start()
+        self.input_stream.start_stream()
 
 
     def stop_stream(self):
@@ -39,7 +104,53 @@ class InputAudio:
         self.p.terminate()
 
 
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+
     def update(self):
-        while not self.stop:        
-            self.data = self.input_stream.read(self.CHUNK)
-            self.memory.add_input_audio(np.frombuffer(self.data, dtype=np.float32))
\ No newline at end of file
+        while not self.stop:
+            try:
+                data, capture_time = self.blocks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                self._deliver(np.frombuffer(data, dtype=np.float32), capture_time)
+            except Exception as e:
+                self.errors += 1
+                print(f"Audio input error: {str(e)}")
+
+
+    def _deliver(self, samples: np.ndarray, capture_time: float):
+        # A block starting well after the previous one ended means audio was lost on the way
+        if self.next_capture_time is not None and capture_time - self.next_capture_time > self.CHUNK / self.device_rate:
+            self.glitches += 1
+            # The filter history belongs to audio before the gap, don't smear it into this block
+            self.resampler.reset()
+        self.next_capture_time = capture_time + len(samples) / self.device_rate
+
+        resampled = self.resampler.process(samples)
+        self.data = resampled.tobytes()
+        self.sink(resampled)
+        for listener in self.listeners:
+            listener(resampled)
+        metrics.observe('audio_capture', time.monotonic() - capture_time)
+
+
+    def get_stats(self) -> dict:
+        return {
+            'device_rate': self.device_rate,
+            'device_overflows': self.device_overflows,
+            'dropped_blocks': self.dropped_blocks,
+            'glitches': self.glitches,
+            'errors': self.errors,
+            'queued_blocks': self.blocks.qsize(),
+            'device_latency_ms': 1000 * self.input_stream.get_input_latency(),
+            'resampler_delay_ms': 1000 * self.resampler.delay,
+        }
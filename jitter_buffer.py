@@ -0,0 +1,81 @@
+import threading
+import numpy as np
+from typing import Optional
+from ring_buffer import AudioRingBuffer
+
+
+class JitterBuffer:
+    """Sample-accurate playout buffer in front of an AudioRingBuffer.
+
+    `pull` always fills the requested frame: missing samples are replaced by
+    silence and counted as an underrun. After running dry, playout waits until
+    `prefill_samples` are queued again (or the queue stops growing) so a
+    trickling producer doesn't crackle. With `max_latency_samples` set, the
+    oldest samples are dropped whenever the queue grows beyond it.
+    """
+
+    def __init__(self, ring: Optional[AudioRingBuffer] = None, lock: Optional[threading.Lock] = None,
+                 prefill_samples: int = 640, max_latency_samples: Optional[int] = None,
+                 capacity: int = 16000 * 10):
+        self.ring = ring if ring is not None else AudioRingBuffer(capacity)
+        self.lock = lock if lock is not None else threading.Lock()
+        self.prefill_samples = prefill_samples
+        self.max_latency_samples = max_latency_samples
+        self.buffering = True
+        self._last_available = 0
+
+        # Statistics
+        self.frames_played = 0
+        self.underruns = 0
+        self.underrun_samples = 0
+        self.dropped_samples = 0
+
+
+    def write(self, samples) -> None:
+        with self.lock:
+            self.ring.write(samples)
+
+
+    def pull(self, out: np.ndarray) -> int:
+        """Fill `out` with the next samples, returns how many came from the queue"""
+        with self.lock:
+            available = len(self.ring)
+            if self.max_latency_samples is not None and available > self.max_latency_samples:
+                excess = available - self.max_latency_samples
+                self.ring.consume(excess)
+                self.dropped_samples += excess
+                available -= excess
+
+            if self.buffering:
+                growing = available != self._last_available
+                self._last_available = available
+                if available == 0 or (available < self.prefill_samples and growing):
+                    out[:] = 0
+                    return 0
+                self.buffering = False
+
+            n = self.ring.read_into(out)
+            self.frames_played += 1
+
+            if n < len(out):
+                out[n:] = 0
+                self.underruns += 1
+                self.underrun_samples += len(out) - n
+                self.buffering = True
+                self._last_available = 0
+        return n
+
+
+    def queued(self) -> int:
+        with self.lock:
+            return len(self.ring)
+
+
+    def stats(self) -> dict:
+        return {
+            'queued_samples': self.queued(),
+            'frames_played': self.frames_played,
+            'underruns': self.underruns,
+            'underrun_samples': self.underrun_samples,
+            'dropped_samples': self.dropped_samples + self.ring.dropped_samples,
+        }
@@ -1,18 +1,43 @@
 import pyaudio
+import threading
 import tkinter as tk
 from S2TT import S2TT
-from T2S import T2S
+from T2S import T2S, register_voice
 from inputAudio import InputAudio
 from WebCam import WebCam
 from outputAudio import OutputAudio
 from async_memory import AsyncMemory
+from waveform_cache import WaveformCache
 # from summary import TextSummarizer
 from virtualCamera import VirtualCamera
+from metrics import MetricsServer, metrics
+from model_registry import models
+from asr_models import select_whisper_model
+from worker_processes import S2TTProcess, T2SProcess
 from tkinter import ttk
 
 
 class LanguageGUI:
-    def __init__(self):
+    def __init__(self, metrics_port=None, asr_options=None, worker_processes=False, online_translator='gemini',
+                 input_device=None, video_format='bgr'):
+        # PortAudio index of the microphone, None for the system default
+        self.input_device = input_device
+        # Pixel format handed to the virtual camera (bgr, rgb, i420, nv12)
+        self.video_format = video_format
+        # Engine used unless offline translation is ticked: 'gemini' or 'gemini-rest'
+        self.online_translator = online_translator
+        # Passed to S2TT: asr_model, device, num_threads, max_rtf
+        self.asr_options = asr_options or {}
+        # Run S2TT and T2S in their own processes, away from the audio/video threads
+        self.worker_processes = worker_processes
+        self.t2s_worker = None
+
+        # Metrics stay disabled (and free) unless a port is given
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(port=metrics_port)
+            self.metrics_server.start()
+
         self.setup_gui()
         self.root.mainloop()
     
@@ -20,9 +45,13 @@ class LanguageGUI:
     def setup_gui(self):
         # Create main window
         self.system_start = False
+        self.loading_thread = None
+        self.asr_key = None
+        self.t2s = None
+        self.tts_cache = WaveformCache()
         self.root = tk.Tk()
         self.root.title("Simple Dropdown GUI")
-        self.root.geometry("450x300")
+        self.root.geometry("450x400")
 
         # Options for dropdowns
         options1 = ['English',
@@ -62,6 +91,8 @@ class LanguageGUI:
         self.output_language = ttk.Combobox(self.root, values=options1, state="readonly")
         self.output_language.set(options1[0])  # Set default selection
         self.output_language.pack(pady=5)
+        # Start loading the voice as soon as it's picked, not on Confirm
+        self.output_language.bind('<<ComboboxSelected>>', self.on_output_language_selected)
 
         self.translated_audio_var = tk.BooleanVar()
         self.translated_audio_checkbox = tk.Checkbutton(self.root, text="Enable Translated Audio", 
@@ -74,69 +105,174 @@ class LanguageGUI:
                                  variable=self.test_mode_var)
         self.test_mode_checkbox.pack(pady=5)
 
+        self.streaming_var = tk.BooleanVar()
+        self.streaming_checkbox = tk.Checkbutton(self.root, text="Enable streaming transcription", 
+                                 variable=self.streaming_var)
+        self.streaming_checkbox.pack(pady=5)
+
+        self.offline_translation_var = tk.BooleanVar()
+        self.offline_translation_checkbox = tk.Checkbutton(self.root, text="Use offline translation", 
+                                 variable=self.offline_translation_var)
+        self.offline_translation_checkbox.pack(pady=5)
+
         # Create confirm button
         self.confirm_btn = tk.Button(self.root, text="Confirm", command=self.on_confirm)
         self.confirm_btn.pack(pady=10)
 
         self.shutdown_btn = tk.Button(self.root, text='Shutdown', command=self.on_shutdown_system)
         self.shutdown_btn.pack(pady=10)
+
+        self.status_label = tk.Label(self.root, text="Ready" if self.worker_processes else "Loading speech recognition model...")
+        self.status_label.pack(pady=5)
+
+        # Whisper is picked and loaded in the background while the user picks languages,
+        # worker processes load their own models
+        if not self.worker_processes:
+            threading.Thread(target=self.preload_asr, args=(), daemon=True).start()
+            self.on_output_language_selected()
+        self.root.after(200, self.poll_status)
+
+
+    def on_output_language_selected(self, event=None):
+        lang_out = self.lang_dict.get(self.output_language.get(), [None, None])[1]
+        if lang_out is not None and not self.worker_processes:
+            models.preload(register_voice(lang_out))
+
+
+    def preload_asr(self):
+        options = self.asr_options
+        key = select_whisper_model(options.get('asr_model', 'auto'), options.get('device'),
+                                   max_rtf=options.get('max_rtf', 0.5), num_threads=options.get('num_threads'),
+                                   reference_path=options.get('asr_reference'))
+        models.preload(key)
+        self.asr_key = key
+
+
+    def poll_status(self):
+        """Reflect background loading in the UI, runs on the Tk thread"""
+        loading = self.loading_thread is not None and self.loading_thread.is_alive()
+        self.confirm_btn.config(state=tk.DISABLED if loading else tk.NORMAL)
+        if loading:
+            self.status_label.config(text="Loading models...")
+        elif self.system_start:
+            self.status_label.config(text="Running")
+        elif self.asr_key is not None and models.is_ready(self.asr_key):
+            self.status_label.config(text="Ready")
+        self.root.after(200, self.poll_status)
     
 
-    def setup_system(self, input_lang, trans_lang, output_lang, test_mode=False, use_trans_audio=True):
-        self.memory = AsyncMemory(30)
-        self.audio_in = InputAudio(memory=self.memory)
+    def setup_system(self, input_lang, trans_lang, output_lang, test_mode=False, use_trans_audio=True, asr_mode='interval', translator='gemini'):
+        self.memory = AsyncMemory()
+        s2tt_class = S2TTProcess if self.worker_processes else S2TT
+        self.s2tt = s2tt_class(memory=self.memory, in_lang=input_lang, out_lang=trans_lang, mode=asr_mode, translator=translator,
+                               **self.asr_options)
+        self.audio_in = InputAudio(memory=self.memory, device_id=self.input_device, sink=self.input_sink())
         device_idx = 4 if test_mode else self.find_vb_cable()
         self.audio_out = OutputAudio(self.audio_in, memory=self.memory, translated_audio=use_trans_audio, device_id=device_idx)
-        self.video_stream = WebCam(src=0, memory=self.memory) if test_mode else VirtualCamera(memory=self.memory)
+        self.video_stream = WebCam(src=0, memory=self.memory) if test_mode else VirtualCamera(memory=self.memory, output_format=self.video_format)
         # summariser = TextSummarizer()
-        self.s2tt = S2TT(memory=self.memory, in_lang=input_lang, out_lang=trans_lang)
-        self.t2s = T2S(memory=self.memory, lang=output_lang) 
+        self.t2s = self.build_t2s(output_lang)
 
-        if output_lang is not None:
+        if self.t2s is not None:
             self.t2s.start()
 
         self.video_stream.start()
         self.audio_in.start()
         self.audio_out.start()
         self.s2tt.start()
+        self.register_metrics()
 
         self.system_start = True
 
 
+    def input_sink(self):
+        """Where captured audio goes: the S2TT worker's shared ring, or AsyncMemory when S2TT runs in-process"""
+        return self.s2tt.add_input_audio if self.worker_processes else None
+
+
+    def build_t2s(self, output_lang):
+        """TTS for the current memory, or None for languages without a voice"""
+        if output_lang is None:
+            return None
+        if not self.worker_processes:
+            return T2S(memory=self.memory, lang=output_lang, cache=self.tts_cache)
+
+        # One long-lived worker switches voices instead of reloading them
+        if self.t2s_worker is None:
+            self.t2s_worker = T2SProcess(memory=self.memory)
+        self.t2s_worker.reset(memory=self.memory, lang=output_lang)
+        return self.t2s_worker
+
+
     def on_shutdown_system(self):
         if self.system_start:
             self.audio_in.stop_stream()
             self.audio_out.stop_stream()
             self.s2tt.stop_s2tt()
-            self.t2s.stop_t2s()
+            if self.t2s is not None:
+                self.t2s.stop_t2s()
             self.video_stream.stop_stream()
+            self.memory.close()
+
+            if self.worker_processes:
+                self.s2tt.close()
+                if self.t2s_worker is not None:
+                    self.t2s_worker.close()
+
+        if self.metrics_server is not None:
+            self.metrics_server.stop_server()
 
         self.root.destroy()
 
     
-    def reset_system(self, input_lang, trans_lang, output_lang, test_mode=False, use_trans_audio=True):
+    def reset_system(self, input_lang, trans_lang, output_lang, test_mode=False, use_trans_audio=True, asr_mode='interval', translator='gemini'):
         self.audio_in.stop_stream()
         self.audio_out.stop_stream()
         self.s2tt.stop_s2tt()
-        self.t2s.stop_t2s()
+        if self.t2s is not None:
+            self.t2s.stop_t2s()
         self.video_stream.stop_stream()
+        self.memory.close()
 
-        self.memory = AsyncMemory(30)
-        self.audio_in = InputAudio(memory=self.memory)
+        self.memory = AsyncMemory()
+        self.audio_in = InputAudio(memory=self.memory, device_id=self.input_device, sink=self.input_sink())
         device_idx = 4 if test_mode else self.find_vb_cable()
         self.audio_out = OutputAudio(self.audio_in, memory=self.memory, translated_audio=use_trans_audio, device_id=device_idx)
-        self.video_stream = WebCam(src=0, memory=self.memory) if test_mode else VirtualCamera(memory=self.memory)
+        self.video_stream = WebCam(src=0, memory=self.memory) if test_mode else VirtualCamera(memory=self.memory, output_format=self.video_format)
         # summariser = TextSummarizer()
-        self.s2tt.reset(memory=self.memory, in_lang=input_lang, out_lang=trans_lang)
-        self.t2s = T2S(memory=self.memory, lang=output_lang) 
+        self.s2tt.reset(memory=self.memory, in_lang=input_lang, out_lang=trans_lang, mode=asr_mode, translator=translator)
+        self.t2s = self.build_t2s(output_lang)
 
-        if output_lang is not None:
+        if self.t2s is not None:
             self.t2s.start()
 
         self.video_stream.start()
         self.audio_in.start()
         self.audio_out.start()
         self.s2tt.start()
+        self.register_metrics()
+
+
+    def register_metrics(self):
+        """Point the metric gauges at the current pipeline components"""
+        metrics.register_gauges('audio', self.memory.get_audio_stats)
+        metrics.register_gauges('bus', self.memory.get_bus_stats)
+        metrics.register_gauges('playout', self.audio_out.get_stats)
+        metrics.register_gauges('capture', self.audio_in.get_stats)
+        if self.worker_processes:
+            metrics.register_gauges('s2tt_worker', self.s2tt.stats)
+            if self.t2s_worker is not None:
+                metrics.register_gauges('t2s_worker', self.t2s_worker.stats)
+        else:
+            metrics.register_gauges('translation', self.s2tt.pipeline.stats)
+            metrics.register_gauges('translation_cache', self.s2tt.t2tt.cache.stats)
+            if hasattr(self.s2tt.t2tt.engine, 'stats'):
+                metrics.register_gauges('translation_client', self.s2tt.t2tt.engine.stats)
+        if not self.worker_processes:
+            metrics.register_gauges('tts_cache', self.tts_cache.stats)
+        metrics.register_gauges('models', models.stats)
+        if hasattr(self.video_stream, 'get_stats'):
+            metrics.register_gauges('video', self.video_stream.get_stats)
 
 
     def on_confirm(self):
@@ -147,22 +283,25 @@ class LanguageGUI:
         lang_trans, lang_out = self.lang_dict[selection2]
 
         test_mode = self.test_mode_var.get()
+        asr_mode = 'streaming' if self.streaming_var.get() else 'interval'
+        translator = 'local' if self.offline_translation_var.get() else self.online_translator
 
         use_trans_audio = self.translated_audio_var.get() and lang_out is not None
 
+        if self.loading_thread is not None and self.loading_thread.is_alive():
+            return
 
-        if self.system_start:
-            self.reset_system(input_lang=lang_in,
-                              trans_lang=lang_trans, 
-                              output_lang=lang_out,
-                              test_mode=test_mode,
-                              use_trans_audio=use_trans_audio)
-        else:
-            self.setup_system(input_lang=lang_in,
-                              trans_lang=lang_trans, 
-                              output_lang=lang_out,
-                              test_mode=test_mode,
-                              use_trans_audio=use_trans_audio)
+        # Model loads can take a while, keep them off the Tk thread
+        target = self.reset_system if self.system_start else self.setup_system
+        self.loading_thread = threading.Thread(target=target, kwargs=dict(input_lang=lang_in,
+                                                                          trans_lang=lang_trans, 
+                                                                          output_lang=lang_out,
+                                                                          test_mode=test_mode,
+                                                                          use_trans_audio=use_trans_audio,
+                                                                          asr_mode=asr_mode,
+                                                                          translator=translator), daemon=True)
+        self.loading_thread.start()
+        self.confirm_btn.config(state=tk.DISABLED)
             
 
     def find_vb_cable(self):
@@ -1,6 +1,53 @@
+import os
 from languageGUI import LanguageGUI
+from model_registry import models
 
 
 if __name__ == "__main__":
-    LanguageGUI()
+    # Set METRICS_PORT to expose per-stage latency metrics on localhost
+    metrics_port = os.environ.get("METRICS_PORT")
+
+    # ASR_MODEL (auto, tiny, base, small, large-v3-turbo), ASR_DEVICE (cpu, cuda),
+    # ASR_THREADS and ASR_MAX_RTF tune transcription for the machine
+    asr_options = {}
+    if os.environ.get("ASR_MODEL"):
+        asr_options['asr_model'] = os.environ["ASR_MODEL"]
+    if os.environ.get("ASR_DEVICE"):
+        asr_options['device'] = os.environ["ASR_DEVICE"]
+    if os.environ.get("ASR_THREADS"):
+        asr_options['num_threads'] = int(os.environ["ASR_THREADS"])
+    if os.environ.get("ASR_MAX_RTF"):
+        asr_options['max_rtf'] = float(os.environ["ASR_MAX_RTF"])
+    # ASR_REFERENCE_WAV is a speech recording to calibrate 'auto' on
+    if os.environ.get("ASR_REFERENCE_WAV"):
+        asr_options['asr_reference'] = os.environ["ASR_REFERENCE_WAV"]
+    # TRANSLATE_THREADS sets the CPU threads of the offline translation model
+    if os.environ.get("TRANSLATE_THREADS"):
+        asr_options['translate_threads'] = int(os.environ["TRANSLATE_THREADS"])
+
+    # MODEL_RAM_BUDGET_MB and MODEL_GPU_BUDGET_MB cap the memory models may use;
+    # models drop to lower precision or idle ones are moved/evicted to stay under them
+    if os.environ.get("MODEL_RAM_BUDGET_MB"):
+        models.set_budget('cpu', int(float(os.environ["MODEL_RAM_BUDGET_MB"]) * 1024 ** 2))
+    if os.environ.get("MODEL_GPU_BUDGET_MB"):
+        models.set_budget('cuda', int(float(os.environ["MODEL_GPU_BUDGET_MB"]) * 1024 ** 2))
+
+    # WORKER_PROCESSES=1 runs transcription and speech synthesis in separate processes
+    worker_processes = os.environ.get("WORKER_PROCESSES", "0") == "1"
+
+    # TRANSLATOR=gemini-rest talks to Gemini's REST API directly on pooled connections
+    online_translator = os.environ.get("TRANSLATOR", "gemini")
+    # TRANSLATION_HEDGE_AFTER (seconds) sends a slow online translation request a second time
+    if os.environ.get("TRANSLATION_HEDGE_AFTER"):
+        asr_options['translation_hedge_after'] = float(os.environ["TRANSLATION_HEDGE_AFTER"])
+
+    # INPUT_DEVICE picks the microphone by PortAudio index instead of the system default
+    input_device = os.environ.get("INPUT_DEVICE")
+
+    # VIDEO_FORMAT (bgr, rgb, i420, nv12) is the pixel format sent to the virtual camera
+    video_format = os.environ.get("VIDEO_FORMAT", "bgr")
+
+    LanguageGUI(metrics_port=int(metrics_port) if metrics_port else None, asr_options=asr_options,
+                worker_processes=worker_processes, online_translator=online_translator,
+                input_device=int(input_device) if input_device else None, video_format=video_format)
 
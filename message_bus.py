@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class Message:
+    seq: int
+    content: Any
+    timestamp: float
+    trace: Any = None
+
+
+class Subscription:
+    """A consumer's cursor into a MessageBus.
+
+    'queue' subscribers see every retained message in order; 'latest'
+    subscribers only ever see the newest one. Messages that fell out of the
+    bus's retention before a queue subscriber got to them are counted in
+    `dropped`.
+    """
+
+    def __init__(self, bus: 'MessageBus', name: str, mode: str = 'queue'):
+        if mode not in ('queue', 'latest'):
+            raise ValueError(f"Unknown subscription mode: {mode}")
+        self.bus = bus
+        self.name = name
+        self.mode = mode
+        self.cursor = bus.next_seq  # next sequence number this consumer hasn't seen
+        self.dropped = 0
+        self.received = 0
+
+
+    def _take(self) -> Optional[Message]:
+        """Caller holds the bus lock"""
+        messages = self.bus.messages
+        if not messages or messages[-1].seq < self.cursor:
+            return None
+
+        if self.mode == 'latest':
+            message = messages[-1]
+        else:
+            oldest = messages[0].seq
+            if self.cursor < oldest:
+                self.dropped += oldest - self.cursor
+                self.cursor = oldest
+            message = next(m for m in messages if m.seq >= self.cursor)
+
+        self.cursor = message.seq + 1
+        self.received += 1
+        return message
+
+
+    def poll(self) -> Optional[Message]:
+        """Next unseen message, or None. Never blocks"""
+        with self.bus.lock:
+            return self._take()
+
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Message]:
+        """Wait up to `timeout` seconds for an unseen message"""
+        with self.bus.updated:
+            message = self._take()
+            if message is None and self.bus.updated.wait_for(
+                    lambda: self.bus.messages and self.bus.messages[-1].seq >= self.cursor, timeout):
+                message = self._take()
+            return message
+
+
+    def lag(self) -> int:
+        with self.bus.lock:
+            return max(0, self.bus.next_seq - self.cursor)
+
+
+class MessageBus:
+    """Non-blocking publish/subscribe bus with sequence numbers and bounded retention.
+
+    Producers never wait on consumers: a slow or missing consumer only loses
+    messages that fell out of retention, it never throttles the publisher.
+    """
+
+    def __init__(self, retention: int = 256):
+        self.messages = deque(maxlen=retention)
+        self.next_seq = 0
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+        self.subscriptions: Dict[str, Subscription] = {}
+
+
+    def publish(self, content: Any, seq: Optional[int] = None, trace: Any = None) -> int:
+        with self.updated:
+            if seq is None:
+                seq = self.next_seq
+            elif seq < self.next_seq:
+                raise ValueError(f"Sequence number {seq} is not newer than {self.next_seq - 1}")
+            self.next_seq = seq + 1
+            self.messages.append(Message(seq=seq, content=content, timestamp=time.time(), trace=trace))
+            self.updated.notify_all()
+            return seq
+
+
+    def subscribe(self, name: str, mode: str = 'queue') -> Subscription:
+        """Return the named subscription, creating it at the current head if needed"""
+        with self.lock:
+            subscription = self.subscriptions.get(name)
+            if subscription is None:
+                subscription = Subscription(self, name, mode)
+                self.subscriptions[name] = subscription
+            return subscription
+
+
+    def latest(self) -> Optional[Message]:
+        with self.lock:
+            return self.messages[-1] if self.messages else None
+
+
+    def wait_for_first(self, timeout: Optional[float] = None) -> Optional[Message]:
+        with self.updated:
+            self.updated.wait_for(lambda: len(self.messages) > 0, timeout)
+            return self.messages[-1] if self.messages else None
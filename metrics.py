@@ -0,0 +1,253 @@
+import itertools
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the open bucket)"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, itertools.accumulate(self.counts)):
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Trace:
+    """Monotonic timestamps of one utterance at each stage boundary"""
+
+    def __init__(self, metrics: 'Metrics', trace_id: int):
+        self.metrics = metrics
+        self.trace_id = trace_id
+        self.start = time.monotonic()
+        self.last = self.start
+        self.marks = {}
+        self.annotations = {}
+
+
+    def annotate(self, key: str, value) -> None:
+        self.annotations[key] = value
+
+
+    def mark(self, stage: str) -> None:
+        """Record the end of `stage`; its latency is the time since the previous mark"""
+        now = time.monotonic()
+        self.marks[stage] = now
+        self.metrics.observe(stage, now - self.last)
+        self.last = now
+
+
+    def finish(self, stage: str = 'end_to_end') -> None:
+        self.metrics.observe(stage, time.monotonic() - self.start)
+
+
+class NullTrace:
+    """Stand-in used while metrics are disabled, every call is a no-op"""
+
+    trace_id = None
+    marks = {}
+    annotations = {}
+
+    def annotate(self, key: str, value) -> None:
+        pass
+
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+    def finish(self, stage: str = 'end_to_end') -> None:
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class Metrics:
+    """In-process latency histograms, counters and gauges.
+
+    Disabled by default: `start_trace` then hands out NULL_TRACE and nothing is
+    recorded. Gauge callbacks are only evaluated when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauge_sources: Dict[str, Callable[[], dict]] = {}
+        self.trace_ids = itertools.count()
+
+
+    def enable(self) -> None:
+        self.enabled = True
+
+
+    def start_trace(self):
+        if not self.enabled:
+            return NULL_TRACE
+        return Trace(self, next(self.trace_ids))
+
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+    def register_gauges(self, prefix: str, source: Callable[[], dict]) -> None:
+        """`source()` returns a dict of numeric values, sampled at snapshot time"""
+        with self.lock:
+            self.gauge_sources[prefix] = source
+
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'mean_ms': 1000 * h.total / h.count if h.count else 0.0,
+                    'p50_ms': 1000 * h.quantile(0.5),
+                    'p90_ms': 1000 * h.quantile(0.9),
+                    'p99_ms': 1000 * h.quantile(0.99),
+                    'max_ms': 1000 * h.max,
+                }
+                for stage, h in self.histograms.items()
+            }
+            counters = dict(self.counters)
+            sources = dict(self.gauge_sources)
+
+        gauges = {}
+        for prefix, source in sources.items():
+            try:
+                values = source()
+            except Exception as e:
+                print(f"Metrics source {prefix} failed: {str(e)}")
+                continue
+            for name, value in values.items():
+                if isinstance(value, (int, float)):
+                    gauges[f"{prefix}_{name}"] = value
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+
+    def prometheus(self) -> str:
+        lines = ['# TYPE stage_latency_seconds histogram']
+        with self.lock:
+            for stage, h in self.histograms.items():
+                for bound, cumulative in zip(h.buckets, itertools.accumulate(h.counts)):
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'stage_latency_seconds_sum{{stage="{stage}"}} {h.total}')
+                lines.append(f'stage_latency_seconds_count{{stage="{stage}"}} {h.count}')
+            counters = dict(self.counters)
+
+        for name, value in counters.items():
+            lines.append(f'# TYPE {name}_total counter')
+            lines.append(f'{name}_total {value}')
+        for name, value in self.snapshot()['gauges'].items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+    def summary_line(self) -> str:
+        snapshot = self.snapshot()
+        stages = ' '.join(f"{stage}={s['p50_ms']:.0f}/{s['p90_ms']:.0f}ms"
+                          for stage, s in snapshot['stages'].items())
+        gauges = ' '.join(f"{name}={value:g}" for name, value in snapshot['gauges'].items())
+        return f"[metrics] p50/p90 {stages} | {gauges}"
+
+
+# Process-wide registry
+metrics = Metrics()
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json on localhost, and logs a summary periodically"""
+
+    def __init__(self, registry: Metrics = metrics, port: int = 9108, log_interval: Optional[float] = 30.0):
+        self.registry = registry
+        self.port = port
+        self.log_interval = log_interval
+        self.stop = False
+        self.server = None
+
+
+    def start(self):
+        self.stop = False
+        self.registry.enable()
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(registry.snapshot()), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        print(f"Serving metrics on http://127.0.0.1:{self.server.server_address[1]}/metrics")
+        threading.Thread(target=self.server.serve_forever, args=(), daemon=True).start()
+        if self.log_interval:
+            threading.Thread(target=self.log_periodically, args=(), daemon=True).start()
+
+
+    def log_periodically(self):
+        while not self.stop:
+            time.sleep(self.log_interval)
+            if not self.stop:
+                print(self.registry.summary_line())
+
+
+    def stop_server(self):
+        self.stop = True
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
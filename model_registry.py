@@ -0,0 +1,440 @@
+import gc
+import threading
+import time
+import torch
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Most to least precise
+PRECISIONS = ('fp32', 'bf16', 'fp16', 'int8')
+
+# Size relative to fp32; int8 only packs the linear layers, so it's an estimate
+PRECISION_SCALE = {'fp32': 1.0, 'bf16': 0.5, 'fp16': 0.5, 'int8': 0.3}
+
+# Share of accelerator memory models may use when no budget is set, the rest is left for activations
+DEVICE_MEMORY_FRACTION = 0.8
+
+
+def _modules(model: Any):
+    """Torch modules held by a model, which may be a module or a tuple/list/dict of parts"""
+    if isinstance(model, (tuple, list)):
+        return [m for part in model for m in _modules(part)]
+    if isinstance(model, dict):
+        return [m for part in model.values() for m in _modules(part)]
+    return [model] if isinstance(model, torch.nn.Module) else []
+
+
+def _map_modules(model: Any, fn: Callable[[torch.nn.Module], torch.nn.Module]) -> Any:
+    if isinstance(model, (tuple, list)):
+        return type(model)(_map_modules(part, fn) for part in model)
+    if isinstance(model, dict):
+        return {k: _map_modules(part, fn) for k, part in model.items()}
+    return fn(model) if isinstance(model, torch.nn.Module) else model
+
+
+def model_footprint(model: Any) -> Dict[str, int]:
+    """Bytes of weights per device type ('cpu', 'cuda', ...), counting quantized weights too"""
+    footprint = {}
+    seen = set()
+    for module in _modules(model):
+        tensors = []
+        for value in module.state_dict(keep_vars=True).values():
+            # Quantized linear layers store their packed (weight, bias) as a tuple
+            tensors.extend(value if isinstance(value, (tuple, list)) else [value])
+        for tensor in tensors:
+            if not isinstance(tensor, torch.Tensor) or tensor.numel() == 0:
+                continue
+            if tensor.is_quantized:
+                storage = (tensor.device.type, id(tensor))
+            else:
+                storage = (tensor.device.type, tensor.data_ptr())
+            if storage in seen:
+                continue
+            seen.add(storage)
+            footprint[tensor.device.type] = footprint.get(tensor.device.type, 0) + tensor.numel() * tensor.element_size()
+    return footprint
+
+
+def model_bytes(model: Any) -> int:
+    """Weight memory of a model across all devices"""
+    return sum(model_footprint(model).values())
+
+
+def convert_precision(model: Any, precision: str) -> Any:
+    """Cast every module of a CPU model to `precision`; int8 dynamically quantizes linear layers (CPU only)"""
+    if precision == 'fp32':
+        return model
+    if precision == 'int8':
+        return _map_modules(model, lambda m: torch.quantization.quantize_dynamic(m, {torch.nn.Linear}, dtype=torch.qint8))
+    dtype = {'fp16': torch.float16, 'bf16': torch.bfloat16}[precision]
+    return _map_modules(model, lambda m: m.to(dtype))
+
+
+def move_model(model: Any, device: str) -> Any:
+    return _map_modules(model, lambda m: m.to(device))
+
+
+class _Entry:
+    def __init__(self, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]], device: str,
+                 precisions: Tuple[str, ...], convert: Callable[[Any, str], Any]):
+        self.loader = loader
+        self.warmup = warmup
+        self.device = device
+        self.precisions = precisions
+        self.convert = convert
+        self.future: Optional[Future] = None
+        self.model = None
+        self.precision = None
+        self.footprint: Dict[str, int] = {}
+        self.moving = False
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.load_seconds = 0.0
+
+
+    @property
+    def size(self) -> int:
+        return sum(self.footprint.values())
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, shared by every S2TT/T2S instance.
+
+    Models are registered under a key with a loader, an optional warm-up
+    function, the device they run on and the precisions they may run at.
+    Loading and warm-up run on a background worker, so callers can `preload`
+    ahead of time and only block in `acquire` if the model isn't ready yet.
+
+    Every device type has a memory budget: CPU RAM and, for accelerators,
+    DEVICE_MEMORY_FRACTION of the device unless set. Loaders return the model
+    on the CPU at full precision; it is placed at the most precise of its
+    precisions that fits, after first making room by moving idle models (held
+    by nobody) off the accelerator, or dropping them from RAM. Idle
+    accelerator models are also moved to the CPU after `offload_after`
+    seconds, and moved back when acquired again. That housekeeping and
+    handing freed memory back to the allocator happen in `reclaim`, which
+    the pipelines call at utterance boundaries.
+    """
+
+    def __init__(self, budget_bytes: int = 6 * 1024 ** 3, offload_after: float = 60.0):
+        self.budgets = {'cpu': budget_bytes}
+        self.offload_after = offload_after
+        self.entries: Dict[str, _Entry] = {}
+        self.resident = OrderedDict()  # key -> None, in LRU order
+        self.lock = threading.Lock()
+        # One load or move at a time so two large models never peak in memory together
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+        self.reclaim_pending = False
+        self.freed = False
+
+        # Statistics
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.offloads = 0
+        self.restores = 0
+        self.reclaims = 0
+
+
+    def set_budget(self, device_type: str, budget_bytes: int) -> None:
+        with self.lock:
+            self.budgets[device_type] = budget_bytes
+
+
+    def budget(self, device_type: str) -> float:
+        """Caller holds the lock"""
+        if device_type not in self.budgets:
+            if device_type == 'cuda' and torch.cuda.is_available():
+                total = torch.cuda.get_device_properties(0).total_memory
+                self.budgets[device_type] = int(total * DEVICE_MEMORY_FRACTION)
+            else:
+                return float('inf')
+        return self.budgets[device_type]
+
+
+    def share(self, fraction: float, device_types: Tuple[str, ...] = ('cpu', 'cuda')) -> Dict[str, int]:
+        """`fraction` of each budget, for a worker process running beside others on the same memory.
+
+        Accelerator budgets are resolved here first, so workers split this
+        process's view of the device rather than each claiming all of it.
+        """
+        with self.lock:
+            budgets = {device_type: self.budget(device_type) for device_type in device_types}
+        return {device_type: int(budget * fraction) for device_type, budget in budgets.items()
+                if budget != float('inf')}
+
+
+    def register(self, key: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None,
+                 device: str = 'cpu', precisions: Tuple[str, ...] = ('fp32',),
+                 convert: Callable[[Any, str], Any] = convert_precision) -> str:
+        """Declare how to load `key`. Registering an existing key is a no-op.
+
+        `loader` returns the model on the CPU at fp32; `convert` casts it to
+        one of `precisions`, which are tried in order until one fits the budget.
+        """
+        unknown = [p for p in precisions if p not in PRECISIONS]
+        if unknown or not precisions:
+            raise ValueError(f"Precisions for {key} must be some of {PRECISIONS}, got {precisions}")
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = _Entry(loader, warmup, str(device), tuple(precisions), convert)
+        return key
+
+
+    def preload(self, key: str) -> Future:
+        """Start loading `key` in the background if it isn't loaded or loading already"""
+        with self.lock:
+            entry = self.entries[key]
+            if entry.future is None:
+                entry.future = self.executor.submit(self._load, key, entry)
+            else:
+                self.hits += 1
+            if entry.future.done() and key in self.resident:
+                self.resident.move_to_end(key)
+            return entry.future
+
+
+    def is_ready(self, key: str) -> bool:
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry.future is not None and entry.future.done()
+
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> Any:
+        """Return the shared model, loading it first if needed. It won't be moved or evicted until released"""
+        with self.lock:
+            entry = self.entries[key]
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+        try:
+            return self.preload(key).result(timeout)
+        except Exception:
+            self.release(key)
+            raise
+
+
+    def release(self, key: str) -> None:
+        with self.lock:
+            entry = self.entries[key]
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.monotonic()
+            self._evict()
+
+
+    def evict(self, key: str) -> bool:
+        """Drop a model nobody holds right away, whatever the budget. Returns whether it was dropped"""
+        with self.lock:
+            if key not in self.resident or not self._is_idle(key):
+                return False
+            self._drop(key)
+            return True
+
+
+    def reclaim(self) -> None:
+        """Offload idle models and return freed memory to the allocator, in the background.
+
+        Meant for quiet moments such as the end of an utterance, where a
+        garbage collection pass doesn't delay anything.
+        """
+        with self.lock:
+            if self.reclaim_pending:
+                return
+            self.reclaim_pending = True
+        self.executor.submit(self._reclaim)
+
+
+    def _reclaim(self) -> None:
+        with self.lock:
+            self.reclaim_pending = False
+            now = time.monotonic()
+            idle = [key for key in self.resident
+                    if self._is_idle(key) and any(device != 'cpu' for device in self.entries[key].footprint)
+                    and now - self.entries[key].last_used >= self.offload_after]
+            self._take(idle)
+
+        for key in idle:
+            self._offload(key)
+
+        with self.lock:
+            freed, self.freed = self.freed, False
+        if freed:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            self.reclaims += 1
+
+
+    def _is_idle(self, key: str) -> bool:
+        """Loaded, held by nobody, and not being loaded, restored or moved; caller holds the lock"""
+        entry = self.entries[key]
+        return (entry.refs == 0 and entry.model is not None and not entry.moving
+                and (entry.future is None or entry.future.done()))
+
+
+    def _take(self, keys) -> None:
+        """Mark idle models as unavailable while they're moved; caller holds the lock.
+
+        An acquire in the meantime queues a restore behind the move on the loader.
+        """
+        for key in keys:
+            self.entries[key].future = None
+            self.entries[key].moving = True
+
+
+    def _offload(self, key: str) -> None:
+        """Move a taken model to the CPU; runs on the loader"""
+        entry = self.entries[key]
+        start = time.monotonic()
+        entry.model = move_model(entry.model, 'cpu')
+        with self.lock:
+            entry.footprint = model_footprint(entry.model)
+            entry.moving = False
+            self.offloads += 1
+            self.freed = True
+            self._evict()
+        print(f"Moved idle model {key} to CPU in {time.monotonic() - start:.1f}s")
+
+
+    def _make_room(self, device_type: str, needed: int, key: str, force: bool = False) -> bool:
+        """Free `needed` bytes of `device_type` by moving or dropping idle models, runs on the loader.
+
+        Nothing is touched unless enough can be freed, or `force` is set.
+        """
+        with self.lock:
+            budget = self.budget(device_type)
+            used = sum(self.entries[k].footprint.get(device_type, 0) for k in self.resident if k != key)
+            victims = []
+            for k in self.resident:
+                if used + needed <= budget:
+                    break
+                if k != key and self._is_idle(k) and self.entries[k].footprint.get(device_type, 0) > 0:
+                    victims.append(k)
+                    used -= self.entries[k].footprint[device_type]
+            fits = used + needed <= budget
+            if not fits and not force:
+                return False
+            if device_type == 'cpu':
+                for k in victims:
+                    self._drop(k)
+                return fits
+            self._take(victims)
+
+        for k in victims:
+            self._offload(k)
+        return fits
+
+
+    def _load(self, key: str, entry: _Entry) -> Any:
+        start = time.monotonic()
+        device_type = entry.device.split(':')[0]
+        restore = entry.model is not None
+        try:
+            if restore:
+                # Offloaded while idle, moving it back beats reloading from disk
+                if not self._make_room(device_type, entry.size, key, force=True):
+                    print(f"Model {key} exceeds the {device_type} memory budget")
+                model = move_model(entry.model, entry.device)
+            else:
+                print(f"Loading model {key}...")
+                model = self._place(key, entry, entry.loader(), device_type)
+                if entry.warmup is not None:
+                    entry.warmup(model)
+        except Exception as e:
+            print(f"Failed to load model {key}: {str(e)}")
+            with self.lock:
+                # Let a later request retry
+                entry.future = None
+            raise
+
+        with self.lock:
+            entry.model = model
+            entry.footprint = model_footprint(model)
+            entry.load_seconds = time.monotonic() - start
+            self.resident[key] = None
+            self.resident.move_to_end(key)
+            if restore:
+                self.restores += 1
+            else:
+                self.loads += 1
+            self._evict()
+        print(f"Model {key} ready in {entry.load_seconds:.1f}s "
+              f"({entry.precision} on {entry.device}, {entry.size / 1024 ** 2:.0f} MB)")
+        return model
+
+
+    def _place(self, key: str, entry: _Entry, model: Any, device_type: str) -> Any:
+        """Convert a freshly loaded model to the most precise precision that fits, then move it to its device"""
+        full = model_bytes(model)
+        precision = entry.precisions[-1]
+        for candidate in entry.precisions:
+            last = candidate == entry.precisions[-1]
+            if self._make_room(device_type, int(full * PRECISION_SCALE[candidate]), key, force=last):
+                precision = candidate
+                break
+            if last:
+                print(f"Model {key} exceeds the {device_type} memory budget even at {candidate}")
+
+        entry.precision = precision
+        model = entry.convert(model, precision)
+        return move_model(model, entry.device)
+
+
+    def _drop(self, key: str) -> None:
+        """Caller holds the lock"""
+        entry = self.entries[key]
+        del self.resident[key]
+        entry.future = None
+        entry.model = None
+        entry.footprint = {}
+        self.evictions += 1
+        self.freed = True
+        print(f"Evicted model {key} from memory")
+
+
+    def _evict(self) -> None:
+        """Drop least recently used idle models while RAM is over budget; caller holds the lock"""
+        total = sum(self.entries[key].footprint.get('cpu', 0) for key in self.resident)
+        budget = self.budget('cpu')
+        for key in list(self.resident):
+            if total <= budget:
+                break
+            if not self._is_idle(key) or not self.entries[key].footprint.get('cpu', 0):
+                continue
+            total -= self.entries[key].footprint.get('cpu', 0)
+            self._drop(key)
+
+
+    def footprint(self) -> Dict[str, dict]:
+        """Precision, device and memory of every resident model"""
+        with self.lock:
+            return {key: {'precision': self.entries[key].precision, 'device': self.entries[key].device,
+                          'refs': self.entries[key].refs,
+                          **{f'{device}_mb': size / 1024 ** 2 for device, size in self.entries[key].footprint.items()}}
+                    for key in self.resident}
+
+
+    def stats(self) -> dict:
+        with self.lock:
+            used = {}
+            for key in self.resident:
+                for device, size in self.entries[key].footprint.items():
+                    used[device] = used.get(device, 0) + size
+            stats = {
+                'resident': len(self.resident),
+                'resident_mb': sum(used.values()) / 1024 ** 2,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'offloads': self.offloads,
+                'restores': self.restores,
+                'reclaims': self.reclaims,
+            }
+            for device in set(used) | set(self.budgets):
+                stats[f'{device}_mb'] = used.get(device, 0) / 1024 ** 2
+                stats[f'{device}_budget_mb'] = self.budget(device) / 1024 ** 2
+            return stats
+
+
+# Process-wide registry
+models = ModelRegistry()
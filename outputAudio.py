@@ -1,13 +1,12 @@
 import pyaudio
-import threading
-import time
 import numpy as np
+from jitter_buffer import JitterBuffer
 
 
 class OutputAudio:
     def __init__(self, input_audio, memory, translated_audio=True, device_id=20):
-        self.CHUNK = 1024
-        self.FORMAT = pyaudio.paInt16 if translated_audio else pyaudio.paFloat32
+        self.CHUNK = 320  # 20 ms frames
+        self.FORMAT = pyaudio.paFloat32
         self.CHANNELS = 1
         self.RATE = 16000
         self.input_audio = input_audio
@@ -17,47 +16,58 @@ class OutputAudio:
         self.translated_audio = translated_audio
         self.device_id = device_id
 
+        if self.translated_audio:
+            # Play straight out of the shared TTS output queue
+            self.jitter = JitterBuffer(self.memory.output_audio_buffer, self.memory.audio_lock,
+                                       prefill_samples=2 * self.CHUNK)
+        else:
+            # Passthrough gets its own copy of the microphone stream, bounded to 200 ms of latency
+            self.jitter = JitterBuffer(prefill_samples=2 * self.CHUNK, max_latency_samples=self.RATE // 5)
+            self.input_audio.add_listener(self.jitter.write)
 
-        # Open output stream (speakers)
+        # Reused for every callback, PyAudio only needs the bytes
+        self.frame = np.zeros(self.CHUNK, dtype=np.float32)
+        self.device_underflows = 0
+
+        # Open output stream (speakers), driven by the PortAudio callback
         self.output_stream = self.p.open(format=self.FORMAT,
                                          channels=self.CHANNELS,
                                          rate=self.RATE,
                                          output=True,
-                                          input=True,
                                          frames_per_buffer=self.CHUNK,
-                                         output_device_index=self.device_id)
-        
-
-    def play_audio(self):
-        while not self.stop:
-            audio_data = self.memory.get_output_audio() if self.translated_audio else self.input_audio.data
+                                         output_device_index=self.device_id,
+                                         stream_callback=self._callback,
+                                         start=False)
 
-            if audio_data is not None:
-                if self.translated_audio:
-                    audio_data = (audio_data * 32767).astype(np.int16).tobytes()
 
-                for i in range(0, len(audio_data), self.CHUNK):
-                    chunk = audio_data[i:i + self.CHUNK]
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paOutputUnderflow:
+            self.device_underflows += 1
 
-                    self.output_stream.write(chunk)
-            
-            time.sleep(0.01)
-        
-        self.output_stream.stop_stream()
-        self.output_stream.close()
-        self.p.terminate()
+        frame = self.frame if frame_count == self.CHUNK else np.zeros(frame_count, dtype=np.float32)
+        self.jitter.pull(frame)
+        return frame.tobytes(), (pyaudio.paComplete if self.stop else pyaudio.paContinue)
 
 
     def start(self):
         self.stop = False
         print("Starting audio output stream...")
-        threading.Thread(target=self.play_audio, args=(), daemon=True).start()
+        self.output_stream.start_stream()
+
+
+    def get_stats(self) -> dict:
+        stats = self.jitter.stats()
+        stats['device_underflows'] = self.device_underflows
+        stats['queued_ms'] = 1000 * stats['queued_samples'] / self.RATE
+        stats['device_latency_ms'] = 1000 * self.output_stream.get_output_latency()
+        return stats
 
 
     def stop_stream(self):
         # Clean up resources
         self.stop = True
-
-
-    
-        
\ No newline at end of file
+        if not self.translated_audio:
+            self.input_audio.remove_listener(self.jitter.write)
+        self.output_stream.stop_stream()
+        self.output_stream.close()
+        self.p.terminate()
@@ -0,0 +1,75 @@
+import numpy as np
+from math import gcd
+
+
+class PolyphaseResampler:
+    """Streaming rational-rate resampler, e.g. a 44.1 or 48 kHz microphone down to 16 kHz.
+
+    The rate ratio is reduced to up/down. A Kaiser-windowed sinc low-pass,
+    cut off just below the lower of the two Nyquist frequencies, is split
+    into `up` phases, and each output sample is one dot product of a phase
+    with the most recent input samples. Every output of a block is computed
+    in a single vectorized gather, with the filter history carried between
+    blocks so chunk boundaries are seamless. Output lags input by `delay`
+    seconds.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = 16000, zero_crossings: int = 16,
+                 rolloff: float = 0.94, beta: float = 8.6):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.passthrough = self.up == self.down
+
+        if self.passthrough:
+            self.taps = 1
+            self.phases = np.ones((1, 1), dtype=np.float32)
+            self.delay = 0.0
+        else:
+            # Prototype filter at the upsampled rate, `zero_crossings` lobes either side
+            factor = max(self.up, self.down)
+            length = 2 * zero_crossings * factor + 1
+            cutoff = rolloff * 0.5 / factor
+            n = np.arange(length) - (length - 1) / 2
+            prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+            prototype *= self.up / prototype.sum()
+
+            # phases[p, k] = prototype[p + k * up], zero-padded to a whole number of taps
+            self.taps = -(-length // self.up)
+            padded = np.zeros(self.taps * self.up)
+            padded[:length] = prototype
+            self.phases = padded.reshape(self.taps, self.up).T.astype(np.float32)
+            self.delay = (length - 1) / 2 / (self.up * self.in_rate)
+        self.reset()
+
+
+    def reset(self) -> None:
+        """Forget the filter history, e.g. after a gap in the input"""
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0
+        self.produced = 0
+
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next block of the stream; returns every output sample it completes"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.passthrough:
+            return samples.copy()
+
+        buffer = np.concatenate((self.history, samples))
+        total = self.consumed + len(samples)
+        end = (total * self.up - 1) // self.down + 1 if total else 0
+
+        # Output n sits at n * down on the upsampled grid: filter phase and newest input sample
+        n = np.arange(self.produced, end, dtype=np.int64)
+        position = n * self.down
+        newest = position // self.up - self.consumed + len(self.history)
+        window = buffer[newest[:, None] - np.arange(self.taps)]
+        out = np.einsum('nk,nk->n', window, self.phases[position % self.up])
+
+        self.history = buffer[len(buffer) - len(self.history):]
+        self.consumed = total
+        self.produced = end
+        return out.astype(np.float32, copy=False)
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+class AudioRingBuffer:
+    """Fixed-capacity float32 FIFO for audio samples.
+
+    Samples are stored in a single preallocated array, so writes and reads are
+    bulk memcpy operations instead of per-sample Python objects. When a write
+    does not fit, the oldest samples are overwritten and counted as overflow.
+    Not thread-safe on its own; callers guard it with their own lock.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=dtype)
+        self._start = 0
+        self._size = 0
+
+        # Overflow accounting
+        self.overflow_count = 0
+        self.dropped_samples = 0
+        self.total_written = 0
+
+
+    def __len__(self) -> int:
+        return self._size
+
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self._size
+
+
+    def write(self, samples) -> int:
+        """Append samples, dropping the oldest ones on overflow. Returns samples dropped."""
+        samples = np.asarray(samples, dtype=self._data.dtype).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return 0
+        self.total_written += n
+
+        dropped = 0
+        if n >= self.capacity:
+            # Only the newest `capacity` samples can survive
+            dropped = self._size + n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+            self._start = 0
+            self._size = 0
+        elif n > self.free:
+            dropped = n - self.free
+            self._start = (self._start + dropped) % self.capacity
+            self._size -= dropped
+
+        if dropped:
+            self.overflow_count += 1
+            self.dropped_samples += dropped
+
+        end = (self._start + self._size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._data[end:end + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:]
+        self._size += n
+        return dropped
+
+
+    def peek(self, max_samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return up to `max_samples` of the oldest samples as two views, without consuming them.
+
+        The second view is empty unless the data wraps around the end of the storage.
+        The views are only valid until the next write.
+        """
+        n = self._size if max_samples is None else max(0, min(int(max_samples), self._size))
+        first = min(n, self.capacity - self._start)
+        return self._data[self._start:self._start + first], self._data[:n - first]
+
+
+    def consume(self, n: int) -> int:
+        """Discard up to `n` of the oldest samples. Returns the number discarded."""
+        n = max(0, min(int(n), self._size))
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+        if self._size == 0:
+            self._start = 0
+        return n
+
+
+    def read(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Consume up to `max_samples` samples and return them as one contiguous copy."""
+        head, tail = self.peek(max_samples)
+        if len(tail):
+            out = np.concatenate((head, tail))
+        else:
+            out = head.copy()
+        self.consume(len(out))
+        return out
+
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Consume samples straight into a caller-owned array. Returns the number written."""
+        head, tail = self.peek(len(out))
+        out[:len(head)] = head
+        out[len(head):len(head) + len(tail)] = tail
+        return self.consume(len(head) + len(tail))
+
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
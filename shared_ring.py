@@ -0,0 +1,100 @@
+import sys
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+# int64 header slots
+WRITE_POS, READ_POS, CAPACITY, DROPPED = range(4)
+HEADER_BYTES = 4 * 8
+
+
+class SharedAudioRing:
+    """Single-producer/single-consumer float32 ring buffer in shared memory.
+
+    Create it in one process and attach to it from another by `name`. The
+    producer only advances the write position and the consumer only the read
+    position, so no lock is needed across processes. When the ring is full,
+    the samples that don't fit are dropped (the producer can't discard unread
+    audio) and counted in `dropped_samples`.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * 4)
+        else:
+            # Attaching processes must not unlink the segment when they exit
+            if sys.version_info >= (3, 13):
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            else:
+                # Before 3.13 attaching registers the segment with the resource tracker too
+                self.shm = shared_memory.SharedMemory(name=name)
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+        self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+        self.capacity = int(self.header[CAPACITY])
+        self.data = np.ndarray((self.capacity,), dtype=np.float32, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+
+    @property
+    def dropped_samples(self) -> int:
+        return int(self.header[DROPPED])
+
+
+    def __len__(self) -> int:
+        return int(self.header[WRITE_POS] - self.header[READ_POS])
+
+
+    def write(self, samples) -> int:
+        """Producer side. Returns the number of samples stored"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        write_pos = int(self.header[WRITE_POS])
+        free = self.capacity - (write_pos - int(self.header[READ_POS]))
+        if len(samples) > free:
+            self.header[DROPPED] += len(samples) - free
+            samples = samples[:free]
+
+        n = len(samples)
+        start = write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        # Publish only after the samples are in place
+        self.header[WRITE_POS] = write_pos + n
+        return n
+
+
+    def read(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Consumer side. Drain up to `max_samples` as a contiguous copy"""
+        read_pos = int(self.header[READ_POS])
+        n = int(self.header[WRITE_POS]) - read_pos
+        if max_samples is not None:
+            n = min(n, max_samples)
+
+        start = read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.empty(n, dtype=np.float32)
+        out[:first] = self.data[start:start + first]
+        out[first:] = self.data[:n - first]
+        self.header[READ_POS] = read_pos + n
+        return out
+
+
+    def close(self) -> None:
+        # The numpy views must go before the mapping can be closed
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            if sys.version_info < (3, 13):
+                # A child sharing our resource tracker dropped the registration when it attached
+                resource_tracker.register(self.shm._name, 'shared_memory')
+            self.shm.unlink()
@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Callable, List, Tuple
+
+# (start, end, text) with times in seconds from the start of the stream
+Word = Tuple[float, float, str]
+
+
+def _normalize_word(word: str) -> str:
+    return word.strip().lower().strip('.,!?;:"\'')
+
+
+class HypothesisBuffer:
+    """Commits the longest word prefix on which two consecutive decoding passes agree"""
+
+    def __init__(self):
+        self.committed: List[Word] = []
+        self.previous: List[Word] = []
+        self.new: List[Word] = []
+        self.last_committed_time = 0.0
+
+
+    def insert(self, words: List[Word], offset: float) -> None:
+        """Stage the words of a new pass, shifting them by the window offset"""
+        words = [(start + offset, end + offset, text) for start, end, text in words]
+        # Ignore words that belong to audio that is already committed
+        self.new = [w for w in words if w[0] > self.last_committed_time - 0.1]
+
+        # Drop an n-gram that repeats the tail of the committed text
+        if self.new and self.committed and abs(self.new[0][0] - self.last_committed_time) < 1.0:
+            for n in range(min(len(self.committed), len(self.new), 5), 0, -1):
+                tail = [_normalize_word(w[2]) for w in self.committed[-n:]]
+                head = [_normalize_word(w[2]) for w in self.new[:n]]
+                if tail == head:
+                    self.new = self.new[n:]
+                    break
+
+
+    def flush(self) -> List[Word]:
+        """Commit the agreed prefix of the staged pass and return the newly committed words"""
+        agreed = []
+        for prev, new in zip(self.previous, self.new):
+            if _normalize_word(prev[2]) != _normalize_word(new[2]):
+                break
+            agreed.append(new)
+
+        if agreed:
+            self.last_committed_time = agreed[-1][1]
+            self.committed.extend(agreed)
+
+        self.previous = self.new[len(agreed):]
+        self.new = []
+        return agreed
+
+
+    def pending(self) -> List[Word]:
+        """Uncommitted words from the most recent pass"""
+        return list(self.previous)
+
+
+    def pop_committed(self) -> List[Word]:
+        committed = self.committed
+        self.committed = []
+        return committed
+
+
+class StreamingTranscriber:
+    """Sliding-window transcription that re-decodes only the uncommitted tail.
+
+    `transcribe_fn(audio, prompt)` must return a list of (start, end, text) words
+    with times relative to the start of `audio`. Audio behind the last committed
+    word is dropped from the window and the committed text is passed back as the
+    prompt instead, so every pass keeps context without re-decoding it.
+    """
+
+    def __init__(self, transcribe_fn: Callable[[np.ndarray, str], List[Word]],
+                 sample_rate: int = 16000, max_window: float = 15.0, prompt_chars: int = 200):
+        self.transcribe_fn = transcribe_fn
+        self.sample_rate = sample_rate
+        self.max_window = max_window
+        self.prompt_chars = prompt_chars
+
+        self.hypothesis = HypothesisBuffer()
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0
+        self.context = ''
+
+
+    @property
+    def window_seconds(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+
+    def insert_audio(self, audio: np.ndarray) -> None:
+        if len(audio):
+            self.audio = np.concatenate((self.audio, np.asarray(audio, dtype=np.float32)))
+
+
+    def process(self) -> Tuple[str, str]:
+        """Run one decoding pass. Returns (newly committed text, partial text)"""
+        if len(self.audio) == 0:
+            return '', ''
+
+        words = self.transcribe_fn(self.audio, self.context[-self.prompt_chars:])
+        self.hypothesis.insert(words, self.offset)
+        committed = self.hypothesis.flush()
+
+        if self.window_seconds > self.max_window:
+            # No agreement for too long: accept the current hypothesis as it is
+            committed.extend(self.hypothesis.previous)
+            self.hypothesis.committed.extend(self.hypothesis.previous)
+            self.hypothesis.previous = []
+            self.hypothesis.last_committed_time = self.offset + self.window_seconds
+
+        self._trim(self.hypothesis.last_committed_time)
+
+        committed_text = _join(committed)
+        if committed_text:
+            self.context = (self.context + ' ' + committed_text).strip()
+        return committed_text, _join(self.hypothesis.pending())
+
+
+    def finish(self) -> str:
+        """Commit whatever is still pending and reset the window"""
+        pending = _join(self.hypothesis.pending())
+        self.hypothesis = HypothesisBuffer()
+        self.offset += self.window_seconds
+        self.hypothesis.last_committed_time = self.offset
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.context = ''
+        return pending
+
+
+    def _trim(self, until: float) -> None:
+        cut = int((until - self.offset) * self.sample_rate)
+        if cut > 0:
+            cut = min(cut, len(self.audio))
+            self.audio = self.audio[cut:]
+            self.offset += cut / self.sample_rate
+
+
+def _join(words: List[Word]) -> str:
+    return ''.join(w[2] for w in words).strip()
@@ -0,0 +1,76 @@
+import numpy as np
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+
+
+class SubtitleRenderer:
+    """Rasterizes subtitle text once into a cached sprite and alpha-blends it into frames.
+
+    Only the region covered by the text is touched, in place, so the per-frame
+    cost is a small NumPy blend instead of a full-frame PIL round trip.
+    """
+
+    def __init__(self, font_path: str = "C:\\Windows\\Fonts\\arial.ttf", font_size: int = 25,
+                 color=(255, 255, 255), stroke_width: int = 0, stroke_color=(0, 0, 0),
+                 channel_order: str = 'rgb', cache_size: int = 16):
+        try:
+            self.font = ImageFont.truetype(font_path, font_size)
+        except OSError:
+            print(f"Font {font_path} not found, using default font")
+            self.font = ImageFont.load_default()
+
+        self.color = tuple(color)
+        self.stroke_width = stroke_width
+        self.stroke_color = tuple(stroke_color)
+        self.channel_order = channel_order
+        self.cache_size = cache_size
+        self.sprites = OrderedDict()
+
+
+    def _sprite(self, text: str):
+        """Return (premultiplied color, 1 - alpha, left, top) for text anchored at its middle baseline"""
+        sprite = self.sprites.get(text)
+        if sprite is not None:
+            self.sprites.move_to_end(text)
+            return sprite
+
+        left, top, right, bottom = self.font.getbbox(text, anchor='ms', stroke_width=self.stroke_width)
+        image = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((-left, -top), text, font=self.font, anchor='ms', fill=self.color,
+                                   stroke_width=self.stroke_width, stroke_fill=self.stroke_color)
+
+        rgba = np.asarray(image, dtype=np.float32)
+        alpha = rgba[..., 3:4] / 255.0
+        color = rgba[..., :3] if self.channel_order == 'rgb' else rgba[..., 2::-1]
+        sprite = (color * alpha, 1.0 - alpha, left, top)
+
+        self.sprites[text] = sprite
+        while len(self.sprites) > self.cache_size:
+            self.sprites.popitem(last=False)
+        return sprite
+
+
+    def overlay(self, frame: np.ndarray, text: str, position) -> np.ndarray:
+        """Blend `text` into `frame` in place, `position` is the (x, y) middle-baseline anchor"""
+        if not text or not text.strip():
+            return frame
+
+        premultiplied, inverse_alpha, left, top = self._sprite(text)
+        height, width = frame.shape[:2]
+        x0, y0 = position[0] + left, position[1] + top
+        x1, y1 = x0 + premultiplied.shape[1], y0 + premultiplied.shape[0]
+
+        # Clip the sprite to the frame
+        sx0, sy0 = max(0, -x0), max(0, -y0)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        if x1 <= x0 or y1 <= y0:
+            return frame
+
+        sprite_rows = slice(sy0, sy0 + y1 - y0)
+        sprite_cols = slice(sx0, sx0 + x1 - x0)
+        roi = frame[y0:y1, x0:x1, :3]
+        blended = roi * inverse_alpha[sprite_rows, sprite_cols] + premultiplied[sprite_rows, sprite_cols]
+        np.clip(blended, 0, 255, out=blended)
+        roi[...] = blended.astype(frame.dtype)
+        return frame
@@ -0,0 +1,76 @@
+import numpy as np
+
+from adaptive_decoding import DecodingPolicy, transcribe_adaptive
+
+
+def segment(start, end, text, avg_logprob=-0.2, no_speech_prob=0.0, compression_ratio=1.2, words=None):
+    return {'start': start, 'end': end, 'text': text, 'avg_logprob': avg_logprob,
+            'no_speech_prob': no_speech_prob, 'compression_ratio': compression_ratio, 'words': words or []}
+
+
+class FakeWhisper:
+    """Returns scripted results: `greedy` for the first full-clip pass, `redecode(...)` for later passes"""
+
+    def __init__(self, greedy, redecode=None):
+        self.greedy = greedy
+        self.redecode = redecode
+        self.calls = []
+
+
+    def transcribe(self, audio, temperature=0.0, beam_size=None, best_of=None, **options):
+        self.calls.append((len(audio), temperature, beam_size))
+        if len(self.calls) == 1:
+            return {'text': ''.join(s['text'] for s in self.greedy), 'segments': self.greedy}
+        segments = self.redecode(len(audio), temperature, beam_size)
+        return {'text': ''.join(s['text'] for s in segments), 'segments': segments}
+
+
+AUDIO = np.zeros(16000 * 6, dtype=np.float32)
+
+
+def test_confident_greedy_decode_is_kept():
+    model = FakeWhisper([segment(0.0, 2.0, ' Hello.')])
+    result, path = transcribe_adaptive(model, AUDIO, DecodingPolicy())
+    assert path == 'greedy'
+    assert result['text'] == ' Hello.'
+    assert len(model.calls) == 1
+
+
+def test_silent_segments_are_dropped():
+    model = FakeWhisper([segment(0.0, 2.0, ' Thank you.', avg_logprob=-1.5, no_speech_prob=0.9)])
+    result, path = transcribe_adaptive(model, AUDIO, DecodingPolicy())
+    assert path == 'no_speech'
+    assert result['text'] == ''
+    assert len(model.calls) == 1
+
+
+def test_only_the_low_confidence_segment_is_decoded_again():
+    greedy = [segment(0.0, 2.0, ' Good morning.'),
+              segment(2.0, 3.5, ' mumble', avg_logprob=-1.4,
+                      words=[{'start': 2.0, 'end': 3.5, 'word': ' mumble'}]),
+              segment(3.5, 6.0, ' See you.')]
+    model = FakeWhisper(greedy, lambda n, temperature, beam: [
+        segment(0.1, 1.4, ' nice weather', words=[{'start': 0.1, 'end': 1.4, 'word': ' nice weather'}])])
+    result, path = transcribe_adaptive(model, AUDIO, DecodingPolicy())
+
+    assert path == 'beam'
+    # The second pass saw 1.5 s of audio with beam search, not the whole clip
+    assert model.calls[1] == (24000, 0.0, 5)
+    assert result['text'] == ' Good morning. nice weather See you.'
+    assert result['segments'][1]['start'] == 2.1
+    assert result['segments'][1]['words'][0]['end'] == 3.4
+
+
+def test_temperature_fallback_when_beam_is_still_unsure():
+    greedy = [segment(0.0, 2.0, ' aaaa aaaa', compression_ratio=3.0)]
+
+    def redecode(n, temperature, beam):
+        if beam is not None:
+            return [segment(0.0, 2.0, ' aaaa', compression_ratio=3.0)]
+        return [segment(0.0, 2.0, ' Ah.')]
+
+    model = FakeWhisper(greedy, redecode)
+    result, path = transcribe_adaptive(model, AUDIO, DecodingPolicy())
+    assert path == 'temperature'
+    assert result['text'] == ' Ah.'
+    assert model.calls[2][1] == DecodingPolicy().temperatures
@@ -0,0 +1,53 @@
+import pytest
+
+from history_store import HistoryStore
+
+
+def filled(path, count=300, window=50, index_every=16):
+    store = HistoryStore(path, window=window, index_every=index_every)
+    for seq in range(count):
+        store.append(seq, f"original {seq}", f"translation {seq}", timestamp=1000.0 + seq)
+    return store
+
+
+def test_range_inside_the_window_is_served_from_memory(tmp_path):
+    store = filled(str(tmp_path / 'history.log'))
+    assert [e.seq for e in store.range_by_seq(260, 265)] == [260, 261, 262, 263, 264]
+    assert [e.seq for e in store.latest(3)] == [297, 298, 299]
+
+
+def test_range_older_than_the_window_is_read_from_the_log(tmp_path):
+    store = filled(str(tmp_path / 'history.log'))
+    entries = store.range_by_seq(5, 40)
+    assert [e.seq for e in entries] == list(range(5, 40))
+    assert entries[0].original == 'original 5'
+    assert entries[-1].translation == 'translation 39'
+
+    # The scan starts at the nearest index point and stops at the end of the range
+    assert [e.seq for e in store.range_by_time(1017.0, 1020.0)] == [17, 18, 19]
+    assert len(store.range_by_seq()) == 300
+
+
+def test_memory_only_store_keeps_the_window(tmp_path):
+    store = filled(None, window=10)
+    assert len(store) == 300
+    assert [e.seq for e in store.range_by_seq()] == list(range(290, 300))
+
+
+def test_reopening_a_path_does_not_mix_in_the_previous_session(tmp_path):
+    path = str(tmp_path / 'history.log')
+    filled(path).close()
+
+    store = HistoryStore(path, window=2, index_every=16)
+    for seq in range(5):
+        store.append(seq, f"new {seq}", f"nueva {seq}", timestamp=2000.0 + seq)
+    assert [e.original for e in store.range_by_seq(0, 5)] == [f"new {seq}" for seq in range(5)]
+
+
+def test_append_after_close_raises(tmp_path):
+    store = filled(str(tmp_path / 'history.log'), count=3)
+    store.close()
+    with pytest.raises(ValueError):
+        store.append(3, 'late', 'tarde')
+    # What was recorded stays readable
+    assert [e.seq for e in store.range_by_seq(0, 3)] == [0, 1, 2]
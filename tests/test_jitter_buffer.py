@@ -0,0 +1,45 @@
+import numpy as np
+
+from jitter_buffer import JitterBuffer
+
+
+def pull(buffer, size=4):
+    out = np.full(size, -1.0, dtype=np.float32)
+    n = buffer.pull(out)
+    return n, out.tolist()
+
+
+def test_waits_for_prefill_while_the_queue_grows():
+    buffer = JitterBuffer(prefill_samples=8)
+    buffer.write(np.ones(4))
+    assert pull(buffer) == (0, [0, 0, 0, 0])
+    buffer.write(np.ones(4))
+    assert pull(buffer) == (4, [1, 1, 1, 1])
+
+
+def test_starts_below_prefill_once_the_queue_stops_growing():
+    buffer = JitterBuffer(prefill_samples=100)
+    buffer.write(np.ones(6))
+    assert pull(buffer)[0] == 0
+    # Nothing new arrived: play what is there rather than wait forever
+    assert pull(buffer) == (4, [1, 1, 1, 1])
+
+
+def test_underrun_pads_with_silence_and_rebuffers():
+    buffer = JitterBuffer(prefill_samples=2)
+    buffer.write(np.ones(6))
+    assert pull(buffer) == (4, [1, 1, 1, 1])
+    assert pull(buffer) == (2, [1, 1, 0, 0])
+    assert buffer.underruns == 1
+    assert buffer.underrun_samples == 2
+
+    buffer.write(np.ones(1))
+    assert pull(buffer)[0] == 0
+    assert buffer.stats()['underruns'] == 1
+
+
+def test_latency_cap_drops_the_oldest_samples():
+    buffer = JitterBuffer(prefill_samples=0, max_latency_samples=6)
+    buffer.write(np.arange(10))
+    assert pull(buffer) == (4, [4, 5, 6, 7])
+    assert buffer.stats()['dropped_samples'] == 4
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from message_bus import MessageBus
+
+
+def test_queue_subscribers_see_every_message_in_order():
+    bus = MessageBus()
+    subscription = bus.subscribe('t2s', 'queue')
+    for text in ('a', 'b', 'c'):
+        bus.publish(text)
+    assert [subscription.poll().content for _ in range(3)] == ['a', 'b', 'c']
+    assert subscription.poll() is None
+
+
+def test_latest_subscribers_skip_to_the_newest():
+    bus = MessageBus()
+    subscription = bus.subscribe('subtitle', 'latest')
+    for text in ('a', 'b', 'c'):
+        bus.publish(text)
+    assert subscription.poll().content == 'c'
+    assert subscription.poll() is None
+
+
+def test_subscribers_start_at_the_head():
+    bus = MessageBus()
+    bus.publish('before')
+    subscription = bus.subscribe('late')
+    assert subscription.poll() is None
+    bus.publish('after')
+    assert subscription.poll().content == 'after'
+
+
+def test_slow_subscriber_counts_messages_lost_to_retention():
+    bus = MessageBus(retention=3)
+    subscription = bus.subscribe('slow')
+    for i in range(10):
+        bus.publish(i)
+    assert subscription.lag() == 10
+    assert subscription.poll().content == 7
+    assert subscription.dropped == 7
+    assert subscription.lag() == 2
+
+
+def test_explicit_sequence_numbers_may_skip_but_not_go_back():
+    bus = MessageBus()
+    subscription = bus.subscribe('t2s')
+    bus.publish('a', seq=5)
+    assert subscription.poll().seq == 5
+    with pytest.raises(ValueError):
+        bus.publish('b', seq=5)
+
+
+def test_get_wakes_up_on_publish():
+    bus = MessageBus()
+    subscription = bus.subscribe('t2s')
+    threading.Timer(0.05, bus.publish, args=('late',)).start()
+    assert subscription.get(timeout=2).content == 'late'
+    assert subscription.get(timeout=0.05) is None
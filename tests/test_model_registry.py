@@ -0,0 +1,97 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from model_registry import ModelRegistry, model_bytes, model_footprint
+
+# Two 64x64 linear layers with biases: 33280 bytes at fp32
+MODEL_BYTES = 2 * (64 * 64 + 64) * 4
+
+
+def small_model():
+    return torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.Linear(64, 64))
+
+
+def registry(budget_bytes, *keys, precisions=('fp32',)):
+    models = ModelRegistry()
+    models.set_budget('cpu', budget_bytes)
+    for key in keys:
+        models.register(key, small_model, precisions=precisions)
+    return models
+
+
+def test_full_precision_when_it_fits():
+    models = registry(2 * MODEL_BYTES, 'a', precisions=('fp32', 'bf16'))
+    model = models.acquire('a')
+    assert models.entries['a'].precision == 'fp32'
+    assert model_bytes(model) == MODEL_BYTES
+
+
+def test_falls_back_to_bf16_when_fp32_does_not_fit():
+    models = registry(MODEL_BYTES * 3 // 4, 'a', precisions=('fp32', 'bf16'))
+    model = models.acquire('a')
+    assert models.entries['a'].precision == 'bf16'
+    assert next(model.parameters()).dtype == torch.bfloat16
+    assert model_bytes(model) == MODEL_BYTES // 2
+
+
+def test_falls_back_to_int8_when_fp32_does_not_fit():
+    models = registry(MODEL_BYTES // 2, 'a', precisions=('fp32', 'int8'))
+    model = models.acquire('a')
+    assert models.entries['a'].precision == 'int8'
+    assert isinstance(model[0], torch.nn.quantized.dynamic.Linear)
+    assert 0 < models.entries['a'].footprint['cpu'] < MODEL_BYTES
+
+
+def test_footprint_counts_int8_packed_weights():
+    quantized = torch.quantization.quantize_dynamic(small_model(), {torch.nn.Linear}, dtype=torch.qint8)
+    # The packed weights are one byte per value, the biases stay fp32 (plus a scale and zero point per layer)
+    footprint = model_footprint(quantized)['cpu']
+    assert 2 * (64 * 64 + 64 * 4) <= footprint < MODEL_BYTES // 3
+
+
+def test_evict_drops_least_recently_used_idle_models_only():
+    models = registry(4 * MODEL_BYTES, 'a', 'b', 'c')
+    for key in ('a', 'b', 'c'):
+        models.acquire(key)
+        models.release(key)
+    models.acquire('a')
+
+    # Over budget: 'a' is held, so the next least recently used idle model goes
+    models.set_budget('cpu', 2 * MODEL_BYTES + 100)
+    models.acquire('c')
+    models.release('c')
+    assert set(models.resident) == {'a', 'c'}
+    assert models.evictions == 1
+
+    # Held models stay resident even when nothing else can go
+    models.set_budget('cpu', MODEL_BYTES // 2)
+    models.acquire('c')
+    models.release('a')
+    assert 'c' in models.resident
+    assert 'a' not in models.resident
+
+
+def test_make_room_leaves_models_alone_when_it_cannot_free_enough():
+    models = registry(2 * MODEL_BYTES + 100, 'a', 'b')
+    models.acquire('a')
+    models.release('a')
+    models.acquire('b')
+
+    # Dropping idle 'a' still wouldn't fit this next to held 'b'
+    assert not models._make_room('cpu', MODEL_BYTES + 200, 'c')
+    assert set(models.resident) == {'a', 'b'}
+    assert models.evictions == 0
+
+    # This does fit once 'a' is gone
+    assert models._make_room('cpu', MODEL_BYTES, 'c')
+    assert set(models.resident) == {'b'}
+    assert models.evictions == 1
+
+
+def test_share_splits_budgets_between_workers():
+    models = ModelRegistry(budget_bytes=1000)
+    models.set_budget('cuda', 4000)
+    assert models.share(0.25) == {'cpu': 250, 'cuda': 1000}
+    # Devices without a budget aren't passed on
+    assert 'mps' not in models.share(0.5, device_types=('cpu', 'mps'))
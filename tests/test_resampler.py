@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from resampler import PolyphaseResampler
+
+
+def tone(rate, seconds=0.5, frequency=440.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+
+@pytest.mark.parametrize('in_rate', [44100, 48000, 22050])
+def test_output_does_not_depend_on_block_size(in_rate):
+    audio = tone(in_rate)
+    whole = PolyphaseResampler(in_rate).process(audio)
+
+    resampler = PolyphaseResampler(in_rate)
+    pieces = []
+    position = 0
+    for size in [1, 7, 1024, 333, 4096] * 10:
+        pieces.append(resampler.process(audio[position:position + size]))
+        position += size
+    pieces.append(resampler.process(audio[position:]))
+    chunked = np.concatenate(pieces)
+
+    assert len(chunked) == len(whole)
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+
+
+def test_rate_and_passband():
+    resampler = PolyphaseResampler(48000)
+    out = resampler.process(tone(48000, seconds=1.0))
+    assert len(out) == 16000
+    # A 440 Hz tone passes at unit gain, once the filter has settled
+    settled = out[1000:-1000]
+    assert abs(np.max(np.abs(settled)) - 1.0) < 0.01
+
+
+def test_content_above_the_new_nyquist_is_removed():
+    out = PolyphaseResampler(48000).process(tone(48000, frequency=12000.0))
+    assert np.max(np.abs(out[1000:-1000])) < 0.01
+
+
+def test_same_rate_is_a_passthrough_copy():
+    resampler = PolyphaseResampler(16000)
+    audio = tone(16000)
+    out = resampler.process(audio)
+    assert out is not audio
+    np.testing.assert_array_equal(out, audio)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+
+def test_wrapping_write_and_read_keep_order():
+    ring = AudioRingBuffer(8)
+    ring.write(np.arange(6))
+    assert ring.read(4).tolist() == [0, 1, 2, 3]
+    ring.write(np.arange(6, 12))
+    # The data now wraps around the end of the storage
+    head, tail = ring.peek()
+    assert len(tail) > 0
+    assert ring.read().tolist() == list(range(4, 12))
+    assert len(ring) == 0
+
+
+def test_overflow_drops_the_oldest_samples_and_counts_them():
+    ring = AudioRingBuffer(8)
+    ring.write(np.arange(6))
+    assert ring.write(np.arange(6, 11)) == 3
+    assert ring.overflow_count == 1
+    assert ring.dropped_samples == 3
+    assert ring.read().tolist() == list(range(3, 11))
+
+
+def test_write_larger_than_capacity_keeps_the_newest():
+    ring = AudioRingBuffer(4)
+    ring.write(np.arange(3))
+    assert ring.write(np.arange(10, 20)) == 3 + 10 - 4
+    assert ring.read().tolist() == [16, 17, 18, 19]
+    assert ring.total_written == 13
+
+
+def test_read_into_fills_a_caller_array_across_the_wrap():
+    ring = AudioRingBuffer(5)
+    ring.write(np.arange(4))
+    ring.consume(3)
+    ring.write(np.arange(4, 8))
+    out = np.full(6, -1.0, dtype=np.float32)
+    assert ring.read_into(out) == 5
+    assert out.tolist() == [3, 4, 5, 6, 7, -1]
+    assert ring.read_into(out) == 0
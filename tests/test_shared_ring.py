@@ -0,0 +1,37 @@
+import multiprocessing
+
+import numpy as np
+
+from shared_ring import SharedAudioRing
+
+
+def _produce(name, blocks):
+    ring = SharedAudioRing(name=name)
+    for block in blocks:
+        ring.write(block)
+    ring.close()
+
+
+def test_attached_processes_write_into_the_owners_ring():
+    ring = SharedAudioRing(capacity=16)
+    try:
+        # Like a restarted worker, each child attaches and detaches again
+        for blocks in ([[1.0, 2.0], [3.0]], [[4.0]]):
+            process = multiprocessing.get_context('spawn').Process(target=_produce, args=(ring.name, blocks))
+            process.start()
+            process.join(30)
+            assert process.exitcode == 0
+        assert ring.read().tolist() == [1.0, 2.0, 3.0, 4.0]
+    finally:
+        ring.close()
+
+
+def test_full_ring_drops_the_newest_samples():
+    ring = SharedAudioRing(capacity=4)
+    try:
+        assert ring.write(np.arange(3)) == 3
+        assert ring.write(np.arange(3, 6)) == 1
+        assert ring.dropped_samples == 2
+        assert ring.read().tolist() == [0, 1, 2, 3]
+    finally:
+        ring.close()
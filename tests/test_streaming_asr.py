@@ -0,0 +1,78 @@
+import numpy as np
+
+from async_memory import AsyncMemory
+from streaming_asr import HypothesisBuffer, StreamingTranscriber
+
+
+class ScriptedPasses:
+    """transcribe_fn stub that returns one prepared pass per call, with times relative to the window"""
+
+    def __init__(self, *passes):
+        self.passes = list(passes)
+        self.prompts = []
+
+
+    def __call__(self, audio, prompt):
+        self.prompts.append(prompt)
+        return self.passes.pop(0)
+
+
+def second_of_audio():
+    return np.zeros(16000, dtype=np.float32)
+
+
+def test_prefix_is_committed_once_two_passes_agree():
+    # Whisper words carry their leading space
+    passes = ScriptedPasses(
+        [(0.0, 0.4, ' hello'), (0.5, 0.9, ' word')],
+        [(0.0, 0.4, ' hello'), (0.5, 0.9, ' world'), (1.0, 1.4, ' how')],
+        # The window now starts at the end of 'hello'
+        [(0.1, 0.5, ' world'), (0.6, 1.0, ' how'), (1.1, 1.5, ' are')],
+    )
+    streamer = StreamingTranscriber(passes)
+
+    streamer.insert_audio(second_of_audio())
+    assert streamer.process() == ('', 'hello word')
+
+    streamer.insert_audio(second_of_audio())
+    # 'hello' agrees with the previous pass; 'word' became 'world', so the rest stays partial
+    assert streamer.process() == ('hello', 'world how')
+    # The committed audio is trimmed and its text becomes the prompt
+    assert streamer.offset == 0.4
+
+    streamer.insert_audio(second_of_audio())
+    assert streamer.process() == ('world how', 'are')
+    assert passes.prompts[-1] == 'hello'
+
+
+def test_finish_flushes_the_partial_tail():
+    streamer = StreamingTranscriber(ScriptedPasses([(0.0, 0.4, ' hola')]))
+    streamer.insert_audio(second_of_audio())
+    assert streamer.process() == ('', 'hola')
+    assert streamer.finish() == 'hola'
+    assert streamer.window_seconds == 0
+
+
+def test_repeated_ngram_is_not_committed_twice():
+    buffer = HypothesisBuffer()
+    buffer.insert([(0.0, 0.4, ' good'), (0.5, 0.9, ' morning')], offset=0.0)
+    buffer.flush()
+    buffer.insert([(0.0, 0.4, ' good'), (0.5, 0.9, ' morning')], offset=0.0)
+    assert [w[2] for w in buffer.flush()] == [' good', ' morning']
+
+    # A pass that starts by repeating the committed tail
+    buffer.insert([(0.95, 1.3, ' Morning.'), (1.4, 1.8, ' all')], offset=0.0)
+    assert [w[2] for w in buffer.new] == [' all']
+
+
+def test_partial_transcript_is_the_subtitle_until_the_final():
+    memory = AsyncMemory(history_path=None)
+    memory.write_buffer('first sentence')
+    assert memory.read_buffer_subtitle(block=False) == 'first sentence'
+
+    memory.set_partial_transcript('second sen')
+    assert memory.read_buffer_subtitle(block=False) == 'second sen'
+
+    memory.set_partial_transcript('')
+    memory.write_buffer('second sentence')
+    assert memory.read_buffer_subtitle(block=False) == 'second sentence'
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from async_memory import AsyncMemory
+from translation_pipeline import TranslationPipeline
+
+
+def fragments(text):
+    """Word by word, like a streaming LLM"""
+    for i, word in enumerate(text.split()):
+        time.sleep(0.05)
+        yield word if i == 0 else ' ' + word
+
+
+def run_streaming_pipeline(memory, translate_stream):
+    """The S2TT wiring: progress goes to the subtitle preview, finals to the bus"""
+    previews = []
+    published = threading.Event()
+
+    def progress(seq, text):
+        memory.set_subtitle_preview(seq, text)
+        previews.append(memory.read_buffer_subtitle(block=False))
+
+    def deliver(seq, text, translation, trace=None):
+        memory.write_buffer(translation, seq=seq, trace=trace)
+        published.set()
+
+    pipeline = TranslationPipeline(lambda text: ''.join(translate_stream(text)), deliver,
+                                   translate_stream=translate_stream, progress=progress)
+    pipeline.start()
+    pipeline.submit('uno dos tres')
+    assert published.wait(3)
+    pipeline.stop_pipeline()
+    return previews
+
+
+def check_progressive_subtitles(memory, previews, final):
+    # Every fragment updated the subtitle, before the final existed
+    assert previews == [' '.join(final.split()[:n]) for n in range(1, len(final.split()) + 1)]
+    # TTS only ever sees the finished translation
+    assert memory.read_buffer_t2s(timeout=0.1) == final
+    assert memory.read_buffer_t2s(timeout=0.1) is None
+    # Publishing the final cleared its preview, even without a subtitle reader
+    assert memory.previews == {}
+    assert memory.read_buffer_subtitle(block=False) == final
+
+
+def test_fragments_update_the_subtitle_and_tts_gets_only_the_final():
+    memory = AsyncMemory(history_path=None)
+    previews = run_streaming_pipeline(memory, fragments)
+    check_progressive_subtitles(memory, previews, 'uno dos tres')
+
+
+def test_fake_streaming_engine_drives_progressive_subtitles():
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    pytest.importorskip('langchain_google_genai')
+    from translation_cache import TranslationCache
+    from translator import T2TT
+
+    t2tt = T2TT(cache=TranslationCache(db_path=None), engine='fake',
+                engine_options={'first_token_latency': 0.05, 'token_interval': 0.02})
+    memory = AsyncMemory(history_path=None)
+    previews = run_streaming_pipeline(memory, lambda text: t2tt.translate_stream(text, 'spanish', 'german'))
+    check_progressive_subtitles(memory, previews, '[german] uno dos tres')
+
+
+def test_previews_do_not_pile_up_without_a_subtitle_reader():
+    memory = AsyncMemory(history_path=None)
+    for seq in range(100):
+        memory.set_subtitle_preview(seq, 'partial')
+        memory.write_buffer('final', seq=seq)
+    assert memory.previews == {}
+    # A late fragment for an already published transcript is ignored
+    memory.set_subtitle_preview(50, 'late')
+    assert memory.previews == {}
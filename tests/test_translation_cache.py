@@ -0,0 +1,59 @@
+import time
+
+from translation_cache import TranslationCache
+
+
+def test_keys_ignore_case_and_whitespace():
+    cache = TranslationCache(db_path=None)
+    cache.put('Hola  mundo', 'Spanish', 'English', 'Hello world')
+    assert cache.get(' hola mundo ', 'spanish', 'english') == 'Hello world'
+    assert cache.get('hola mundo', 'spanish', 'german') is None
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TranslationCache(db_path=None, max_memory_entries=2)
+    cache.put('a', 'es', 'en', 'A')
+    cache.put('b', 'es', 'en', 'B')
+    cache.get('a', 'es', 'en')
+    cache.put('c', 'es', 'en', 'C')
+    assert cache.get('b', 'es', 'en') is None
+    assert cache.get('a', 'es', 'en') == 'A'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'translations.db')
+    cache = TranslationCache(db_path=path)
+    cache.put('hola', 'es', 'en', 'hello')
+    cache.close()
+
+    cache = TranslationCache(db_path=path)
+    assert cache.get('hola', 'es', 'en') == 'hello'
+    assert cache.stats()['disk_hits'] == 1
+    # Promoted to the memory tier
+    assert cache.get('hola', 'es', 'en') == 'hello'
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / 'translations.db'), ttl=0.05)
+    cache.put('hola', 'es', 'en', 'hello')
+    time.sleep(0.1)
+    assert cache.get('hola', 'es', 'en') is None
+    assert cache.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 0
+
+
+def test_disk_tier_prunes_least_recently_used_rows(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / 'translations.db'), max_memory_entries=1, max_disk_entries=50)
+    cache.put('keep', 'es', 'en', 'kept')
+    for i in range(99):
+        time.sleep(0.0005)
+        if i == 60:
+            # Used recently, so it outlives older rows
+            assert cache.get('keep', 'es', 'en') == 'kept'
+        cache.put(f"text {i}", 'es', 'en', f"translation {i}")
+
+    rows = cache.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+    assert rows == 50
+    assert cache.get('keep', 'es', 'en') == 'kept'
+    assert cache.get('text 0', 'es', 'en') is None
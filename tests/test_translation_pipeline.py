@@ -0,0 +1,156 @@
+import threading
+import time
+
+from translation_pipeline import TranslationPipeline
+
+
+class Delivered:
+    def __init__(self):
+        self.items = []
+        self.done = threading.Event()
+        self.expected = None
+
+
+    def __call__(self, seq, text, translation, trace=None):
+        self.items.append((seq, text, translation))
+        if self.expected is not None and len(self.items) >= self.expected:
+            self.done.set()
+
+
+    def wait(self, count, timeout=5.0):
+        self.expected = count
+        if len(self.items) >= count:
+            return True
+        return self.done.wait(timeout)
+
+
+def test_results_are_delivered_in_submission_order():
+    delays = {'slow': 0.2, 'fast': 0.0}
+
+    def translate(text):
+        time.sleep(delays[text.split()[0]])
+        return text.upper()
+
+    delivered = Delivered()
+    pipeline = TranslationPipeline(translate, delivered, workers=4)
+    pipeline.start()
+    pipeline.submit('slow one')
+    pipeline.submit(' ', passthrough=True)
+    pipeline.submit('fast two')
+    assert delivered.wait(3)
+    pipeline.stop_pipeline()
+    assert delivered.items == [(0, 'slow one', 'SLOW ONE'), (1, ' ', ' '), (2, 'fast two', 'FAST TWO')]
+
+
+def test_full_queue_applies_backpressure():
+    release = threading.Event()
+
+    def translate(text):
+        release.wait()
+        return text
+
+    delivered = Delivered()
+    pipeline = TranslationPipeline(translate, delivered, workers=1, max_pending=2)
+    pipeline.start()
+    submitted = []
+    producer = threading.Thread(target=lambda: submitted.extend(pipeline.submit(str(i)) for i in range(4)))
+    producer.start()
+    time.sleep(0.3)
+    # The first transcript is held by the delivery thread, two more fill the queue, the fourth waits
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(2)
+    assert submitted == [0, 1, 2, 3]
+    assert delivered.wait(4)
+    assert pipeline.stats()['backpressure_waits'] >= 1
+    pipeline.stop_pipeline()
+
+
+def test_stop_releases_a_submit_blocked_on_a_full_queue():
+    release = threading.Event()
+    pipeline = TranslationPipeline(lambda text: release.wait() and text, Delivered(), workers=1, max_pending=1)
+    pipeline.start()
+    results = []
+    producer = threading.Thread(target=lambda: results.extend(pipeline.submit(str(i)) for i in range(3)))
+    producer.start()
+    time.sleep(0.3)
+    assert producer.is_alive()
+
+    pipeline.stop_pipeline()
+    producer.join(1)
+    release.set()
+    assert not producer.is_alive()
+    assert results[-1] == -1
+
+
+def test_failed_translation_delivers_the_source_text():
+    def translate(text):
+        raise RuntimeError('backend down')
+
+    delivered = Delivered()
+    pipeline = TranslationPipeline(translate, delivered)
+    pipeline.start()
+    pipeline.submit('hola')
+    assert delivered.wait(1)
+    pipeline.stop_pipeline()
+    assert delivered.items == [(0, 'hola', 'hola')]
+
+
+def test_batches_queued_transcripts_and_rejects_short_results():
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def translate_batch(texts):
+        calls.append(list(texts))
+        started.set()
+        release.wait()
+        # Drops the last result of a batch of more than one
+        return [text.upper() for text in texts][:1 if len(texts) > 1 else None]
+
+    delivered = Delivered()
+    pipeline = TranslationPipeline(lambda text: text, delivered, translate_batch=translate_batch)
+    pipeline.start()
+    pipeline.submit('a')
+    assert started.wait(1)
+    pipeline.submit('b')
+    pipeline.submit('c')
+    release.set()
+
+    # The short batch fails as a whole and falls back to the source text instead of hanging
+    assert delivered.wait(3)
+    pipeline.stop_pipeline()
+    assert calls == [['a'], ['b', 'c']]
+    assert delivered.items == [(0, 'a', 'A'), (1, 'b', 'b'), (2, 'c', 'c')]
+
+
+def test_wait_until_delivered_returns_after_the_last_delivery():
+    release = threading.Event()
+
+    def translate(text):
+        release.wait(5)
+        return text.upper()
+
+    delivered = Delivered()
+    pipeline = TranslationPipeline(translate, delivered)
+    pipeline.start()
+    pipeline.submit('one')
+    pipeline.submit('two')
+    assert not pipeline.wait_until_delivered(timeout=0.05)
+    release.set()
+    assert pipeline.wait_until_delivered(timeout=5)
+    assert [item[2] for item in delivered.items] == ['ONE', 'TWO']
+    pipeline.stop_pipeline()
+
+
+def test_stop_wakes_wait_until_delivered():
+    release = threading.Event()
+    pipeline = TranslationPipeline(lambda text: release.wait(5) and text, Delivered())
+    pipeline.start()
+    pipeline.submit('one')
+    threading.Timer(0.05, pipeline.stop_pipeline).start()
+    started = time.monotonic()
+    assert not pipeline.wait_until_delivered(timeout=5)
+    assert time.monotonic() - started < 1
+    release.set()
@@ -0,0 +1,124 @@
+import time
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+pytest.importorskip('langchain')
+pytest.importorskip('langchain_google_genai')
+
+from translation_cache import TranslationCache
+from translation_client import CircuitBreaker, MockTranslationBackend
+from translator import GeminiRestEngine, ResilientTranslator, T2TT, TranslationEngine, TranslationUnavailable
+
+
+@pytest.fixture
+def backend():
+    backends = []
+
+    def start(**options):
+        server = MockTranslationBackend(**options)
+        server.start()
+        backends.append(server)
+        return server
+
+    yield start
+    for server in backends:
+        server.stop_server()
+
+
+def test_unhealthy_backend_opens_breaker(backend):
+    server = backend(failure_rate=1.0, error_status=503)
+    translator = ResilientTranslator(GeminiRestEngine(base_url=server.url), deadline=1.0, backoff=0.0,
+                                     breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+    for _ in range(5):
+        with pytest.raises(TranslationUnavailable):
+            translator.translate('hola', 'spanish', 'english')
+    # 503 is retried: every call used all its attempts
+    assert server.requests == 5 * translator.attempts
+
+    with pytest.raises(TranslationUnavailable, match='circuit breaker open'):
+        translator.translate('hola', 'spanish', 'english')
+    assert server.requests == 5 * translator.attempts
+    assert translator.stats()['opens'] == 1
+
+
+def test_client_errors_are_not_retried(backend):
+    server = backend(failure_rate=1.0, error_status=400)
+    translator = ResilientTranslator(GeminiRestEngine(base_url=server.url), deadline=1.0)
+    with pytest.raises(TranslationUnavailable, match='HTTP 400'):
+        translator.translate('hola', 'spanish', 'english')
+    assert server.requests == 1
+
+
+def test_no_backoff_after_last_attempt(backend, monkeypatch):
+    server = backend(failure_rate=1.0, error_status=503)
+    monkeypatch.setattr('translator.random.uniform', lambda low, high: high)
+    translator = ResilientTranslator(GeminiRestEngine(base_url=server.url), deadline=3.0, attempts=2,
+                                     backoff=0.2, max_backoff=0.2)
+    started = time.monotonic()
+    with pytest.raises(TranslationUnavailable):
+        translator.translate('hola', 'spanish', 'english')
+    # One backoff between the two attempts, none after the second
+    assert time.monotonic() - started < 0.35
+    assert server.requests == 2
+
+
+def test_healthy_backend_reuses_one_connection(backend):
+    server = backend()
+    t2tt = T2TT(cache=TranslationCache(db_path=None), engine=GeminiRestEngine(base_url=server.url))
+    # Engine instances get the same deadline, retries and breaker as engines given by name
+    assert isinstance(t2tt.engine, ResilientTranslator)
+
+    for i in range(10):
+        assert t2tt.translate(f"hola {i}", 'spanish', 'english') == f"[mock] hola {i}"
+    stats = t2tt.engine.stats()
+    assert stats['connections_created'] == 1
+    assert stats['connections_reused'] == 9
+
+
+def test_base_url_from_environment(backend, monkeypatch):
+    server = backend()
+    monkeypatch.setenv('GEMINI_BASE_URL', server.url)
+    assert GeminiRestEngine().translate('hola', 'spanish', 'english') == '[mock] hola'
+    assert server.requests == 1
+
+
+def test_slow_backend_times_out_within_deadline(backend):
+    server = backend(latency=1.0)
+    translator = ResilientTranslator(GeminiRestEngine(base_url=server.url), deadline=0.3)
+    started = time.monotonic()
+    with pytest.raises(TranslationUnavailable):
+        translator.translate('hola', 'spanish', 'english')
+    assert time.monotonic() - started < 0.6
+
+
+def test_unavailable_backend_passes_source_text_through(backend):
+    server = backend(failure_rate=1.0)
+    t2tt = T2TT(cache=TranslationCache(db_path=None), engine=GeminiRestEngine(base_url=server.url))
+    assert t2tt.translate('hola', 'spanish', 'english') == 'hola'
+    # Failures are not cached
+    server.failure_rate = 0.0
+    assert t2tt.translate('hola', 'spanish', 'english') == '[mock] hola'
+
+
+class FirstCallStalls(TranslationEngine):
+    name = 'gemini-rest'
+
+    def __init__(self):
+        self.calls = 0
+
+
+    def translate(self, text, source_language, target_language):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(1.0)
+        return f"[{self.calls}] {text}"
+
+
+def test_hedged_request_wins_over_stalled_one():
+    engine = FirstCallStalls()
+    t2tt = T2TT(cache=TranslationCache(db_path=None), engine=engine, hedge_after=0.1)
+    started = time.monotonic()
+    assert t2tt.translate('hola', 'spanish', 'english') == '[2] hola'
+    assert time.monotonic() - started < 0.5
+    assert engine.calls == 2
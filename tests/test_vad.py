@@ -0,0 +1,65 @@
+import numpy as np
+
+from vad import VoiceActivityDetector
+
+FRAME = 320  # 20 ms at 16 kHz
+
+
+def frames(*pattern):
+    """Audio from (active, n_frames) pairs: a loud tone or silence"""
+    chunks = []
+    for active, count in pattern:
+        n = count * FRAME
+        chunks.append(0.5 * np.sin(np.arange(n) * 0.3) if active else np.zeros(n))
+    return np.concatenate(chunks).astype(np.float32)
+
+
+def detector(**options):
+    return VoiceActivityDetector(onset_frames=3, hangover_frames=5, padding_frames=2, **options)
+
+
+def test_short_blips_do_not_start_speech():
+    vad = detector()
+    assert vad.process(frames((False, 10), (True, 2), (False, 10), (True, 1), (False, 10))) == []
+    assert not vad.in_speech
+
+
+def test_segment_keeps_pre_roll_and_trailing_padding():
+    vad = detector()
+    segments = vad.process(frames((False, 10), (True, 20), (False, 10)))
+    assert len(segments) == 1
+    segment = segments[0]
+    # Onset padding: the 2 frames before the 3 onset frames are included
+    assert segment.start == 8 * FRAME / 16000
+    # Speech ends at frame 30, plus 2 frames of padding
+    assert segment.end == 32 * FRAME / 16000
+    assert len(segment.audio) == 24 * FRAME
+
+
+def test_pause_shorter_than_the_hangover_does_not_split():
+    vad = detector()
+    segments = vad.process(frames((True, 10), (False, 4), (True, 10), (False, 10)))
+    assert len(segments) == 1
+    assert vad.in_speech is False
+
+
+def test_chunking_does_not_change_the_segments():
+    audio = frames((False, 7), (True, 13), (False, 9), (True, 6), (False, 12))
+    whole = detector().process(audio)
+
+    vad = detector()
+    pieces = []
+    for start in range(0, len(audio), 777):
+        pieces.extend(vad.process(audio[start:start + 777]))
+    assert [(s.start, s.end) for s in pieces] == [(s.start, s.end) for s in whole]
+    assert all(np.array_equal(a.audio, b.audio) for a, b in zip(pieces, whole))
+
+
+def test_overlong_speech_is_split_and_flush_closes_the_rest():
+    vad = detector(max_segment_seconds=0.2)
+    segments = vad.process(frames((True, 25)))
+    assert [len(s.audio) // FRAME for s in segments] == [10, 10]
+    assert vad.in_speech
+    rest = vad.flush()
+    assert rest.start == segments[-1].end
+    assert vad.flush() is None
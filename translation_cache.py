@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Cache key form of a transcript: collapsed whitespace, case-folded"""
+    return ' '.join(text.split()).casefold()
+
+
+class TranslationCache:
+    """Two-tier translation cache: bounded in-process LRU in front of a SQLite store.
+
+    Keys are (source language, target language, normalized text). Entries older
+    than `ttl` seconds are treated as misses; both tiers are bounded by entry count.
+    Pass `db_path=None` for a memory-only cache.
+    """
+
+    def __init__(self, db_path: Optional[str] = './cache/translations.db', max_memory_entries: int = 2048,
+                 max_disk_entries: int = 100000, ttl: Optional[float] = 30 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db = None
+        self._inserts_since_prune = 0
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (source, target, text)
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            self.db.commit()
+
+
+    def _key(self, text: str, source_language: str, target_language: str) -> Tuple[str, str, str]:
+        return source_language.casefold(), target_language.casefold(), normalize_text(text)
+
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+
+    def get(self, text: str, source_language: str, target_language: str) -> Optional[str]:
+        key = self._key(text, source_language, target_language)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                translation, created = entry
+                if not self._expired(created, now):
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return translation
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT translation, created FROM translations WHERE source=? AND target=? AND text=?",
+                    key
+                ).fetchone()
+                if row is not None:
+                    translation, created = row
+                    if not self._expired(created, now):
+                        self.db.execute(
+                            "UPDATE translations SET last_used=? WHERE source=? AND target=? AND text=?",
+                            (now, *key)
+                        )
+                        self.db.commit()
+                        self._remember(key, translation, created)
+                        self.disk_hits += 1
+                        return translation
+                    self.db.execute("DELETE FROM translations WHERE source=? AND target=? AND text=?", key)
+                    self.db.commit()
+
+            self.misses += 1
+            return None
+
+
+    def put(self, text: str, source_language: str, target_language: str, translation: str) -> None:
+        key = self._key(text, source_language, target_language)
+        now = time.time()
+        with self.lock:
+            self._remember(key, translation, now)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, translation, now, now)
+                )
+                self.db.commit()
+                self._inserts_since_prune += 1
+                if self._inserts_since_prune >= 100:
+                    self._prune_disk(now)
+
+
+    def _remember(self, key, translation: str, created: float) -> None:
+        self.memory[key] = (translation, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+
+    def _prune_disk(self, now: float) -> None:
+        """Drop expired rows and the least recently used rows above the size limit"""
+        self._inserts_since_prune = 0
+        if self.ttl is not None:
+            self.db.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl,))
+        self.db.execute("""
+            DELETE FROM translations WHERE rowid IN (
+                SELECT rowid FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_disk_entries,))
+        self.db.commit()
+
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_entries': len(self.memory),
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+    def close(self) -> None:
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,216 @@
+import json
+import queue
+import random
+import threading
+import time
+import urllib.parse
+from http.client import HTTPConnection, HTTPSConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, body: bytes = b''):
+        detail = ' '.join(body[:200].decode('utf-8', 'replace').split())
+        super().__init__(f"HTTP {status}: {detail}" if detail else f"HTTP {status}")
+        self.status = status
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across requests and threads"""
+
+    def __init__(self, base_url: str, size: int = 4):
+        parts = urllib.parse.urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.idle = queue.LifoQueue(maxsize=size)
+
+        # Statistics
+        self.created = 0
+        self.reused = 0
+
+
+    def _connect(self, timeout: float):
+        self.created += 1
+        connection_class = HTTPSConnection if self.https else HTTPConnection
+        return connection_class(self.host, self.port, timeout=timeout)
+
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None, timeout: float = 10.0) -> Tuple[int, bytes]:
+        """Send one request on a pooled connection, returns (status, body)"""
+        try:
+            connection = self.idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            connection = self._connect(timeout)
+            reused = False
+
+        try:
+            status, data, keep = self._send(connection, method, path, body, headers, timeout)
+        except (ConnectionError, OSError) as e:
+            connection.close()
+            if not reused or isinstance(e, TimeoutError):
+                raise
+            # The server dropped an idle keep-alive connection, try once on a fresh one
+            connection = self._connect(timeout)
+            status, data, keep = self._send(connection, method, path, body, headers, timeout)
+        except Exception:
+            connection.close()
+            raise
+
+        if reused:
+            self.reused += 1
+        if keep:
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        else:
+            connection.close()
+        return status, data
+
+
+    def _send(self, connection, method, path, body, headers, timeout):
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        connection.request(method, self.base_path + path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        return response.status, data, not response.will_close
+
+
+    def stats(self) -> dict:
+        return {'connections_created': self.created, 'connections_reused': self.reused, 'idle': self.idle.qsize()}
+
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend for `reset_timeout` seconds after `failure_threshold` failures in a row.
+
+    Once the timeout has passed a single trial request is let through
+    (half-open); its outcome closes the breaker or opens it again.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+        # Statistics
+        self.opens = 0
+        self.rejected = 0
+
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.state != self.CLOSED:
+                print("Translation backend recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                    print(f"Translation backend unhealthy, showing source text for {self.reset_timeout:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'state': self.state, 'consecutive_failures': self.failures,
+                    'opens': self.opens, 'rejected': self.rejected}
+
+
+class MockTranslationBackend:
+    """Local stand-in for the Gemini generateContent endpoint, for testing the client offline.
+
+    Replies with "[mock] <text>" after `latency` seconds, and fails with
+    `error_status` for a `failure_rate` fraction of requests.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, failure_rate: float = 0.0, error_status: int = 503):
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.server = None
+
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+    def start(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                backend.requests += 1
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                time.sleep(backend.latency)
+                if random.random() < backend.failure_rate:
+                    self.send_error(backend.error_status)
+                    return
+                prompt = request['contents'][0]['parts'][0]['text']
+                text = prompt.split('Text to translate:')[-1].split('Translation:')[0].strip()
+                body = json.dumps({'candidates': [{'content': {'parts': [{'text': f"[mock] {text}"}]}}]}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.server.daemon_threads = True
+        # Clients hanging up on slow responses is expected here
+        self.server.handle_error = lambda request, client_address: None
+        threading.Thread(target=self.server.serve_forever, args=(), daemon=True).start()
+
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
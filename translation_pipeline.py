@@ -0,0 +1,230 @@
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+from metrics import NULL_TRACE, metrics
+
+
+class TranslationPipeline:
+    """Concurrent translation stage fed by a bounded queue of transcripts.
+
+    Transcripts are translated on a worker pool while the transcriber keeps
+    running. A single delivery thread hands results to `deliver(seq, text,
+    translation)` strictly in submission order. When `max_pending` transcripts
+    are in flight, `submit` blocks, which is recorded as backpressure.
+
+    With `translate_stream`, translations arrive as fragments and
+    `progress(seq, text_so_far)` is called after each one, ahead of the
+    in-order final delivery. With `translate_batch`, a single batching thread
+    translates everything queued since its last call together, up to
+    `max_batch` transcripts, instead of one at a time on the pool.
+    """
+
+    def __init__(self, translate: Callable[[str], str],
+                 deliver: Callable[..., None],
+                 workers: int = 2, max_pending: int = 8,
+                 translate_stream: Optional[Callable[[str], Iterator[str]]] = None,
+                 progress: Optional[Callable[[int, str], None]] = None,
+                 translate_batch: Optional[Callable[[List[str]], List[str]]] = None, max_batch: int = 8):
+        self.translate = translate
+        self.deliver = deliver
+        self.translate_stream = translate_stream
+        self.progress = progress
+        self.translate_batch = translate_batch
+        self.max_batch = max_batch
+        self.batch_queue = queue.Queue()
+        self.workers = workers
+        self.pending = queue.Queue(maxsize=max_pending)
+
+        self.executor = None
+        self.stop = False
+        self.next_seq = 0
+
+        # Statistics
+        self.stats_lock = threading.Lock()
+        # Signalled by the delivery thread after every delivery, and on stop
+        self.delivered = threading.Condition(self.stats_lock)
+        self.completed = 0
+        self.max_depth = 0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+        self.falling_behind = False
+        self.batches = 0
+        self.batched_texts = 0
+
+
+    def start(self):
+        self.stop = False
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='t2tt')
+        threading.Thread(target=self._deliver_in_order, args=(), daemon=True).start()
+        if self.translate_batch is not None:
+            threading.Thread(target=self._translate_batches, args=(), daemon=True).start()
+
+
+    def submit(self, text: Optional[str], passthrough: bool = False, trace=NULL_TRACE) -> int:
+        """Queue a transcript, returns its sequence number.
+
+        Passthrough items (e.g. blank subtitles) skip translation but keep their
+        place in the output order.
+        """
+        if self.stop:
+            return -1
+        seq = self.next_seq
+        self.next_seq += 1
+
+        if passthrough or not text:
+            future = Future()
+            future.set_result(text or '')
+        elif self.translate_batch is not None:
+            future = Future()
+            self.batch_queue.put((text, trace, future))
+        else:
+            try:
+                future = self.executor.submit(self._translate, seq, text, trace)
+            except RuntimeError:
+                # stop_pipeline shut the pool down while this transcript was on its way
+                return -1
+
+        item = (seq, text, future, trace)
+        try:
+            self.pending.put_nowait(item)
+            if self.falling_behind and self.pending.qsize() <= self.pending.maxsize // 2:
+                self.falling_behind = False
+                print("Translation caught up")
+        except queue.Full:
+            if not self.falling_behind:
+                self.falling_behind = True
+                print("Translation falling behind, transcription is waiting...")
+            started = time.monotonic()
+            # Keep checking for stop_pipeline, whose sentinel can't get into a full queue
+            while True:
+                try:
+                    self.pending.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self.stop:
+                        return -1
+            with self.stats_lock:
+                self.backpressure_waits += 1
+                self.backpressure_seconds += time.monotonic() - started
+
+        with self.stats_lock:
+            self.max_depth = max(self.max_depth, self.pending.qsize())
+        return seq
+
+
+    def _translate(self, seq: int, text: str, trace) -> str:
+        trace.mark('translate_wait')
+        if self.translate_stream is None:
+            translation = self.translate(text)
+        else:
+            started = time.monotonic()
+            translation = ''
+            for fragment in self.translate_stream(text):
+                if not translation:
+                    metrics.observe('translate_first_token', time.monotonic() - started)
+                    trace.finish('subtitle_first_end_to_end')
+                translation += fragment
+                if self.progress is not None:
+                    self.progress(seq, translation.strip())
+            translation = translation.strip()
+        trace.mark('translate')
+        return translation
+
+
+    def _translate_batches(self):
+        """Translate whatever queued up while the previous batch was running, in one call"""
+        while not self.stop:
+            try:
+                batch = [self.batch_queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.batch_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for _, trace, _ in batch:
+                trace.mark('translate_wait')
+            try:
+                translations = self.translate_batch([text for text, _, _ in batch])
+                if len(translations) != len(batch):
+                    raise ValueError(f"translate_batch returned {len(translations)} results for {len(batch)} texts")
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self.stats_lock:
+                self.batches += 1
+                self.batched_texts += len(batch)
+            for (_, trace, future), translation in zip(batch, translations):
+                trace.mark('translate')
+                future.set_result(translation)
+
+
+    def _deliver_in_order(self):
+        while not self.stop:
+            item = self.pending.get()
+            if item is None:
+                break
+
+            seq, text, future, trace = item
+            try:
+                translation = future.result()
+            except CancelledError:
+                # Dropped by stop_pipeline, nothing left to deliver
+                continue
+            except Exception as e:
+                # Like T2TT, show the source transcript rather than an error
+                print(f"Translation failed, showing source text: {str(e)}")
+                metrics.inc('translation_passthrough')
+                translation = text
+
+            if self.stop:
+                break
+            self.deliver(seq, text, translation, trace)
+            with self.delivered:
+                self.completed += 1
+                self.delivered.notify_all()
+
+
+    def wait_until_delivered(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every transcript submitted so far to be delivered. False on timeout or stop"""
+        with self.delivered:
+            self.delivered.wait_for(lambda: self.stop or self.completed >= self.next_seq, timeout)
+            return self.completed >= self.next_seq
+
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return {
+                'submitted': self.next_seq,
+                'completed': self.completed,
+                'queue_depth': self.pending.qsize(),
+                'max_depth': self.max_depth,
+                'backpressure_waits': self.backpressure_waits,
+                'backpressure_seconds': self.backpressure_seconds,
+                'batches': self.batches,
+                'mean_batch': self.batched_texts / self.batches if self.batches else 0.0,
+            }
+
+
+    def stop_pipeline(self):
+        self.stop = True
+        with self.delivered:
+            self.delivered.notify_all()
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        # Like the pool's queued work, batched transcripts not yet started are dropped
+        while True:
+            try:
+                self.batch_queue.get_nowait()[2].cancel()
+            except queue.Empty:
+                break
@@ -0,0 +1,287 @@
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+from typing import Callable, Iterator, Optional
+from asr_batcher import BatchedTranscriber
+from asr_models import select_whisper_model
+from metrics import MetricsServer, metrics
+from model_registry import models
+from translation_pipeline import TranslationPipeline
+from translator import T2TT
+from vad import VoiceActivityDetector
+
+# Every message is a frame: kind (1 byte) and payload length, then the payload
+FRAME_HEADER = struct.Struct('<cI')
+
+# Client -> server
+HELLO = b'H'  # JSON {"in_lang": ..., "out_lang": ...}, must come first
+AUDIO = b'A'  # float32 mono PCM at 16 kHz
+END = b'E'    # no more audio, the server replies END once every result is sent
+
+# Server -> client
+RESULT = b'R'  # JSON {"seq": ..., "transcript": ..., "translation": ...}
+ERROR = b'X'   # JSON {"error": ...}
+
+SAMPLE_RATE = 16000
+
+
+def send_frame(sock: socket.socket, kind: bytes, payload: bytes = b'') -> None:
+    sock.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def recv_frame(sock: socket.socket):
+    """(kind, payload), or (None, b'') once the peer closed the connection"""
+    header = recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None, b''
+    kind, length = FRAME_HEADER.unpack(header)
+    payload = recv_exact(sock, length) if length else b''
+    return (kind, payload) if payload is not None else (None, b'')
+
+
+def clean_text(text: str) -> str:
+    text = ' '.join(text.split())
+    return text.capitalize() if text else ''
+
+
+class Session:
+    """One connected speaker: its own VAD, language pair and in-order translation stage"""
+
+    def __init__(self, session_id: int, in_lang: str, out_lang: str, transcriber: BatchedTranscriber,
+                 t2tt: T2TT, send: Callable[[dict], None]):
+        self.session_id = session_id
+        self.in_lang = in_lang
+        self.out_lang = out_lang
+        self.transcriber = transcriber
+        self.t2tt = t2tt
+        self.send = send
+
+        self.vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE)
+        self.transcripts = queue.Queue()  # ASR futures in segment order, None ends the session
+        self.pipeline = TranslationPipeline(self._translate, self._deliver)
+        self.done = threading.Event()
+
+
+    def start(self):
+        self.pipeline.start()
+        threading.Thread(target=self.publish, args=(), daemon=True).start()
+
+
+    def feed(self, audio: np.ndarray) -> None:
+        for segment in self.vad.process(audio):
+            self.transcripts.put(self.transcriber.submit(segment.audio, self.in_lang))
+
+
+    def finish(self) -> None:
+        """Flush the open utterance; returns once every result has been sent"""
+        segment = self.vad.flush()
+        if segment is not None:
+            self.transcripts.put(self.transcriber.submit(segment.audio, self.in_lang))
+        self.transcripts.put(None)
+        self.done.wait()
+
+
+    def publish(self):
+        """Waits on ASR results in order so the shared decode thread never blocks on a session"""
+        while True:
+            future = self.transcripts.get()
+            if future is None:
+                break
+            try:
+                text = clean_text(future.result())
+            except Exception as e:
+                print(f"Session {self.session_id}: transcription failed: {str(e)}")
+                continue
+            if text:
+                self.pipeline.submit(text)
+
+        self.pipeline.wait_until_delivered()
+        self.pipeline.stop_pipeline()
+        self.done.set()
+
+
+    def _translate(self, transcription: str) -> str:
+        if self.in_lang == self.out_lang:
+            return transcription
+        return self.t2tt.translate(transcription, self.in_lang, self.out_lang)
+
+
+    def _deliver(self, seq: int, transcription: str, translation: str, trace=None):
+        self.send({'seq': seq, 'transcript': transcription, 'translation': translation})
+
+
+class TranslationServer:
+    """Serves many concurrent sessions over TCP from one shared, batched Whisper model"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9200, asr_model: str = 'auto', device=None,
+                 translator='gemini', max_batch: int = 8, max_wait: float = 0.05):
+        self.host = host
+        self.port = port
+        self.model_key = select_whisper_model(asr_model, device)
+        self.transcriber = BatchedTranscriber(models.acquire(self.model_key), max_batch=max_batch, max_wait=max_wait)
+        self.t2tt = T2TT(engine=translator)
+        self.server = None
+
+        self.lock = threading.Lock()
+        self.session_ids = 0
+        self.active_sessions = 0
+
+
+    def start(self):
+        self.transcriber.start()
+        owner = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                owner.handle_connection(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        print(f"Translation server listening on {self.host}:{self.server.server_address[1]}")
+        threading.Thread(target=self.server.serve_forever, args=(), daemon=True).start()
+
+
+    def handle_connection(self, sock: socket.socket):
+        kind, payload = recv_frame(sock)
+        if kind != HELLO:
+            send_frame(sock, ERROR, json.dumps({'error': 'expected hello'}).encode('utf-8'))
+            return
+        config = json.loads(payload)
+
+        send_lock = threading.Lock()
+
+        def send(result: dict):
+            try:
+                with send_lock:
+                    send_frame(sock, RESULT, json.dumps(result).encode('utf-8'))
+            except OSError:
+                # Client went away, its remaining results are dropped
+                pass
+
+        with self.lock:
+            session_id = self.session_ids
+            self.session_ids += 1
+            self.active_sessions += 1
+        session = Session(session_id, config.get('in_lang', 'english'), config.get('out_lang', 'english'),
+                          self.transcriber, self.t2tt, send)
+        print(f"Session {session_id} started ({session.in_lang} -> {session.out_lang})")
+        session.start()
+
+        try:
+            while True:
+                kind, payload = recv_frame(sock)
+                if kind == AUDIO:
+                    session.feed(np.frombuffer(payload, dtype=np.float32))
+                elif kind == END or kind is None:
+                    break
+            session.finish()
+            if kind == END:
+                with send_lock:
+                    send_frame(sock, END)
+        except OSError as e:
+            print(f"Session {session_id} disconnected: {str(e)}")
+        finally:
+            with self.lock:
+                self.active_sessions -= 1
+            print(f"Session {session_id} ended")
+            models.reclaim()
+
+
+    def stats(self) -> dict:
+        stats = self.transcriber.stats()
+        with self.lock:
+            stats['active_sessions'] = self.active_sessions
+            stats['sessions'] = self.session_ids
+        return stats
+
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.transcriber.stop_transcriber()
+        models.release(self.model_key)
+
+
+class TranslationClient:
+    """Minimal client for one session, e.g. a call participant's audio bridge"""
+
+    def __init__(self, in_lang: str, out_lang: str, host: str = '127.0.0.1', port: int = 9200):
+        self.sock = socket.create_connection((host, port))
+        send_frame(self.sock, HELLO, json.dumps({'in_lang': in_lang, 'out_lang': out_lang}).encode('utf-8'))
+
+
+    def send_audio(self, samples: np.ndarray) -> None:
+        send_frame(self.sock, AUDIO, np.asarray(samples, dtype=np.float32).tobytes())
+
+
+    def end(self) -> None:
+        send_frame(self.sock, END)
+
+
+    def results(self) -> Iterator[dict]:
+        """Yield results until the server acknowledges END or closes the connection"""
+        while True:
+            kind, payload = recv_frame(self.sock)
+            if kind == RESULT:
+                yield json.loads(payload)
+            elif kind == ERROR:
+                raise RuntimeError(json.loads(payload)['error'])
+            else:
+                return
+
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session speech translation server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9200)
+    parser.add_argument('--asr-model', default='auto', help="auto, tiny, base, small or large-v3-turbo")
+    parser.add_argument('--asr-device', default=None, help="cpu or cuda (default: cuda when available)")
+    parser.add_argument('--translator', choices=['gemini', 'local'], default='gemini')
+    parser.add_argument('--max-batch', type=int, default=8, help="Segments decoded per forward pass")
+    parser.add_argument('--metrics-port', type=int, default=None)
+    args = parser.parse_args()
+
+    server = TranslationServer(args.host, args.port, asr_model=args.asr_model, device=args.asr_device,
+                               translator=args.translator, max_batch=args.max_batch)
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics.register_gauges('server', server.stats)
+        metrics_server = MetricsServer(port=args.metrics_port)
+        metrics_server.start()
+
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_server()
+        if metrics_server is not None:
+            metrics_server.stop_server()
+
+
+if __name__ == "__main__":
+    main()
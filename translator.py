@@ -1,71 +1,490 @@
+import json
 import os
+import queue
+import random
+import threading
+import time
+import torch
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from typing import Optional
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from typing import Iterator, List, Optional, Union
+from translation_cache import TranslationCache
+from translation_client import CircuitBreaker, ConnectionPool, HttpError
+from metrics import metrics
 
+TRANSLATION_PROMPT = """
+            Translate the following text from {source_language} to {target_language}.
 
-class T2TT:
-    def __init__(self, api_key: Optional[str] = None):
-        """
-        Initialize the translation service with Google's Gemini model
-        
-        Args:
-            api_key: Google AI API key. If None, will look for GOOGLE_API_KEY env variable
-        """
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
+            Provide only the translation without any additional explanation or commentary.
+            Maintain the original tone, style, and formatting as much as possible.
+
+            Text to translate: {text}
+
+            Translation:
+            """
+
+# Seconds a network translation may take in total, retries included
+TRANSLATION_DEADLINE = 3.0
+
+GEMINI_BASE_URL = 'https://generativelanguage.googleapis.com'
 
 
-        
+class TranslationUnavailable(Exception):
+    """The backend didn't answer in time or is switched off by the circuit breaker"""
+
+
+def _retryable(error: Exception) -> bool:
+    """Throttling, server errors, timeouts and dropped connections are worth another attempt"""
+    status = error.status if isinstance(error, HttpError) else getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, OSError)
+
+
+class TranslationEngine:
+    """Backend contract used by T2TT"""
+
+    name = 'base'
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        raise NotImplementedError
+
+
+    def translate_batch(self, texts: List[str], source_language: str, target_language: str) -> List[str]:
+        return [self.translate(text, source_language, target_language) for text in texts]
+
+
+    def translate_stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        """Yield the translation in fragments as they're produced. Engines that can't stream yield it whole"""
+        yield self.translate(text, source_language, target_language)
+
+
+class GeminiEngine(TranslationEngine):
+    name = 'gemini'
+
+    def __init__(self, timeout: float = TRANSLATION_DEADLINE):
         # Initialize the Google Generative AI model (free tier)
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-flash",
             temperature=0.1,  # Low temperature for more consistent translations
+            timeout=timeout,  # Per request, so a hung call can't outlive the caller's deadline
             # convert_system_message_to_human=True
         )
-        
+
         # Create a prompt template for translation
         self.translation_prompt = PromptTemplate(
             input_variables=["source_language", "target_language", "text"],
-            template="""
-            Translate the following text from {source_language} to {target_language}.
-            
-            Provide only the translation without any additional explanation or commentary.
-            Maintain the original tone, style, and formatting as much as possible.
-            
-            Text to translate: {text}
-            
-            Translation:
-            """
+            template=TRANSLATION_PROMPT
         )
-        
+
         # Create the translation chain
         self.translation_chain = LLMChain(
             llm=self.llm,
             prompt=self.translation_prompt,
             verbose=False
         )
-    
-    
+
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        return self.translation_chain.run(
+            source_language=source_language,
+            target_language=target_language,
+            text=text
+        ).strip()
+
+
+    def translate_stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        chain = self.translation_prompt | self.llm
+        for chunk in chain.stream({'source_language': source_language,
+                                   'target_language': target_language,
+                                   'text': text}):
+            if chunk.content:
+                yield chunk.content
+
+
+class GeminiRestEngine(TranslationEngine):
+    """Gemini over its REST API on pooled keep-alive connections, no SDK in between"""
+
+    name = 'gemini-rest'
+
+    def __init__(self, model: str = 'gemini-1.5-flash', api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, pool_size: int = 4, timeout: float = TRANSLATION_DEADLINE):
+        self.model = model
+        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY", '')
+        # GEMINI_BASE_URL points the engine elsewhere, e.g. at a MockTranslationBackend
+        self.pool = ConnectionPool(base_url or os.environ.get("GEMINI_BASE_URL", GEMINI_BASE_URL), size=pool_size)
+        self.timeout = timeout
+
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        prompt = TRANSLATION_PROMPT.format(source_language=source_language, target_language=target_language, text=text)
+        body = json.dumps({
+            'contents': [{'parts': [{'text': prompt}]}],
+            'generationConfig': {'temperature': 0.1},
+        }).encode('utf-8')
+        status, data = self.pool.request(
+            'POST', f'/v1beta/models/{self.model}:generateContent', body,
+            headers={'Content-Type': 'application/json', 'x-goog-api-key': self.api_key},
+            timeout=self.timeout
+        )
+        if status != 200:
+            raise HttpError(status, data)
+        return json.loads(data)['candidates'][0]['content']['parts'][0]['text'].strip()
+
+
+    def stats(self) -> dict:
+        return self.pool.stats()
+
+
+class ResilientTranslator(TranslationEngine):
+    """Wraps a network engine with a deadline, jittered retries, optional hedging and a circuit breaker.
+
+    Each translate() gets `deadline` seconds in total. An attempt that timed
+    out, was throttled (429) or hit a server error (5xx) is retried after a
+    randomized exponential backoff while time remains; other errors fail
+    straight away. With `hedge_after`, a second identical request is sent if
+    the first hasn't answered by then, and whichever finishes first wins. When
+    the breaker is open, calls fail immediately with TranslationUnavailable.
+    """
+
+    name = 'resilient'
+
+    def __init__(self, engine: TranslationEngine, deadline: float = TRANSLATION_DEADLINE, attempts: int = 3,
+                 backoff: float = 0.1, max_backoff: float = 1.0, hedge_after: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, workers: int = 8):
+        self.engine = engine
+        self.deadline = deadline
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        # Timed-out calls keep running here, so they never hold up the caller
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate-call')
+
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        if not self.breaker.allow():
+            metrics.inc('translation_breaker_rejected')
+            raise TranslationUnavailable("circuit breaker open")
+
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+        for attempt in range(self.attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                metrics.inc('translation_retries')
+            try:
+                result = self._call(text, source_language, target_language, remaining)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_error = e
+                metrics.inc('translation_failures')
+                if not _retryable(e):
+                    break
+            if attempt == self.attempts - 1:
+                break
+
+            # Full jitter keeps retries from many callers from lining up
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            time.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+
+        self.breaker.record_failure()
+        raise TranslationUnavailable(f"no answer within {self.deadline:.1f}s: {last_error}")
+
+
+    def _call(self, text: str, source_language: str, target_language: str, timeout: float) -> str:
+        """One attempt, hedged if configured. Raises TimeoutError once `timeout` passes"""
+        start = time.monotonic()
+        futures = [self.executor.submit(self.engine.translate, text, source_language, target_language)]
+        if self.hedge_after is not None and self.hedge_after < timeout:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                metrics.inc('translation_hedges')
+                futures.append(self.executor.submit(self.engine.translate, text, source_language, target_language))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    metrics.observe('translation_request', time.monotonic() - start)
+                    if future is not futures[0]:
+                        metrics.inc('translation_hedge_wins')
+                    return future.result()
+                error = future.exception()
+
+        if error is not None and not pending:
+            raise error
+        metrics.inc('translation_timeouts')
+        raise TimeoutError(f"translation timed out after {timeout:.2f}s")
+
+
+    def translate_stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        """Streams from the engine; the first fragment must arrive within the deadline, later ones within
+        the deadline of each other. No retries once fragments have been shown"""
+        if not self.breaker.allow():
+            metrics.inc('translation_breaker_rejected')
+            raise TranslationUnavailable("circuit breaker open")
+
+        fragments = queue.Queue()
+
+        def produce():
+            try:
+                for fragment in self.engine.translate_stream(text, source_language, target_language):
+                    fragments.put(('fragment', fragment))
+                fragments.put(('end', None))
+            except Exception as e:
+                fragments.put(('error', e))
+
+        self.executor.submit(produce)
+        start = time.monotonic()
+        first = True
+        while True:
+            try:
+                kind, value = fragments.get(timeout=self.deadline)
+            except queue.Empty:
+                metrics.inc('translation_timeouts')
+                self.breaker.record_failure()
+                raise TranslationUnavailable(f"no fragment within {self.deadline:.1f}s")
+            if kind == 'error':
+                metrics.inc('translation_failures')
+                self.breaker.record_failure()
+                raise TranslationUnavailable(str(value))
+            if kind == 'end':
+                self.breaker.record_success()
+                metrics.observe('translation_request', time.monotonic() - start)
+                return
+            if first:
+                metrics.observe('translation_first_fragment', time.monotonic() - start)
+                first = False
+            yield value
+
+
+    def stats(self) -> dict:
+        stats = self.breaker.stats()
+        if hasattr(self.engine, 'stats'):
+            stats.update(self.engine.stats())
+        return stats
+
+
+class LocalEngine(TranslationEngine):
+    """Offline NLLB-style seq2seq translation on the local machine.
+
+    On CPU the Linear layers are dynamically quantized to int8. A warm-up
+    translation runs at load time so the first utterance doesn't pay for it.
+    """
+
+    name = 'local'
+
+    # Whisper language names -> FLORES-200 codes
+    LANGUAGE_CODES = {
+        'english': 'eng_Latn',
+        'german': 'deu_Latn',
+        'norwegian': 'nob_Latn',
+        'french': 'fra_Latn',
+        'italian': 'ita_Latn',
+        'swedish': 'swe_Latn',
+        'hebrew': 'heb_Hebr',
+        'chinese': 'zho_Hans',
+        'malay': 'zsm_Latn',
+        'indonesian': 'ind_Latn',
+        'indonisian': 'ind_Latn',
+        'spanish': 'spa_Latn',
+    }
+
+    def __init__(self, model_name: str = 'facebook/nllb-200-distilled-600M', quantize: bool = True,
+                 num_threads: Optional[int] = None, num_beams: int = 2, max_new_tokens: int = 128):
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.num_beams = num_beams
+        self.max_new_tokens = max_new_tokens
+        # Applied only while generate() runs, so Whisper keeps its own thread count
+        self.num_threads = num_threads
+
+        print(f"Loading local translation model {model_name}...")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir="./models")
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name, cache_dir="./models")
+        self.model.eval()
+
+        if self.device.type == 'cpu' and quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            self.model = self.model.to(self.device)
+
+        # generate() is not safe to run concurrently on one model
+        self.lock = threading.Lock()
+
+        self.translate('Hello.', 'english', 'german')
+
+
+    def _code(self, language: str) -> str:
+        code = self.LANGUAGE_CODES.get(language.strip().lower())
+        if code is None:
+            raise ValueError(f"Unsupported language for local translation: {language}")
+        return code
+
+
+    @torch.no_grad()
+    def translate_batch(self, texts: List[str], source_language: str, target_language: str) -> List[str]:
+        target_code = self._code(target_language)
+        with self.lock:
+            self.tokenizer.src_lang = self._code(source_language)
+            inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
+            previous_threads = torch.get_num_threads()
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            try:
+                outputs = self.model.generate(
+                    **inputs,
+                    forced_bos_token_id=self.tokenizer.convert_tokens_to_ids(target_code),
+                    num_beams=self.num_beams,
+                    max_new_tokens=self.max_new_tokens
+                )
+            finally:
+                if self.num_threads:
+                    torch.set_num_threads(previous_threads)
+        return [t.strip() for t in self.tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        return self.translate_batch([text], source_language, target_language)[0]
+
+
+class FakeStreamingEngine(TranslationEngine):
+    """Offline stand-in for a streaming LLM: tags the text with the target language
+    and streams it word by word with a configurable first-token latency."""
+
+    name = 'fake'
+
+    def __init__(self, first_token_latency: float = 0.3, token_interval: float = 0.05):
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+
+
+    def translate(self, text: str, source_language: str, target_language: str) -> str:
+        return ''.join(self.translate_stream(text, source_language, target_language)).strip()
+
+
+    def translate_stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        words = f"[{target_language}] {text}".split()
+        time.sleep(self.first_token_latency)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_interval)
+            yield word if i == 0 else ' ' + word
+
+
+ENGINES = {
+    GeminiEngine.name: GeminiEngine,
+    GeminiRestEngine.name: GeminiRestEngine,
+    LocalEngine.name: LocalEngine,
+    FakeStreamingEngine.name: FakeStreamingEngine,
+}
+
+# Engines that call out over the network get deadlines, retries and a circuit breaker
+NETWORK_ENGINES = (GeminiEngine.name, GeminiRestEngine.name)
+
+
+class T2TT:
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[TranslationCache] = None,
+                 engine: Union[str, TranslationEngine] = 'gemini', resilient: bool = True,
+                 engine_options: Optional[dict] = None, hedge_after: Optional[float] = None):
+        """
+        Initialize the translation service
+
+        Args:
+            api_key: Google AI API key. If None, will look for GOOGLE_API_KEY env variable
+            cache: Translation cache. If None, a persistent cache under ./cache is used
+            engine: 'gemini', 'gemini-rest', 'local', 'fake' or a TranslationEngine instance
+            resilient: Wrap network engines in a ResilientTranslator
+            engine_options: Keyword arguments for the engine when it's given by name
+            hedge_after: Seconds before a slow network request is sent a second time, None to never hedge
+        """
+        if api_key:
+            os.environ["GOOGLE_API_KEY"] = api_key
+
+        self.cache = cache if cache is not None else TranslationCache()
+        self.engine = ENGINES[engine](**(engine_options or {})) if isinstance(engine, str) else engine
+        if resilient and self.engine.name in NETWORK_ENGINES:
+            self.engine = ResilientTranslator(self.engine, hedge_after=hedge_after)
+
+
     def translate(self, text: str, source_language: str, target_language: str) -> str:
         """
         Translate text from source language to target language
-        
+
         Args:
             text: Text to translate
             source_language: Source language (e.g., "English", "Spanish", "French")
             target_language: Target language (e.g., "English", "Spanish", "French")
-            
+
         Returns:
-            Translated text
+            Translated text, or the source text if the backend is unavailable
         """
+        cached = self.cache.get(text, source_language, target_language)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.engine.translate(text, source_language, target_language)
+            self.cache.put(text, source_language, target_language, result)
+            return result
+        except Exception as e:
+            # Degrade to the source transcript rather than an error subtitle
+            print(f"Translation failed, showing source text: {str(e)}")
+            metrics.inc('translation_passthrough')
+            return text
+
+
+    def translate_batch(self, texts: List[str], source_language: str, target_language: str) -> List[str]:
+        """Like translate for several texts; cache misses go to the engine in a single batch"""
+        results = [self.cache.get(text, source_language, target_language) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        try:
+            translations = self.engine.translate_batch([texts[i] for i in missing], source_language, target_language)
+        except Exception as e:
+            print(f"Translation failed, showing source text: {str(e)}")
+            metrics.inc('translation_passthrough', len(missing))
+            translations = [texts[i] for i in missing]
+        else:
+            for i, translation in zip(missing, translations):
+                self.cache.put(texts[i], source_language, target_language, translation)
+
+        for i, translation in zip(missing, translations):
+            results[i] = translation
+        return results
+
+
+    def translate_stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        """Like translate, but yields fragments as the engine produces them"""
+        cached = self.cache.get(text, source_language, target_language)
+        if cached is not None:
+            yield cached
+            return
+
+        fragments = []
         try:
-            result = self.translation_chain.run(
-                source_language=source_language,
-                target_language=target_language,
-                text=text
-            )
-            return result.strip()
+            for fragment in self.engine.translate_stream(text, source_language, target_language):
+                fragments.append(fragment)
+                yield fragment
         except Exception as e:
-            return f"Translation error: {str(e)}"
\ No newline at end of file
+            print(f"Translation failed, showing source text: {str(e)}")
+            metrics.inc('translation_passthrough')
+            # Nothing shown yet: fall back to the source transcript, otherwise keep the partial translation
+            if not fragments:
+                yield text
+            return
+        self.cache.put(text, source_language, target_language, ''.join(fragments).strip())
@@ -0,0 +1,73 @@
+import re
+import numpy as np
+from typing import List, Optional
+
+SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s+|(?<=[。！？])')
+CLAUSE_END = re.compile(r'(?<=[,;:、，；：])\s*')
+
+
+def split_clauses(text: str, min_chars: int = 20, max_chars: int = 120) -> List[str]:
+    """Split text into sentence/clause chunks for incremental synthesis.
+
+    Sentences are always split. Long sentences are further split at clause
+    punctuation, merging clauses shorter than `min_chars` into their neighbour
+    so VITS isn't asked to synthesize a single word out of context.
+    """
+    chunks = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+
+        current = ''
+        for clause in CLAUSE_END.split(sentence):
+            current = (current + ' ' + clause).strip() if current else clause.strip()
+            if len(current) >= min_chars:
+                chunks.append(current)
+                current = ''
+        if current:
+            if chunks and len(current) < min_chars:
+                chunks[-1] = chunks[-1] + ' ' + current
+            else:
+                chunks.append(current)
+    return chunks
+
+
+class Crossfader:
+    """Joins consecutive waveform chunks with a short linear crossfade.
+
+    The last `fade_samples` of each chunk are held back and blended with the
+    start of the next one; call `flush` after the final chunk.
+    """
+
+    def __init__(self, fade_samples: int = 160):
+        self.fade_samples = fade_samples
+        self.fade_in = np.linspace(0.0, 1.0, fade_samples, endpoint=False, dtype=np.float32)
+        self.fade_out = 1.0 - self.fade_in
+        self.tail: Optional[np.ndarray] = None
+
+
+    def push(self, waveform: np.ndarray) -> np.ndarray:
+        """Return the audio that is final once `waveform` has been appended"""
+        waveform = np.asarray(waveform, dtype=np.float32)
+        if len(waveform) < 2 * self.fade_samples:
+            # Too short to fade, emit whatever is held back followed by this chunk
+            out = waveform if self.tail is None else np.concatenate((self.tail, waveform))
+            self.tail = None
+            return out
+
+        head = waveform[:-self.fade_samples]
+        if self.tail is not None:
+            head = head.copy()
+            head[:self.fade_samples] = self.tail * self.fade_out + head[:self.fade_samples] * self.fade_in
+        self.tail = waveform[-self.fade_samples:].copy()
+        return head
+
+
+    def flush(self) -> np.ndarray:
+        tail = self.tail
+        self.tail = None
+        return tail if tail is not None else np.zeros(0, dtype=np.float32)
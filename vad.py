@@ -0,0 +1,150 @@
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class SpeechSegment:
+    start: float  # seconds since the detector started
+    end: float
+    audio: np.ndarray
+
+
+class VoiceActivityDetector:
+    """Frame-based speech endpointing on a live audio stream.
+
+    Per-frame RMS energy (and optionally positive spectral flux) is computed for
+    all complete frames of a chunk at once. Onset/hangover hysteresis turns the
+    frame decisions into utterance-bounded SpeechSegments with timestamps.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20,
+                 energy_threshold: float = 0.015, flux_threshold: Optional[float] = None,
+                 onset_frames: int = 3, hangover_frames: int = 15, padding_frames: int = 5,
+                 max_segment_seconds: float = 8.0):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.energy_threshold = energy_threshold
+        self.flux_threshold = flux_threshold
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+        self.padding_frames = padding_frames
+        self.max_segment_frames = int(max_segment_seconds * 1000 / frame_ms)
+
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.in_speech = False
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._frame_index = 0
+        self._prev_spectrum = None
+        self._onset_count = 0
+        self._silence_count = 0
+        self._pre_roll = deque(maxlen=self.onset_frames + self.padding_frames)
+        self._segment_frames = []
+        self._segment_start = 0
+        self._last_active = 0
+
+
+    @property
+    def stream_time(self) -> float:
+        """Seconds of audio fed since the last reset"""
+        return (self._frame_index * self.frame_size + len(self._remainder)) / self.sample_rate
+
+
+    def frame_features(self, frames: np.ndarray):
+        """Return (rms energy, positive spectral flux or None) for a (n_frames, frame_size) array"""
+        energy = np.sqrt(np.mean(np.square(frames), axis=1))
+        if self.flux_threshold is None:
+            return energy, None
+
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1))
+        previous = np.empty_like(spectrum)
+        previous[0] = spectrum[0] if self._prev_spectrum is None else self._prev_spectrum
+        previous[1:] = spectrum[:-1]
+        self._prev_spectrum = spectrum[-1]
+        flux = np.maximum(spectrum - previous, 0.0).sum(axis=1) / spectrum.shape[1]
+        return energy, flux
+
+
+    def process(self, audio: np.ndarray) -> List[SpeechSegment]:
+        """Feed new samples, return the segments that were closed by them"""
+        # Own the samples: frames are kept as views until their segment closes
+        audio = np.concatenate((self._remainder, np.asarray(audio, dtype=np.float32)))
+
+        n_frames = len(audio) // self.frame_size
+        self._remainder = audio[n_frames * self.frame_size:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = audio[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        energy, flux = self.frame_features(frames)
+        active = energy > self.energy_threshold
+        if flux is not None:
+            active |= flux > self.flux_threshold
+
+        segments = []
+        for frame, is_active in zip(frames, active):
+            segment = self._step(frame, bool(is_active))
+            if segment is not None:
+                segments.append(segment)
+            self._frame_index += 1
+        return segments
+
+
+    def flush(self) -> Optional[SpeechSegment]:
+        """Close the current utterance, if any"""
+        if not self.in_speech:
+            return None
+        self.in_speech = False
+        return self._close_segment(len(self._segment_frames))
+
+
+    def _step(self, frame: np.ndarray, is_active: bool) -> Optional[SpeechSegment]:
+        if not self.in_speech:
+            self._pre_roll.append(frame)
+            self._onset_count = self._onset_count + 1 if is_active else 0
+            if self._onset_count >= self.onset_frames:
+                # Onset confirmed: start the segment with the buffered pre-roll
+                self.in_speech = True
+                self._segment_frames = list(self._pre_roll)
+                self._segment_start = self._frame_index - len(self._pre_roll) + 1
+                self._last_active = len(self._segment_frames)
+                self._silence_count = 0
+                self._pre_roll.clear()
+            return None
+
+        self._segment_frames.append(frame)
+        if is_active:
+            self._silence_count = 0
+            self._last_active = len(self._segment_frames)
+        else:
+            self._silence_count += 1
+
+        if self._silence_count >= self.hangover_frames:
+            self.in_speech = False
+            self._onset_count = 0
+            return self._close_segment(self._last_active + self.padding_frames)
+
+        if len(self._segment_frames) >= self.max_segment_frames:
+            # Split overlong utterances, the speech continues in a new segment
+            segment = self._close_segment(len(self._segment_frames))
+            self._segment_start = self._frame_index + 1
+            self._last_active = 0
+            return segment
+        return None
+
+
+    def _close_segment(self, n_frames: int) -> SpeechSegment:
+        frames = self._segment_frames[:n_frames]
+        seconds_per_frame = self.frame_size / self.sample_rate
+        segment = SpeechSegment(
+            start=self._segment_start * seconds_per_frame,
+            end=(self._segment_start + len(frames)) * seconds_per_frame,
+            audio=np.concatenate(frames)
+        )
+        self._segment_frames = []
+        return segment
@@ -0,0 +1,265 @@
+import cv2
+import threading
+import time
+import numpy as np
+from typing import Optional, Tuple
+from subtitle_renderer import SubtitleRenderer
+
+# Layouts a frame can travel in; OpenCV captures decode to 'bgr'
+PIXEL_FORMATS = ('bgr', 'rgb', 'i420', 'nv12')
+
+# Asked for in order: MJPG reaches 720p/1080p at full rate over USB 2, raw YUYV usually can't
+CAPTURE_FOURCCS = ('MJPG', 'YUYV')
+
+_YUV_CONVERSIONS = {'bgr': cv2.COLOR_BGR2YUV_I420, 'rgb': cv2.COLOR_RGB2YUV_I420}
+
+
+def frame_shape(pixel_format: str, width: int, height: int) -> Tuple[int, ...]:
+    """Array shape of one frame; planar YUV formats are a single 8-bit plane 1.5x the height"""
+    if pixel_format in ('bgr', 'rgb'):
+        return (height, width, 3)
+    return (height * 3 // 2, width)
+
+
+def convert_frame(frame: np.ndarray, source: str, target: str, out: np.ndarray,
+                  scratch: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert a 'bgr' or 'rgb' frame into `out` with a single OpenCV call.
+
+    'nv12' also interleaves the chroma planes, by way of `scratch` (half a luma
+    plane, see `chroma_scratch`) when given, otherwise a temporary copy.
+    """
+    if target in ('bgr', 'rgb'):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB if source == 'bgr' else cv2.COLOR_RGB2BGR, dst=out)
+
+    cv2.cvtColor(frame, _YUV_CONVERSIONS[source], dst=out)
+    if target == 'nv12':
+        # I420 stores the U plane then the V plane, NV12 interleaves them
+        height = out.shape[0] * 2 // 3
+        planes = out[height:].reshape(2, -1)
+        if scratch is None:
+            chroma = planes.copy()
+        else:
+            chroma = scratch.reshape(2, -1)
+            np.copyto(chroma, planes)
+        interleaved = out[height:].reshape(-1, 2)
+        interleaved[:, 0] = chroma[0]
+        interleaved[:, 1] = chroma[1]
+    return out
+
+
+def chroma_scratch(width: int, height: int) -> np.ndarray:
+    """Reusable buffer for the U and V planes while convert_frame interleaves them for 'nv12'"""
+    return np.empty(height // 2 * width, dtype=np.uint8)
+
+
+def negotiate_capture(stream, width: int, height: int, fps: int, fourccs: Tuple[str, ...] = CAPTURE_FOURCCS) -> str:
+    """Ask the camera for each format in turn at the target size, returns the FOURCC it settled on"""
+    for fourcc in fourccs:
+        stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        stream.set(cv2.CAP_PROP_FPS, fps)
+        if (int(stream.get(cv2.CAP_PROP_FRAME_WIDTH)), int(stream.get(cv2.CAP_PROP_FRAME_HEIGHT))) == (width, height):
+            break
+
+    code = int(stream.get(cv2.CAP_PROP_FOURCC))
+    return ''.join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip('\x00 ') or 'unknown'
+
+
+class FramePool:
+    """Fixed set of preallocated frames handed out by index"""
+
+    def __init__(self, count: int, shape: Tuple[int, ...], dtype=np.uint8):
+        self.frames = [np.zeros(shape, dtype=dtype) for _ in range(count)]
+        self.free = list(range(count))
+        self.lock = threading.Lock()
+
+
+    def acquire(self) -> Optional[int]:
+        with self.lock:
+            return self.free.pop() if self.free else None
+
+
+    def release(self, index: int) -> None:
+        with self.lock:
+            self.free.append(index)
+
+
+class LatestFrameSlot:
+    """Holds the most recent captured frame; readers never wait for the producer.
+
+    Frames are reference counted so the producer can't recycle a frame that a
+    reader still has checked out.
+    """
+
+    def __init__(self, pool: FramePool):
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.latest = None
+        self.refs = [0] * len(pool.frames)
+        self.sequence = 0
+
+
+    def publish(self, index: int) -> None:
+        with self.lock:
+            previous = self.latest
+            self.latest = index
+            self.sequence += 1
+            if previous is not None and self.refs[previous] == 0:
+                self.pool.release(previous)
+
+
+    def checkout(self) -> Optional[Tuple[int, np.ndarray, int]]:
+        """Return (index, frame, sequence) of the latest frame, or None before the first one"""
+        with self.lock:
+            if self.latest is None:
+                return None
+            self.refs[self.latest] += 1
+            return self.latest, self.pool.frames[self.latest], self.sequence
+
+
+    def checkin(self, index: int) -> None:
+        with self.lock:
+            self.refs[index] -= 1
+            if self.refs[index] == 0 and index != self.latest:
+                self.pool.release(index)
+
+
+class CaptureThread:
+    """Reads a cv2.VideoCapture into pooled 'bgr' frames and publishes them to a LatestFrameSlot"""
+
+    def __init__(self, stream, width: int, height: int, pool_size: int = 3):
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.pool = FramePool(pool_size, (height, width, 3))
+        self.slot = LatestFrameSlot(self.pool)
+        self.stop = False
+        self.thread = None
+
+        # Statistics
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+        self.frames_resized = 0
+        self.frames_copied = 0
+
+
+    def start(self):
+        self.stop = False
+        self.thread = threading.Thread(target=self.update, args=(), daemon=True)
+        self.thread.start()
+
+
+    def update(self):
+        while not self.stop:
+            index = self.pool.acquire()
+            if index is None:
+                # Every frame is in use, readers are holding on to them
+                self.frames_dropped += 1
+                time.sleep(0.001)
+                continue
+
+            buffer = self.pool.frames[index]
+            ret, frame = self.stream.read(buffer)
+            if not ret:
+                self.pool.release(index)
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
+
+            # Only when the camera didn't accept the negotiated size or ignored the buffer
+            if frame.shape[:2] != (self.height, self.width):
+                cv2.resize(frame, (self.width, self.height), dst=buffer)
+                self.frames_resized += 1
+            elif frame is not buffer:
+                np.copyto(buffer, frame)
+                self.frames_copied += 1
+
+            self.slot.publish(index)
+            self.frames_captured += 1
+
+
+    def stop_capture(self, timeout: float = 1.0):
+        self.stop = True
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+class FrameCompositor:
+    """Draws subtitles over captured frames and hands them out in the output pixel format.
+
+    Frames are composed in the capture format, or directly in the output
+    format when that is only a channel swap, so a new capture costs one copy
+    or conversion into a reused buffer, plus one YUV conversion for 'i420' or
+    'nv12' output; 'nv12' adds a copy of the chroma planes to interleave them.
+    While neither the capture nor the subtitle changes, the previous output is
+    handed out again untouched.
+    """
+
+    def __init__(self, width: int, height: int, source_format: str = 'bgr', output_format: str = 'bgr',
+                 position: Optional[Tuple[int, int]] = None, **renderer_options):
+        if output_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unknown pixel format {output_format}, expected one of {PIXEL_FORMATS}")
+        self.source_format = source_format
+        self.output_format = output_format
+        self.compose_format = output_format if output_format in ('bgr', 'rgb') else source_format
+        self.position = position if position is not None else (width // 2, height - 100)
+        self.subtitles = SubtitleRenderer(channel_order=self.compose_format, **renderer_options)
+
+        self.composite = np.zeros(frame_shape(self.compose_format, width, height), dtype=np.uint8)
+        if self.compose_format == output_format:
+            self.output = self.composite
+        else:
+            self.output = np.zeros(frame_shape(output_format, width, height), dtype=np.uint8)
+        self.scratch = chroma_scratch(width, height) if output_format == 'nv12' else None
+        self.last = None
+
+        # Statistics
+        self.frames_composed = 0
+        self.frames_reused = 0
+        self.copies = 0
+        self.conversions = 0
+        self.compose_seconds = 0.0
+
+
+    def compose(self, frame: np.ndarray, sequence: int, text: Optional[str]) -> np.ndarray:
+        """Output frame for capture `sequence` with `text` on it; the returned buffer is reused"""
+        if self.last == (sequence, text):
+            self.frames_reused += 1
+            return self.output
+
+        began = time.monotonic()
+        if self.source_format == self.compose_format:
+            np.copyto(self.composite, frame)
+            self.copies += 1
+        else:
+            convert_frame(frame, self.source_format, self.compose_format, self.composite)
+            self.conversions += 1
+
+        if text:
+            self.subtitles.overlay(self.composite, text, self.position)
+
+        if self.output is not self.composite:
+            convert_frame(self.composite, self.compose_format, self.output_format, self.output, self.scratch)
+            self.conversions += 1
+            if self.scratch is not None:
+                self.copies += 1
+
+        self.last = (sequence, text)
+        self.frames_composed += 1
+        self.compose_seconds += time.monotonic() - began
+        return self.output
+
+
+    def stats(self) -> dict:
+        frames = self.frames_composed + self.frames_reused
+        return {
+            'frames_composed': self.frames_composed,
+            'frames_reused': self.frames_reused,
+            'copies': self.copies,
+            'conversions': self.conversions,
+            'copies_per_frame': self.copies / frames if frames else 0.0,
+            'conversions_per_frame': self.conversions / frames if frames else 0.0,
+            'compose_ms': 1000 * self.compose_seconds / self.frames_composed if self.frames_composed else 0.0,
+        }
@@ -2,26 +2,48 @@ import cv2
 import pyvirtualcam
 import threading
 import numpy as np
-from PIL import ImageDraw, Image, ImageFont
+from video_pipeline import CaptureThread, FrameCompositor, negotiate_capture
+
+# pyvirtualcam input modes for each pixel format the compositor can hand out
+CAMERA_FORMATS = {
+    'bgr': pyvirtualcam.PixelFormat.BGR,
+    'rgb': pyvirtualcam.PixelFormat.RGB,
+    'i420': pyvirtualcam.PixelFormat.I420,
+    'nv12': pyvirtualcam.PixelFormat.NV12,
+}
 
 
 class VirtualCamera:
-    def __init__(self, memory, source=0, width=1280, height=720, fps=30):
+    def __init__(self, memory, source=0, width=1280, height=720, fps=30,
+                 font_path="C:\\Windows\\Fonts\\arial.ttf", font_size=25, output_format='bgr'):
         self.width = width
         self.height = height
         self.fps = fps
 
+        # 'bgr' matches the capture, so frames reach the camera without any color conversion
+        self.output_format = output_format
         self.camera = pyvirtualcam.Camera(
             width=self.width, 
             height=self.height, 
-            fps=self.fps
+            fps=self.fps,
+            fmt=CAMERA_FORMATS[output_format]
         )
 
         self.stream = cv2.VideoCapture(source)
+        self.capture_format = None
+
+        # Capture runs on its own thread into pooled frames, the compositor never waits on it
+        self.capture = CaptureThread(self.stream, self.width, self.height)
+        # Font is loaded once, each subtitle is rasterized once; OpenCV decodes MJPG and YUYV to BGR
+        self.compositor = FrameCompositor(self.width, self.height, source_format='bgr',
+                                          output_format=output_format, font_path=font_path, font_size=font_size)
+        self.blank = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.frames_sent = 0
 
         self.memory = memory
 
         self.stop = False
+        self.thread = None
 
         print(f"Virtual camera started: {self.width}x{self.height} @ {self.fps}fps")
         print(f"Camera device: {self.camera.device}")
@@ -29,6 +51,11 @@ class VirtualCamera:
     
     def stop_stream(self):
         """Stop the virtual camera"""
+        self.stop = True
+        self.capture.stop_capture()
+        if self.thread is not None:
+            self.thread.join(1.0)
+
         if self.camera:
             self.camera.close()
             print("Virtual camera stopped")
@@ -39,7 +66,8 @@ class VirtualCamera:
     def start(self):
         self.stop = False
         print("Starting Virtual Camera...")
-        threading.Thread(target=self.stream_from_webcam, args=()).start()
+        self.thread = threading.Thread(target=self.stream_from_webcam, args=())
+        self.thread.start()
 
     
     def stream_from_webcam(self):
@@ -52,42 +80,49 @@ class VirtualCamera:
             print(f"Failed to open webcam")
             return
         
-        # Set webcam properties
-        self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-        self.stream.set(cv2.CAP_PROP_FPS, self.fps)
-                
+        # Ask for a format the webcam delivers at the target size, so frames aren't resized
+        self.capture_format = negotiate_capture(self.stream, self.width, self.height, self.fps)
+        print(f"Webcam capture: {self.capture_format} "
+              f"{int(self.stream.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.stream.get(cv2.CAP_PROP_FRAME_HEIGHT))}, "
+              f"sending {self.output_format}")
+
+        self.capture.start()
         print(f"Streaming from webcam...")
         
         try:
+            # Compositor runs on the virtual camera clock, whatever ASR/TTS are doing
             while not self.stop:
-                ret, frame = self.stream.read()
-                if not ret:
-                    print("Failed to read from webcam")
-                    break
-                
-                # Resize if necessary
-                if frame.shape[:2] != (self.height, self.width):
-                    frame = cv2.resize(frame, (self.width, self.height))
-                
-                text = self.memory.read_buffer_subtitle()
-
-                if text:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    pil_image = Image.fromarray(frame)
-
-                    font = ImageFont.truetype("C:\Windows\Fonts\\arial.ttf", 25)
-                    draw = ImageDraw.Draw(pil_image)
-                    draw.text((self.width//2, self.height-100), text, anchor="ms", font_size=40, font=font)
-
-                    frame = np.asarray(pil_image)
-    
+                text = self.memory.read_buffer_subtitle(block=False)
+
+                checked_out = self.capture.slot.checkout()
+                if checked_out is not None:
+                    index, frame, sequence = checked_out
+                    # Composed once per new capture or subtitle, otherwise the last frame is resent
+                    output = self.compositor.compose(frame, sequence, text)
+                    self.capture.slot.checkin(index)
+                else:
+                    output = self.compositor.compose(self.blank, 0, text)
 
                 # Send to virtual camera
-                self.camera.send(frame)
+                self.camera.send(output)
+                self.frames_sent += 1
                 self.camera.sleep_until_next_frame()   
 
         except KeyboardInterrupt:
             print("\nStopping stream...")
         finally:
-            self.stream.release()
\ No newline at end of file
+            self.capture.stop_capture()
+            self.stream.release()
+
+
+    def get_stats(self) -> dict:
+        return {
+            'frames_captured': self.capture.frames_captured,
+            'frames_sent': self.frames_sent,
+            'capture_drops': self.capture.frames_dropped,
+            'capture_failures': self.capture.read_failures,
+            'capture_resizes': self.capture.frames_resized,
+            'capture_copies': self.capture.frames_copied,
+            'fps': self.camera.current_fps,
+            **self.compositor.stats(),
+        }
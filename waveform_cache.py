@@ -0,0 +1,73 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional
+from translation_cache import normalize_text
+
+
+class WaveformCache:
+    """LRU cache of synthesized waveforms keyed by (TTS model, normalized text).
+
+    Bounded by the total number of cached samples rather than entry count, so a
+    few long sentences can't crowd out many short phrases unnoticed.
+    """
+
+    def __init__(self, max_samples: int = 16000 * 300):
+        self.max_samples = max_samples
+        self.entries = OrderedDict()
+        self.total_samples = 0
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, normalize_text(text))
+        with self.lock:
+            waveform = self.entries.get(key)
+            if waveform is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return waveform
+
+
+    def put(self, model_name: str, text: str, waveform: np.ndarray) -> None:
+        waveform = np.array(waveform, dtype=np.float32)
+        waveform.setflags(write=False)
+        key = (model_name, normalize_text(text))
+        with self.lock:
+            if len(waveform) > self.max_samples:
+                self.rejected += 1
+                return
+
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_samples -= len(previous)
+
+            self.entries[key] = waveform
+            self.total_samples += len(waveform)
+            while self.total_samples > self.max_samples:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_samples -= len(evicted)
+                self.evictions += 1
+
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+                'entries': len(self.entries),
+                'samples': self.total_samples,
+                'max_samples': self.max_samples,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
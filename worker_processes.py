@@ -0,0 +1,400 @@
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Optional
+from message_bus import Message
+from model_registry import models
+from shared_ring import SharedAudioRing
+
+# Spawned children start from a clean interpreter on every platform
+mp = multiprocessing.get_context('spawn')
+
+SAMPLE_RATE = 16000
+
+
+def _serve_commands(control, handlers: dict) -> None:
+    """Run (command, kwargs) messages from the parent until 'shutdown'"""
+    while True:
+        command, kwargs = control.get()
+        if command == 'shutdown':
+            break
+        handlers[command](**kwargs)
+
+
+def _apply_budgets(budgets: dict) -> None:
+    """Give the child's model registry its share of the parent's memory budgets"""
+    for device_type, budget_bytes in budgets.items():
+        models.set_budget(device_type, budget_bytes)
+
+
+def _report_stats(results, source, interval: float = 2.0) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            results.put(('stats', source()))
+        except Exception as e:
+            print(f"Worker stats failed: {str(e)}")
+
+
+class _S2TTWorkerMemory:
+    """The part of AsyncMemory S2TT uses, backed by the shared input ring and a result queue"""
+
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self, input_ring: SharedAudioRing, results):
+        self.input_ring = input_ring
+        self.results = results
+
+
+    def get_input_audio(self, max_samples: Optional[int] = None):
+        return self.input_ring.read(max_samples)
+
+
+    def set_partial_transcript(self, text: str) -> None:
+        self.results.put(('partial', text))
+
+
+    def add_to_history(self, original: str, translation: str, seq: Optional[int] = None):
+        self.results.put(('history', original, translation))
+
+
+    def set_subtitle_preview(self, seq: int, text: str) -> None:
+        self.results.put(('preview', seq, text))
+
+
+    def write_buffer(self, content, seq=None, trace=None):
+        # Sequence numbers are assigned by the parent's bus, a restarted worker starts over at 0
+        self.results.put(('subtitle', content))
+
+
+def _run_s2tt(config: dict, input_ring_name: str, results, control, budgets: dict):
+    from S2TT import S2TT
+
+    _apply_budgets(budgets)
+    input_ring = SharedAudioRing(name=input_ring_name)
+    memory = _S2TTWorkerMemory(input_ring, results)
+    s2tt = S2TT(memory=memory, **config)
+
+    def stats():
+        values = dict(s2tt.pipeline.stats()) if s2tt.pipeline is not None else {}
+        values.update({f'cache_{k}': v for k, v in s2tt.t2tt.cache.stats().items()})
+        values.update({f'models_{k}': v for k, v in models.stats().items()})
+        if hasattr(s2tt.t2tt.engine, 'stats'):
+            values.update({f'client_{k}': v for k, v in s2tt.t2tt.engine.stats().items()})
+        return values
+
+    threading.Thread(target=_report_stats, args=(results, stats), daemon=True).start()
+    results.put(('ready',))
+    _serve_commands(control, {
+        'start': s2tt.start,
+        'stop': s2tt.stop_s2tt,
+        'reset': lambda **kwargs: s2tt.reset(memory=memory, **kwargs),
+    })
+    s2tt.stop_s2tt()
+    input_ring.close()
+
+
+class _T2SWorkerMemory:
+    """The part of AsyncMemory T2S uses, backed by a text queue and the shared output ring"""
+
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self, texts, output_ring: SharedAudioRing):
+        self.texts = texts
+        self.output_ring = output_ring
+
+
+    def read_message_t2s(self, timeout: Optional[float] = 0.1) -> Optional[Message]:
+        try:
+            seq, content = self.texts.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return Message(seq=seq, content=content, timestamp=time.time())
+
+
+    def add_output_audio(self, audio):
+        self.output_ring.write(audio)
+
+
+    def get_audio_stats(self) -> dict:
+        return {'output_queued': len(self.output_ring)}
+
+
+def _run_t2s(config: dict, texts, output_ring_name: str, results, control, budgets: dict):
+    from T2S import T2S
+    from waveform_cache import WaveformCache
+
+    _apply_budgets(budgets)
+    output_ring = SharedAudioRing(name=output_ring_name)
+    memory = _T2SWorkerMemory(texts, output_ring)
+    cache = WaveformCache()
+    state = {'t2s': None}
+
+    def reset(lang):
+        # The worker's model registry keeps earlier voices resident
+        if state['t2s'] is not None:
+            state['t2s'].stop_t2s()
+        state['t2s'] = T2S(memory=memory, lang=lang, cache=cache, **config)
+
+    def start():
+        if state['t2s'] is not None:
+            state['t2s'].start()
+
+    def stop():
+        if state['t2s'] is not None:
+            state['t2s'].stop_t2s()
+
+    def stats():
+        return {**cache.stats(), **{f'models_{k}': v for k, v in models.stats().items()}}
+
+    threading.Thread(target=_report_stats, args=(results, stats), daemon=True).start()
+    results.put(('ready',))
+    _serve_commands(control, {'start': start, 'stop': stop, 'reset': reset})
+    stop()
+    output_ring.close()
+
+
+class WorkerProcess:
+    """A model-driving stage in its own process, restarted if it crashes.
+
+    Commands go to the child over a control queue and are replayed after a
+    restart, so the new process resumes in the same state. Subclasses move
+    audio and text between the parent's AsyncMemory and the child.
+    """
+
+    # Doubles for every restart that doesn't reach 'ready', up to max_restart_delay
+    restart_delay = 2.0
+    max_restart_delay = 60.0
+
+    # Fraction of the parent's model memory budgets this worker may use; the shares of all workers add up to 1
+    budget_share = 0.5
+
+    def __init__(self, name: str, memory):
+        self.name = name
+        self.memory = memory
+        self.process = None
+        self.control = None
+        self.results = None
+        self.running = False
+        self.closing = False
+        self.last_reset = None
+        self.last_stats = {}
+        self.restarts = 0
+        self.failed_starts = 0
+        self.lock = threading.Lock()
+
+
+    def _spawn(self):
+        """Start the child process, subclasses pass their entry point and arguments"""
+        raise NotImplementedError
+
+
+    def _pump(self):
+        """Move data between the parent and the child; runs on the parent"""
+
+
+    def _handle_result(self, message: tuple):
+        if message[0] == 'stats':
+            self.last_stats = message[1]
+        elif message[0] == 'ready':
+            self.failed_starts = 0
+            print(f"{self.name} worker ready (pid {self.process.pid})")
+
+
+    def launch(self):
+        with self.lock:
+            self.control = mp.Queue()
+            self.results = mp.Queue()
+            self.process = self._spawn()
+            if self.last_reset is not None:
+                self.control.put(('reset', self.last_reset))
+            if self.running:
+                self.control.put(('start', {}))
+
+        threading.Thread(target=self._read_results, args=(self.results,), daemon=True).start()
+        threading.Thread(target=self._pump, args=(), daemon=True).start()
+        threading.Thread(target=self._watch, args=(self.process,), daemon=True).start()
+
+
+    def send(self, command: str, **kwargs):
+        with self.lock:
+            if command == 'reset':
+                self.last_reset = kwargs
+            elif command in ('start', 'stop'):
+                self.running = command == 'start'
+            self.control.put((command, kwargs))
+
+
+    def _read_results(self, results):
+        while not self.closing:
+            try:
+                message = results.get(timeout=0.1)
+            except queue.Empty:
+                if results is not self.results:
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+            self._handle_result(message)
+
+
+    def _watch(self, process):
+        process.join()
+        if self.closing:
+            return
+        delay = min(self.max_restart_delay, self.restart_delay * 2 ** self.failed_starts)
+        print(f"{self.name} worker exited with code {process.exitcode}, restarting in {delay:.0f}s...")
+        self.restarts += 1
+        self.failed_starts += 1
+        time.sleep(delay)
+        if not self.closing:
+            self.launch()
+
+
+    def stats(self) -> dict:
+        stats = {k: v for k, v in self.last_stats.items() if isinstance(v, (int, float))}
+        stats['restarts'] = self.restarts
+        return stats
+
+
+    def close(self, timeout: float = 5.0):
+        """Shut the child down cleanly, killing it if it doesn't exit in time"""
+        self.closing = True
+        if self.process is None:
+            return
+        self.control.put(('shutdown', {}))
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class S2TTProcess(WorkerProcess):
+    """Runs S2TT in a worker process; a drop-in for S2TT as used by the GUI"""
+
+    # Whisper is several times the size of an MMS-TTS voice
+    budget_share = 0.75
+
+    def __init__(self, memory, in_lang: str = 'spanish', out_lang: str = 'english', mode: str = 'interval',
+                 translator: str = 'gemini', input_seconds: float = 30.0, **asr_options):
+        super().__init__('S2TT', memory)
+        self.config = dict(in_lang=in_lang, out_lang=out_lang, mode=mode, translator=translator, **asr_options)
+        self.input_ring = SharedAudioRing(capacity=int(input_seconds * SAMPLE_RATE))
+        self.launch()
+
+
+    def launch(self):
+        self.seq_offset = self.memory.bus.next_seq
+        super().launch()
+
+
+    def _spawn(self):
+        process = mp.Process(target=_run_s2tt, args=(self.config, self.input_ring.name, self.results, self.control,
+                                                     models.share(self.budget_share)),
+                             name='s2tt-worker', daemon=True)
+        process.start()
+        return process
+
+
+    def add_input_audio(self, audio):
+        """Capture sink: microphone audio goes straight into the worker's shared ring"""
+        self.input_ring.write(audio)
+
+
+    def _handle_result(self, message: tuple):
+        kind = message[0]
+        if kind == 'subtitle':
+            self.memory.write_buffer(message[1])
+        elif kind == 'history':
+            self.memory.add_to_history(message[1], message[2])
+        elif kind == 'partial':
+            self.memory.set_partial_transcript(message[1])
+        elif kind == 'preview':
+            # Every worker result is republished, so bus numbering is the worker's shifted by where it started
+            self.memory.set_subtitle_preview(message[1] + self.seq_offset, message[2])
+        else:
+            super()._handle_result(message)
+
+
+    def start(self):
+        # A started worker numbers its transcripts from 0 again
+        self.seq_offset = self.memory.bus.next_seq
+        self.send('start')
+
+
+    def reset(self, memory, in_lang, out_lang, mode: Optional[str] = None, translator: Optional[str] = None):
+        self.memory = memory
+        self.send('reset', in_lang=in_lang, out_lang=out_lang, mode=mode, translator=translator)
+
+
+    def stop_s2tt(self):
+        self.send('stop')
+
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['input_dropped_samples'] = self.input_ring.dropped_samples
+        return stats
+
+
+    def close(self, timeout: float = 5.0):
+        super().close(timeout)
+        self.input_ring.close()
+
+
+class T2SProcess(WorkerProcess):
+    """Runs T2S in a worker process. One worker serves every language; `reset` switches voice"""
+
+    budget_share = 0.25
+
+    def __init__(self, memory, output_seconds: float = 60.0, **t2s_options):
+        super().__init__('T2S', memory)
+        self.config = t2s_options
+        self.texts = None
+        self.output_ring = SharedAudioRing(capacity=int(output_seconds * SAMPLE_RATE))
+        self.launch()
+
+
+    def _spawn(self):
+        self.texts = mp.Queue()
+        process = mp.Process(target=_run_t2s, args=(self.config, self.texts, self.output_ring.name,
+                                                    self.results, self.control, models.share(self.budget_share)),
+                             name='t2s-worker', daemon=True)
+        process.start()
+        return process
+
+
+    def _pump(self):
+        process = self.process
+        while not self.closing and process is self.process:
+            message = self.memory.read_message_t2s(timeout=0.01)
+            if message is not None:
+                self.texts.put((message.seq, message.content))
+            audio = self.output_ring.read()
+            if len(audio):
+                self.memory.add_output_audio(audio)
+
+
+    def start(self):
+        self.send('start')
+
+
+    def reset(self, memory, lang: str):
+        self.memory = memory
+        self.send('reset', lang=lang)
+
+
+    def stop_t2s(self):
+        self.send('stop')
+
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['output_dropped_samples'] = self.output_ring.dropped_samples
+        return stats
+
+
+    def close(self, timeout: float = 5.0):
+        super().close(timeout)
+        self.output_ring.close()